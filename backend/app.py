@@ -2,23 +2,22 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from flask_marshmallow import Marshmallow
 import os
-from datetime import timedelta
+from config import load_config
+from utils.database import engine_options, configure_sqlite
 
-def create_app():
+def create_app(profile=None):
     app = Flask(__name__)
     
-    # 配置
-    app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///ioedu.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = 'jwt-secret-change-in-production'
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    # 配置：按 IOEDU_ENV 选择配置档，环境变量可覆盖各项
+    app.config.update(load_config(profile))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    # 上传文件按 SHA-256 存放在该目录下
+    if not app.config['UPLOAD_FOLDER']:
+        app.config['UPLOAD_FOLDER'] = os.path.join(app.instance_path, 'uploads')
     
     # 初始化扩展
     db.init_app(app)
-    ma.init_app(app)
     jwt.init_app(app)
     CORS(app)
     
@@ -29,6 +28,9 @@ def create_app():
     from routes.experiments import experiments_bp
     from routes.classes import classes_bp
     from routes.submissions import submissions_bp
+    from routes.assignments import assignments_bp
+    from routes.files import files_bp
+    from routes.health import health_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(users_bp, url_prefix='/api/users')
@@ -36,33 +38,26 @@ def create_app():
     app.register_blueprint(experiments_bp, url_prefix='/api/experiments')
     app.register_blueprint(classes_bp, url_prefix='/api/classes')
     app.register_blueprint(submissions_bp, url_prefix='/api/submissions')
+    app.register_blueprint(assignments_bp, url_prefix='/api/assignments')
+    app.register_blueprint(files_bp, url_prefix='/api/files')
+    app.register_blueprint(health_bp, url_prefix='/api/health')
     
-    # 创建数据库表
+    # 只做连接级设置；建表、迁移和创建管理员由管理命令完成（见 cli.py）
     with app.app_context():
-        db.create_all()
-        # 创建默认管理员用户
-        from models.user import User
-        from werkzeug.security import generate_password_hash
-        
-        admin = User.query.filter_by(username='admin').first()
-        if not admin:
-            admin = User(
-                username='admin',
-                email='admin@ioedu.com',
-                password_hash=generate_password_hash('admin123'),
-                role='admin',
-                is_active=True
-            )
-            db.session.add(admin)
-            db.session.commit()
+        configure_sqlite(db.engine, app.config)
+    
+    from cli import register_commands
+    register_commands(app)
     
     return app
 
-# 全局数据库和序列化对象
+# 全局数据库对象
 db = SQLAlchemy()
-ma = Marshmallow()
 jwt = JWTManager()
 
 if __name__ == '__main__':
+    # 开发服务器；生产环境使用 gunicorn -c gunicorn.conf.py wsgi:app
     app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    from utils.scheduler import start_scheduler
+    start_scheduler(app)
+    app.run(debug=app.config['IOEDU_ENV'] == 'development', host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""管理命令
+
+    flask --app app init-db          创建表并执行迁移（新库）
+    flask --app app migrate          为已有数据库补建新表并执行未完成的迁移
+    flask --app app create-admin     创建管理员账号
+    flask --app app bench-startup    测量应用冷启动耗时，超过阈值时返回非零退出码
+    flask --app app run-scheduler    单独运行实验分配的截止时间调度（Web 进程设置 ASSIGNMENT_SCHEDULER=0 时）
+"""
+import os
+import statistics
+import subprocess
+import sys
+import click
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from app import db
+
+_STARTUP_PROBE = (
+    'import time; start = time.perf_counter(); '
+    'from app import create_app; create_app(); '
+    'print(time.perf_counter() - start)'
+)
+
+
+def _upgrade():
+    from migrations import upgrade
+    db.create_all()
+    executed = upgrade(db.engine, log=click.echo)
+    click.echo(f'{len(executed)} migration(s) applied')
+
+
+@click.command('init-db')
+@click.option('--drop', is_flag=True, help='先删除所有表（会清空数据）')
+def init_db(drop):
+    """初始化数据库"""
+    if drop:
+        click.confirm('将删除所有数据，确定继续？', abort=True)
+        db.drop_all()
+    elif inspect(db.engine).has_table('users'):
+        raise click.ClickException('数据库已初始化，请使用 migrate 升级')
+    _upgrade()
+    click.echo('数据库初始化完成')
+
+
+@click.command('migrate')
+def migrate():
+    """补建新增的表并执行未完成的迁移"""
+    _upgrade()
+
+
+@click.command('create-admin')
+@click.option('--username', default='admin', show_default=True)
+@click.option('--email', default='admin@ioedu.com', show_default=True)
+@click.option('--password', envvar='ADMIN_PASSWORD', prompt=True, hide_input=True,
+              confirmation_prompt=True, help='也可通过 ADMIN_PASSWORD 环境变量提供')
+def create_admin(username, email, password):
+    """创建管理员账号，已存在时不做修改"""
+    from models.user import User
+
+    if User.query.filter_by(username=username).first():
+        click.echo(f'用户 {username} 已存在')
+        return
+
+    db.session.add(User(
+        username=username,
+        email=email,
+        password_hash=generate_password_hash(password),
+        role='admin',
+        is_active=True
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # 并发执行时由唯一约束保证只创建一次
+        db.session.rollback()
+        click.echo(f'用户 {username} 已存在')
+        return
+    click.echo(f'管理员 {username} 创建成功')
+
+
+@click.command('bench-startup')
+@click.option('--runs', default=5, show_default=True, help='冷启动次数，每次在新进程中执行')
+@click.option('--max-ms', type=float, default=None,
+              help='中位数超过该值（毫秒）时失败，默认取配置档的 STARTUP_MAX_MS')
+def bench_startup(runs, max_ms):
+    """测量 create_app() 的冷启动耗时（含导入），用于防止启动变慢"""
+    if max_ms is None:
+        max_ms = current_app.config['STARTUP_MAX_MS']
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, IOEDU_ENV=current_app.config['IOEDU_ENV'])
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', _STARTUP_PROBE],
+            cwd=backend_dir, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]) * 1000)
+
+    median = statistics.median(samples)
+    click.echo('startup: median %.1f ms, min %.1f ms, max %.1f ms (%d runs)'
+               % (median, min(samples), max(samples), runs))
+    if median > max_ms:
+        raise click.ClickException('冷启动耗时 %.1f ms 超过阈值 %.1f ms' % (median, max_ms))
+
+
+@click.command('run-scheduler')
+def run_scheduler():
+    """在前台运行实验分配的截止时间调度，直到进程被终止"""
+    from utils.scheduler import run_forever
+    click.echo('assignment scheduler running')
+    run_forever(current_app._get_current_object())
+
+
+def register_commands(app):
+    for command in (init_db, migrate, create_admin, bench_startup, run_scheduler):
+        app.cli.add_command(command)
@@ -0,0 +1,100 @@
+import os
+from datetime import timedelta
+
+# 通过 IOEDU_ENV 选择配置档：development（默认）、production、testing
+# 各项可以再用同名环境变量覆盖，例如 DATABASE_URL、DB_POOL_SIZE、SQLITE_BUSY_TIMEOUT
+
+
+def _env(name, default):
+    return os.environ.get(name, default)
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+_PROFILES = {
+    'development': {
+        'DATABASE_URL': 'sqlite:///ioedu.db',
+        'DB_POOL_SIZE': 5,
+        'DB_MAX_OVERFLOW': 10,
+        'DB_POOL_PRE_PING': False,
+        'DB_POOL_RECYCLE': -1,
+        'STARTUP_MAX_MS': 2000,
+    },
+    'production': {
+        'DATABASE_URL': 'sqlite:///ioedu.db',
+        'DB_POOL_SIZE': 10,
+        'DB_MAX_OVERFLOW': 20,
+        'DB_POOL_PRE_PING': True,
+        'DB_POOL_RECYCLE': 1800,
+        'STARTUP_MAX_MS': 2000,
+    },
+    'testing': {
+        'DATABASE_URL': 'sqlite://',
+        'DB_POOL_SIZE': 5,
+        'DB_MAX_OVERFLOW': 10,
+        'DB_POOL_PRE_PING': False,
+        'DB_POOL_RECYCLE': -1,
+        # 测试套件并行运行时机器更忙，留出更多余量
+        'STARTUP_MAX_MS': 3000,
+    },
+}
+
+
+def load_config(profile=None):
+    """按配置档生成应用配置，环境变量优先"""
+    profile = profile or _env('IOEDU_ENV', 'development')
+    if profile not in _PROFILES:
+        raise ValueError('未知的配置档: %s' % profile)
+    defaults = _PROFILES[profile]
+
+    return {
+        'IOEDU_ENV': profile,
+        'TESTING': profile == 'testing',
+        'SECRET_KEY': _env('SECRET_KEY', 'your-secret-key-change-in-production'),
+        'JWT_SECRET_KEY': _env('JWT_SECRET_KEY', 'jwt-secret-change-in-production'),
+        'JWT_ACCESS_TOKEN_EXPIRES': timedelta(hours=1),
+        # 开启后令牌携带角色/启用状态声明，权限检查无需查询数据库；
+        # 声明最多在 JWT_ROLE_CLAIMS_MAX_AGE 内有效，之后回落到数据库查询
+        'JWT_ROLE_CLAIMS': _env_bool('JWT_ROLE_CLAIMS', False),
+        'JWT_ROLE_CLAIMS_MAX_AGE': timedelta(seconds=_env_int('JWT_ROLE_CLAIMS_MAX_AGE', 300)),
+
+        # 数据库：SQLite 或 PostgreSQL（需另外安装驱动）等 SQLAlchemy URL
+        'SQLALCHEMY_DATABASE_URI': _env('DATABASE_URL', defaults['DATABASE_URL']),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'DB_POOL_SIZE': _env_int('DB_POOL_SIZE', defaults['DB_POOL_SIZE']),
+        'DB_MAX_OVERFLOW': _env_int('DB_MAX_OVERFLOW', defaults['DB_MAX_OVERFLOW']),
+        'DB_POOL_TIMEOUT': _env_int('DB_POOL_TIMEOUT', 30),
+        'DB_POOL_PRE_PING': _env_bool('DB_POOL_PRE_PING', defaults['DB_POOL_PRE_PING']),
+        'DB_POOL_RECYCLE': _env_int('DB_POOL_RECYCLE', defaults['DB_POOL_RECYCLE']),
+        # SQLite 连接参数：写锁等待毫秒数、内存映射字节数、页缓存大小（负数为 KiB）
+        'SQLITE_BUSY_TIMEOUT': _env_int('SQLITE_BUSY_TIMEOUT', 5000),
+        'SQLITE_MMAP_SIZE': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'SQLITE_CACHE_SIZE': _env_int('SQLITE_CACHE_SIZE', -64000),
+
+        # bench-startup 的冷启动耗时阈值（毫秒，中位数）。单核机器上 create_app() 冷启动约 0.6–1.6 秒；
+        # 阈值不用于衡量细小的变化，只发现导入期做重活（建表、查询管理员、哈希密码等）这类成倍的退化
+        'STARTUP_MAX_MS': _env_int('STARTUP_MAX_MS', defaults['STARTUP_MAX_MS']),
+
+        # 自动保存每次只在 submission_draft_patches 中插入一行补丁，最多这么多秒后合并写入提交
+        'AUTOSAVE_FLUSH_INTERVAL': _env_int('AUTOSAVE_FLUSH_INTERVAL', 5),
+
+        # 实验分配的截止时间调度：是否在 Web 进程中运行、截止前多少小时提醒、多少秒从数据库重建一次队列
+        'ASSIGNMENT_SCHEDULER': _env_bool('ASSIGNMENT_SCHEDULER', profile != 'testing'),
+        'ASSIGNMENT_REMINDER_HOURS': _env_int('ASSIGNMENT_REMINDER_HOURS', 24),
+        'ASSIGNMENT_RESYNC_INTERVAL': _env_int('ASSIGNMENT_RESYNC_INTERVAL', 300),
+
+        # 上传文件的大小上限；存放目录默认在 instance 目录下
+        'UPLOAD_FOLDER': _env('UPLOAD_FOLDER', None),
+        'MAX_UPLOAD_SIZE': _env_int('MAX_UPLOAD_SIZE', 512 * 1024 * 1024),
+        'UPLOAD_CHUNK_SIZE': _env_int('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024),
+    }
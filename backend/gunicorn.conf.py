@@ -0,0 +1,54 @@
+# gunicorn 配置：gunicorn -c gunicorn.conf.py wsgi:app
+# 进程数、线程数等均可用环境变量调整
+import multiprocessing
+import os
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+
+# 默认每个 CPU 核一个工作进程；每个进程内多线程处理 I/O 等待（threads > 1 时使用 gthread）
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# 主进程先创建应用再 fork
+preload_app = True
+
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+# 收到 SIGTERM 后等待正在处理的请求完成的最长时间
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 5))
+
+# 处理一定数量请求后重启工作进程，抖动避免所有进程同时重启
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 0))
+
+accesslog = os.environ.get('WEB_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('WEB_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # 主进程创建应用时打开过数据库连接，子进程不能复用这些连接，丢弃后按需重建
+    from app import db
+    from wsgi import app
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # 收到 SIGTERM 时先让就绪检查返回 503，再由 gunicorn 停止接收新连接并等待请求处理完
+    from utils.lifecycle import install_drain_handler
+    install_drain_handler()
+
+    # 截止时间调度线程在 fork 之后启动，每个工作进程一个（状态转换是幂等的）
+    from wsgi import app
+    from utils.scheduler import start_scheduler
+    start_scheduler(app)
+
+
+def worker_exit(server, worker):
+    from utils.scheduler import stop_scheduler
+    stop_scheduler()
+
+    from utils.user_import import shutdown_hash_pool
+    shutdown_hash_pool()
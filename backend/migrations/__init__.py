@@ -0,0 +1,90 @@
+"""版本化数据库迁移
+
+每个迁移是本包中以 v 开头的模块，定义 revision（递增整数）、description 和 upgrade(conn)。
+已执行的版本记录在 schema_migrations 表中。迁移需可在已有数据的库上直接执行，
+因此都写成幂等形式（先检查列/索引是否存在）。
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, inspect, select
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200)),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+def load_migrations():
+    modules = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith('v'):
+            modules.append(importlib.import_module(f'{__name__}.{info.name}'))
+    return sorted(modules, key=lambda module: module.revision)
+
+
+def applied_versions(engine):
+    _metadata.create_all(engine)
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations(engine):
+    applied = applied_versions(engine)
+    return [module for module in load_migrations() if module.revision not in applied]
+
+
+def upgrade(engine, log=print):
+    """按版本顺序执行所有未执行的迁移，返回执行的迁移列表"""
+    executed = []
+    for module in pending_migrations(engine):
+        log(f'applying {module.revision:04d}: {module.description}')
+        if getattr(module, 'transactional', True):
+            with engine.begin() as conn:
+                module.upgrade(conn)
+                _record(conn, module)
+        else:
+            # 例如 PostgreSQL 的 CREATE INDEX CONCURRENTLY 不能在事务中执行
+            with engine.connect() as conn:
+                module.upgrade(conn.execution_options(isolation_level='AUTOCOMMIT'))
+            with engine.begin() as conn:
+                _record(conn, module)
+        executed.append(module)
+    return executed
+
+
+def _record(conn, module):
+    conn.execute(schema_migrations.insert().values(
+        version=module.revision,
+        description=module.description,
+        applied_at=datetime.utcnow()
+    ))
+
+
+# 迁移模块使用的工具函数
+
+def has_column(conn, table, column):
+    return column in {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def add_column(conn, table, column_ddl):
+    """列不存在时添加，返回是否实际添加"""
+    name = column_ddl.split()[0]
+    if has_column(conn, table, name):
+        return False
+    conn.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column_ddl}')
+    return True
+
+
+def create_index(conn, name, table, columns, unique=False):
+    """索引不存在时创建；PostgreSQL 上使用 CONCURRENTLY 以免阻塞线上写入"""
+    if name in {index['name'] for index in inspect(conn).get_indexes(table)}:
+        return False
+    concurrently = 'CONCURRENTLY ' if conn.dialect.name == 'postgresql' else ''
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    conn.exec_driver_sql(f'CREATE {kind} {concurrently}{name} ON {table} ({", ".join(columns)})')
+    return True
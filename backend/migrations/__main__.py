@@ -0,0 +1,36 @@
+"""python -m migrations [upgrade|status|check]"""
+import sys
+from app import create_app, db
+from migrations import upgrade, load_migrations, applied_versions
+from migrations.coverage import uncovered_filter_columns
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'upgrade'
+    app = create_app()
+    with app.app_context():
+        if command == 'upgrade':
+            # 新增模型的表由 create_all 补建，迁移只处理已有表的变更和数据回填
+            db.create_all()
+            executed = upgrade(db.engine)
+            print(f'{len(executed)} migration(s) applied')
+        elif command == 'status':
+            applied = applied_versions(db.engine)
+            for module in load_migrations():
+                mark = 'x' if module.revision in applied else ' '
+                print(f'[{mark}] {module.revision:04d} {module.description}')
+        elif command == 'check':
+            uncovered = uncovered_filter_columns(db, db.engine)
+            for (table, column), locations in sorted(uncovered.items()):
+                print(f'{table}.{column} is not indexed (used in {", ".join(locations)})')
+            if uncovered:
+                return 1
+            print('all filter columns are covered by an index')
+        else:
+            print(__doc__)
+            return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
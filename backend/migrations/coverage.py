@@ -0,0 +1,118 @@
+"""检查蓝图中用作过滤条件的列是否都有索引覆盖
+
+静态扫描 routes/ 下的源码，收集 filter() 中的比较/in_() 以及 filter_by() 的关键字参数
+对应的 (表, 列)，再与数据库中实际存在的主键、唯一约束和索引比对：列是某个索引的首列，
+或其前面的列也都是该表的过滤列（复合索引前缀，如 (assignee_type, assignee_id)），即视为覆盖。
+contains()/like() 这类模糊匹配无法使用 B 树索引，不在检查范围内。
+"""
+import ast
+import os
+from sqlalchemy import inspect
+
+ROUTES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'routes')
+
+
+def _model_tables(db):
+    return {mapper.class_.__name__: mapper.local_table for mapper in db.Model.registry.mappers}
+
+
+def _column_ref(node, tables):
+    """Model.column 形式的属性引用 -> (表名, 列名)"""
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        table = tables.get(node.value.id)
+        if table is not None and node.attr in table.c:
+            return table.name, node.attr
+    return None
+
+
+def _query_model(node, tables):
+    """沿 filter_by 的调用链找到被查询的模型：Model.query 或 db.session.query(Model[.col])"""
+    while True:
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Attribute) and node.func.attr == 'query' and node.args:
+                first = node.args[0]
+                if isinstance(first, ast.Attribute):
+                    first = first.value
+                if isinstance(first, ast.Name) and first.id in tables:
+                    return tables[first.id]
+            node = node.func
+        elif isinstance(node, ast.Attribute):
+            if node.attr == 'query' and isinstance(node.value, ast.Name) and node.value.id in tables:
+                return tables[node.value.id]
+            node = node.value
+        else:
+            return None
+
+
+def filter_columns(db, routes_dir=ROUTES_DIR):
+    """返回 {(表名, 列名): [出现位置, ...]}"""
+    tables = _model_tables(db)
+    found = {}
+
+    def add(ref, path, node):
+        if ref:
+            found.setdefault(ref, []).append(f'{os.path.basename(path)}:{node.lineno}')
+
+    for filename in sorted(os.listdir(routes_dir)):
+        if not filename.endswith('.py'):
+            continue
+        path = os.path.join(routes_dir, filename)
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+
+        for call in ast.walk(tree):
+            if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Attribute):
+                continue
+            if call.func.attr == 'filter':
+                for arg in call.args:
+                    for node in ast.walk(arg):
+                        if isinstance(node, ast.Compare):
+                            for operand in [node.left] + node.comparators:
+                                add(_column_ref(operand, tables), path, node)
+                        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                              and node.func.attr == 'in_'):
+                            add(_column_ref(node.func.value, tables), path, node)
+            elif call.func.attr == 'filter_by':
+                table = _query_model(call.func.value, tables)
+                if table is not None:
+                    for keyword in call.keywords:
+                        if keyword.arg in table.c:
+                            add((table.name, keyword.arg), path, call)
+    return found
+
+
+def index_column_lists(engine):
+    """数据库中每张表的主键、唯一约束和索引的列序列"""
+    inspector = inspect(engine)
+    result = {}
+    for table in inspector.get_table_names():
+        column_lists = []
+        pk = inspector.get_pk_constraint(table).get('constrained_columns') or []
+        if pk:
+            column_lists.append(pk)
+        for index in inspector.get_indexes(table):
+            column_lists.append([c for c in index['column_names'] if c])
+        for constraint in inspector.get_unique_constraints(table):
+            column_lists.append(constraint['column_names'])
+        result[table] = column_lists
+    return result
+
+
+def _covered(column, column_lists, filtered):
+    for columns in column_lists:
+        if column in columns and all(c in filtered for c in columns[:columns.index(column)]):
+            return True
+    return False
+
+
+def uncovered_filter_columns(db, engine):
+    """返回没有索引覆盖的过滤列 {(表名, 列名): [出现位置, ...]}"""
+    used = filter_columns(db)
+    indexes = index_column_lists(engine)
+    filtered = {}
+    for table, column in used:
+        filtered.setdefault(table, set()).add(column)
+    return {
+        (table, column): locations for (table, column), locations in used.items()
+        if not _covered(column, indexes.get(table, []), filtered[table])
+    }
@@ -0,0 +1,24 @@
+from migrations import add_column
+
+revision = 1
+description = 'add maintained counter columns to classes and experiments'
+
+
+def upgrade(conn):
+    if add_column(conn, 'classes', 'student_count INTEGER NOT NULL DEFAULT 0'):
+        conn.exec_driver_sql(
+            'UPDATE classes SET student_count = '
+            '(SELECT COUNT(*) FROM student_classes WHERE student_classes.class_id = classes.id)'
+        )
+
+    if add_column(conn, 'experiments', 'steps_count INTEGER NOT NULL DEFAULT 0'):
+        conn.exec_driver_sql(
+            'UPDATE experiments SET steps_count = '
+            '(SELECT COUNT(*) FROM experiment_steps WHERE experiment_steps.experiment_id = experiments.id)'
+        )
+
+    if add_column(conn, 'experiments', 'data_points_count INTEGER NOT NULL DEFAULT 0'):
+        conn.exec_driver_sql(
+            'UPDATE experiments SET data_points_count = '
+            '(SELECT COUNT(*) FROM data_points WHERE data_points.experiment_id = experiments.id)'
+        )
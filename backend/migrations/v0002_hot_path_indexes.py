@@ -0,0 +1,30 @@
+from migrations import create_index
+
+revision = 2
+description = 'secondary indexes for the filters used by the API blueprints'
+# PostgreSQL 上并发建索引，需在事务外执行
+transactional = False
+
+INDEXES = [
+    ('ix_users_role', 'users', ['role']),
+    ('ix_courses_teacher_id', 'courses', ['teacher_id']),
+    ('ix_experiments_course_status', 'experiments', ['course_id', 'status']),
+    ('ix_experiments_status', 'experiments', ['status']),
+    ('ix_experiment_steps_experiment_id', 'experiment_steps', ['experiment_id']),
+    ('ix_data_points_experiment_id', 'data_points', ['experiment_id']),
+    ('ix_classes_teacher_id', 'classes', ['teacher_id']),
+    ('ix_student_classes_class_id', 'student_classes', ['class_id']),
+    ('ix_class_courses_course_id', 'class_courses', ['course_id']),
+    ('ix_submissions_experiment_status', 'submissions', ['experiment_id', 'status']),
+    ('ix_submissions_student_experiment', 'submissions', ['student_id', 'experiment_id']),
+    ('ix_submissions_status', 'submissions', ['status']),
+    ('ix_submissions_created_id', 'submissions', ['created_at', 'id']),
+    ('ix_experiment_assignments_assignee', 'experiment_assignments', ['assignee_type', 'assignee_id']),
+    ('ix_experiment_assignments_experiment_id', 'experiment_assignments', ['experiment_id']),
+    ('ix_experiment_assignments_status_due', 'experiment_assignments', ['status', 'due_date']),
+]
+
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        create_index(conn, name, table, columns)
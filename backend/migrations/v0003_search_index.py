@@ -0,0 +1,42 @@
+revision = 3
+description = 'full-text search index (SQLite FTS5 trigram) for users, courses, classes and experiments'
+
+# 建立索引时 utils/search.py 中 SEARCH_COLUMNS 的取值；迁移不随应用代码变化，修改列需新增迁移
+COLUMNS = {
+    'users': ['username', 'email'],
+    'courses': ['name', 'code'],
+    'classes': ['name'],
+    'experiments': ['title'],
+}
+
+
+def upgrade(conn):
+    # 其他数据库上搜索回退到 LIKE 匹配
+    if conn.dialect.name != 'sqlite':
+        return
+
+    for table, columns in COLUMNS.items():
+        fts = f'{table}_fts'
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{column_list}, content='{table}', content_rowid='id', tokenize='trigram')"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END"
+        )
+        # 只在被索引的列变化时重建该行，计数列等的更新不触发
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column_list} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+        )
+        conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
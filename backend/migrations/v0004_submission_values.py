@@ -0,0 +1,78 @@
+import json
+import math
+from sqlalchemy import text
+
+revision = 4
+description = 'backfill typed submission_values from submissions.data_values'
+
+
+def _typed(data_type, value):
+    if value is None or value == '':
+        return None, None, None
+    if data_type == 'number':
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None, str(value), None
+        # inf、nan 不是有效的测量值，按原文保存，不参与数值统计
+        if not math.isfinite(number):
+            return None, str(value), None
+        return number, None, None
+    if data_type == 'select':
+        return None, None, str(value)
+    return None, value if isinstance(value, str) else json.dumps(value, ensure_ascii=False), None
+
+
+def upgrade(conn):
+    # 表本身由 create_all 创建；这里只为已有提交补齐分列取值
+    if conn.exec_driver_sql('SELECT COUNT(*) FROM submission_values').scalar():
+        return
+
+    data_points = {}
+    for point_id, experiment_id, name, data_type in conn.exec_driver_sql(
+            'SELECT id, experiment_id, name, type FROM data_points'):
+        points = data_points.setdefault(experiment_id, {})
+        points[str(point_id)] = (point_id, data_type)
+        points.setdefault(name, (point_id, data_type))
+
+    rows = []
+    result = conn.exec_driver_sql(
+        "SELECT id, experiment_id, data_values FROM submissions "
+        "WHERE data_values IS NOT NULL AND data_values != ''"
+    )
+    for submission_id, experiment_id, raw in result:
+        try:
+            values = json.loads(raw)
+        except ValueError:
+            continue
+        if isinstance(values, list):
+            values = {item.get('data_point_id', item.get('name')): item.get('value')
+                      for item in values if isinstance(item, dict)}
+        if not isinstance(values, dict):
+            continue
+
+        seen = set()
+        points = data_points.get(experiment_id, {})
+        for key, value in values.items():
+            point = points.get(str(key))
+            if point is None or point[0] in seen:
+                continue
+            num_value, text_value, option_value = _typed(point[1], value)
+            if num_value is None and text_value is None and option_value is None:
+                continue
+            seen.add(point[0])
+            rows.append({
+                'submission_id': submission_id,
+                'data_point_id': point[0],
+                'experiment_id': experiment_id,
+                'num_value': num_value,
+                'text_value': text_value,
+                'option_value': option_value
+            })
+
+    if rows:
+        conn.execute(text(
+            'INSERT INTO submission_values '
+            '(submission_id, data_point_id, experiment_id, num_value, text_value, option_value) '
+            'VALUES (:submission_id, :data_point_id, :experiment_id, :num_value, :text_value, :option_value)'
+        ), rows)
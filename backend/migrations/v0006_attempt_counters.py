@@ -0,0 +1,27 @@
+from sqlalchemy import text
+
+revision = 6
+description = 'renumber duplicate submission attempts and seed submission_attempt_counters'
+
+
+def upgrade(conn):
+    # 并发提交曾产生重复的尝试次数：按创建顺序重新编号这些 (实验, 学生) 的提交
+    duplicated = set(conn.exec_driver_sql(
+        'SELECT experiment_id, student_id FROM submissions '
+        'GROUP BY experiment_id, student_id, attempt_number HAVING COUNT(*) > 1'
+    ).fetchall())
+    for experiment_id, student_id in duplicated:
+        ids = conn.execute(text(
+            'SELECT id FROM submissions WHERE experiment_id = :experiment_id AND student_id = :student_id '
+            'ORDER BY created_at, id'
+        ), {'experiment_id': experiment_id, 'student_id': student_id}).scalars().all()
+        conn.execute(text('UPDATE submissions SET attempt_number = :number WHERE id = :id'),
+                     [{'number': number, 'id': submission_id} for number, submission_id in enumerate(ids, start=1)])
+
+    # 表本身由 create_all 创建；计数从现有提交的最大尝试次数开始
+    if not conn.exec_driver_sql('SELECT COUNT(*) FROM submission_attempt_counters').scalar():
+        conn.exec_driver_sql(
+            'INSERT INTO submission_attempt_counters (experiment_id, student_id, last_attempt) '
+            'SELECT experiment_id, student_id, MAX(COALESCE(attempt_number, 1)) FROM submissions '
+            'GROUP BY experiment_id, student_id'
+        )
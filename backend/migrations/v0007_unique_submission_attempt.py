@@ -0,0 +1,11 @@
+from migrations import create_index
+
+revision = 7
+description = 'unique (experiment_id, student_id, attempt_number) on submissions'
+# PostgreSQL 上并发建索引，需在事务外执行
+transactional = False
+
+
+def upgrade(conn):
+    create_index(conn, 'unique_submission_attempt', 'submissions',
+                 ['experiment_id', 'student_id', 'attempt_number'], unique=True)
@@ -0,0 +1,8 @@
+from migrations import add_column
+
+revision = 8
+description = 'add submissions.version for autosave conflict detection'
+
+
+def upgrade(conn):
+    add_column(conn, 'submissions', 'version INTEGER NOT NULL DEFAULT 0')
@@ -0,0 +1,8 @@
+from migrations import add_column
+
+revision = 9
+description = 'add experiment_assignments.reminded_at for deadline reminders'
+
+
+def upgrade(conn):
+    add_column(conn, 'experiment_assignments', 'reminded_at DATETIME')
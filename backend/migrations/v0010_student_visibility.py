@@ -0,0 +1,53 @@
+revision = 10
+description = 'populate student_course_access and student_experiment_access'
+
+# 学生只能看到这些状态的实验（与 utils/visibility.py 的 VISIBLE_STATUSES 在本迁移时的取值一致）
+_PUBLISHED = "e.status IN ('published', 'active')"
+
+
+def upgrade(conn):
+    # 表本身由 create_all 创建；按现有选课、班级课程和分配为所有学生建立可见性索引。
+    # 迁移不随应用代码变化，这里写死建立索引时的规则，不调用 utils.visibility
+    conn.exec_driver_sql('DELETE FROM student_experiment_access')
+    conn.exec_driver_sql('DELETE FROM student_course_access')
+
+    # 实验可见的三个来源：班级关联的课程、分配给学生本人、分配给所在班级。
+    # 同一实验有多个来源时合并：有任一分配即为 assigned；截止时间取各分配中最晚的，
+    # 某个分配没有截止时间时整体没有截止时间
+    conn.exec_driver_sql(
+        "INSERT INTO student_experiment_access (student_id, experiment_id, course_id, assigned, due_date) "
+        "SELECT student_id, experiment_id, course_id, "
+        "CASE WHEN SUM(assigned) > 0 THEN TRUE ELSE FALSE END, "
+        "CASE WHEN SUM(assigned) > 0 AND SUM(assigned) = COUNT(due_date) THEN MAX(due_date) END "
+        "FROM ("
+        "SELECT sc.student_id AS student_id, e.id AS experiment_id, e.course_id AS course_id, "
+        "0 AS assigned, CAST(NULL AS TIMESTAMP) AS due_date "
+        "FROM student_classes sc "
+        "JOIN class_courses cc ON cc.class_id = sc.class_id "
+        "JOIN experiments e ON e.course_id = cc.course_id "
+        f"WHERE {_PUBLISHED} "
+        "UNION ALL "
+        "SELECT a.assignee_id, e.id, e.course_id, 1, a.due_date "
+        "FROM experiment_assignments a "
+        "JOIN experiments e ON e.id = a.experiment_id "
+        f"WHERE a.assignee_type = 'student' AND {_PUBLISHED} "
+        "UNION ALL "
+        "SELECT sc.student_id, e.id, e.course_id, 1, a.due_date "
+        "FROM student_classes sc "
+        "JOIN experiment_assignments a ON a.assignee_type = 'class' AND a.assignee_id = sc.class_id "
+        "JOIN experiments e ON e.id = a.experiment_id "
+        f"WHERE {_PUBLISHED}"
+        ") AS source "
+        "GROUP BY student_id, experiment_id, course_id"
+    )
+
+    # 课程可见：班级关联的课程（即使还没有实验），加上有可见实验的课程
+    conn.exec_driver_sql(
+        "INSERT INTO student_course_access (student_id, course_id) "
+        "SELECT sc.student_id, cc.course_id "
+        "FROM student_classes sc "
+        "JOIN class_courses cc ON cc.class_id = sc.class_id "
+        "JOIN courses c ON c.id = cc.course_id "
+        "UNION "
+        "SELECT student_id, course_id FROM student_experiment_access"
+    )
@@ -0,0 +1,13 @@
+revision = 12
+description = 'record file uploaders in file_blob_uploaders'
+
+
+def upgrade(conn):
+    # 表本身由 create_all 创建；已有文件只知道首个上传者
+    conn.exec_driver_sql(
+        'INSERT INTO file_blob_uploaders (sha256, user_id, created_at) '
+        'SELECT sha256, created_by, created_at FROM file_blobs '
+        'WHERE created_by IS NOT NULL AND NOT EXISTS ('
+        'SELECT 1 FROM file_blob_uploaders u '
+        'WHERE u.sha256 = file_blobs.sha256 AND u.user_id = file_blobs.created_by)'
+    )
@@ -1,4 +1,4 @@
-from app import db, ma
+from app import db
 from datetime import datetime
 
 class ExperimentAssignment(db.Model):
@@ -11,19 +11,28 @@ class ExperimentAssignment(db.Model):
     start_date = db.Column(db.DateTime)
     due_date = db.Column(db.DateTime)
     max_attempts = db.Column(db.Integer, default=3)
-    status = db.Column(db.String(20), default='assigned')  # assigned, active, completed, expired
+    status = db.Column(db.String(20), default='assigned')  # assigned, active, completed, expired（由 utils/scheduler.py 按时间转换）
+    reminded_at = db.Column(db.DateTime)  # 截止提醒发出的时间
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_experiment_assignments_assignee', 'assignee_type', 'assignee_id'),
+        db.Index('ix_experiment_assignments_experiment_id', 'experiment_id'),
+        db.Index('ix_experiment_assignments_status_due', 'status', 'due_date'),
+    )
+    
+    # 关系（assigned_class 由 Class.assignments 的 backref 提供）
+    # assignee_id 没有真实外键，按 assignee_type 限定为学生分配
+    assigned_student = db.relationship('User', viewonly=True,
+                                       primaryjoin="and_(foreign(ExperimentAssignment.assignee_id) == User.id, "
+                                                   "ExperimentAssignment.assignee_type == 'student')")
+    
     def to_dict(self):
         assignee_name = None
         if self.assignee_type == 'class':
-            from models.class_model import Class
-            class_obj = Class.query.get(self.assignee_id)
-            assignee_name = class_obj.name if class_obj else None
+            assignee_name = self.assigned_class.name if self.assigned_class else None
         elif self.assignee_type == 'student':
-            from models.user import User
-            student = User.query.get(self.assignee_id)
-            assignee_name = student.username if student else None
+            assignee_name = self.assigned_student.username if self.assigned_student else None
             
         return {
             'id': self.id,
@@ -36,11 +45,6 @@ class ExperimentAssignment(db.Model):
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'max_attempts': self.max_attempts,
             'status': self.status,
+            'reminded_at': self.reminded_at.isoformat() if self.reminded_at else None,
             'created_at': self.created_at.isoformat()
         }
-
-class ExperimentAssignmentSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = ExperimentAssignment
-        load_instance = True
-        include_fk = True
\ No newline at end of file
@@ -1,4 +1,4 @@
-from app import db, ma
+from app import db
 from datetime import datetime
 
 class Class(db.Model):
@@ -8,14 +8,23 @@ class Class(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     teacher_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # 计数列，随选课记录增删在同一事务中维护，列表渲染无需加载选课集合
+    student_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (db.Index('ix_classes_teacher_id', 'teacher_id'),)
+    
     # 关系
+    teacher = db.relationship('User', backref='classes_taught')
     student_enrollments = db.relationship('StudentClass', backref='class_obj', lazy=True)
     course_associations = db.relationship('ClassCourse', backref='class_obj', lazy=True)
-    assignments = db.relationship('ExperimentAssignment', backref='assigned_class', lazy=True, 
-                                foreign_keys='ExperimentAssignment.assignee_id')
+    # assignee_id 没有真实外键，按 assignee_type 限定为班级分配
+    assignments = db.relationship('ExperimentAssignment',
+                                  backref=db.backref('assigned_class', viewonly=True),
+                                  lazy=True, viewonly=True,
+                                  primaryjoin="and_(Class.id == foreign(ExperimentAssignment.assignee_id), "
+                                              "ExperimentAssignment.assignee_type == 'class')")
     
     def to_dict(self):
         return {
@@ -24,10 +33,17 @@ class Class(db.Model):
             'description': self.description,
             'teacher_id': self.teacher_id,
             'teacher_name': self.teacher.username if self.teacher else None,
-            'student_count': len(self.student_enrollments),
+            'student_count': self.student_count,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+    
+    @classmethod
+    def adjust_student_count(cls, class_id, delta):
+        """在当前事务中原子地调整班级学生人数"""
+        cls.query.filter_by(id=class_id).update(
+            {cls.student_count: cls.student_count + delta}, synchronize_session=False
+        )
 
 class StudentClass(db.Model):
     __tablename__ = 'student_classes'
@@ -38,7 +54,10 @@ class StudentClass(db.Model):
     enrolled_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # 唯一约束
-    __table_args__ = (db.UniqueConstraint('student_id', 'class_id', name='unique_student_class'),)
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'class_id', name='unique_student_class'),
+        db.Index('ix_student_classes_class_id', 'class_id'),
+    )
     
     student = db.relationship('User', backref='class_enrollments')
 
@@ -51,16 +70,7 @@ class ClassCourse(db.Model):
     assigned_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # 唯一约束
-    __table_args__ = (db.UniqueConstraint('class_id', 'course_id', name='unique_class_course'),)
-
-class ClassSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = Class
-        load_instance = True
-        include_fk = True
-
-class StudentClassSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = StudentClass
-        load_instance = True
-        include_fk = True
\ No newline at end of file
+    __table_args__ = (
+        db.UniqueConstraint('class_id', 'course_id', name='unique_class_course'),
+        db.Index('ix_class_courses_course_id', 'course_id'),
+    )
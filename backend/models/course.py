@@ -1,4 +1,4 @@
-from app import db, ma
+from app import db
 from datetime import datetime
 
 class Course(db.Model):
@@ -14,6 +14,8 @@ class Course(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (db.Index('ix_courses_teacher_id', 'teacher_id'),)
+    
     # 关系
     experiments = db.relationship('Experiment', backref='course', lazy=True, cascade='all, delete-orphan')
     class_associations = db.relationship('ClassCourse', backref='course', lazy=True)
@@ -31,9 +33,3 @@ class Course(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
-
-class CourseSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = Course
-        load_instance = True
-        include_fk = True
\ No newline at end of file
@@ -1,4 +1,4 @@
-from app import db, ma
+from app import db
 from datetime import datetime
 
 class Experiment(db.Model):
@@ -13,9 +13,17 @@ class Experiment(db.Model):
     max_score = db.Column(db.Float, default=100.0)
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
     status = db.Column(db.String(20), default='draft')  # draft, published, active, completed
+    # 计数列，随步骤和数据点的创建在同一事务中维护，列表渲染无需加载子集合
+    steps_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    data_points_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_experiments_course_status', 'course_id', 'status'),
+        db.Index('ix_experiments_status', 'status'),
+    )
+    
     # 关系
     steps = db.relationship('ExperimentStep', backref='experiment', lazy=True, cascade='all, delete-orphan')
     data_points = db.relationship('DataPoint', backref='experiment', lazy=True, cascade='all, delete-orphan')
@@ -36,9 +44,17 @@ class Experiment(db.Model):
             'status': self.status,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
-            'steps_count': len(self.steps),
-            'data_points_count': len(self.data_points)
+            'steps_count': self.steps_count,
+            'data_points_count': self.data_points_count
         }
+    
+    @classmethod
+    def adjust_counts(cls, experiment_id, steps=0, data_points=0):
+        """在当前事务中原子地调整步骤数和数据点数"""
+        cls.query.filter_by(id=experiment_id).update({
+            cls.steps_count: cls.steps_count + steps,
+            cls.data_points_count: cls.data_points_count + data_points
+        }, synchronize_session=False)
 
 class ExperimentStep(db.Model):
     __tablename__ = 'experiment_steps'
@@ -52,6 +68,8 @@ class ExperimentStep(db.Model):
     order = db.Column(db.Integer, default=1)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (db.Index('ix_experiment_steps_experiment_id', 'experiment_id'),)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -77,6 +95,8 @@ class DataPoint(db.Model):
     options = db.Column(db.Text)  # JSON string for select type
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (db.Index('ix_data_points_experiment_id', 'experiment_id'),)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -89,21 +109,3 @@ class DataPoint(db.Model):
             'options': self.options,
             'created_at': self.created_at.isoformat()
         }
-
-class ExperimentSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = Experiment
-        load_instance = True
-        include_fk = True
-
-class ExperimentStepSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = ExperimentStep
-        load_instance = True
-        include_fk = True
-
-class DataPointSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = DataPoint
-        load_instance = True
-        include_fk = True
\ No newline at end of file
@@ -0,0 +1,86 @@
+from app import db
+from datetime import datetime
+
+class FileBlob(db.Model):
+    """按 SHA-256 内容寻址的文件，相同内容只存储一份"""
+    __tablename__ = 'file_blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    content_type = db.Column(db.String(100))
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'size': self.size,
+            'content_type': self.content_type,
+            'created_at': self.created_at.isoformat()
+        }
+
+class FileBlobUploader(db.Model):
+    """上传过某个文件完整内容的用户；只有上传者可以跳过传输直接复用已有文件，或在提交中引用它"""
+    __tablename__ = 'file_blob_uploaders'
+    
+    sha256 = db.Column(db.String(64), db.ForeignKey('file_blobs.sha256'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class UploadSession(db.Model):
+    """分块上传会话，received 为已写入的字节数，客户端据此断点续传"""
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100))
+    total_size = db.Column(db.BigInteger, nullable=False)
+    sha256 = db.Column(db.String(64))  # 客户端声明的摘要，完成时校验
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_upload_sessions_owner_id', 'owner_id'),
+        db.Index('ix_upload_sessions_updated_at', 'updated_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'total_size': self.total_size,
+            'offset': self.received,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+class SubmissionFile(db.Model):
+    """提交引用的文件，按摘要指向 FileBlob；同一文件重复提交不占用额外空间"""
+    __tablename__ = 'submission_files'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id'), nullable=False)
+    sha256 = db.Column(db.String(64), db.ForeignKey('file_blobs.sha256'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('submission_id', 'sha256', name='unique_submission_file'),
+        db.Index('ix_submission_files_sha256', 'sha256'),
+    )
+    
+    # 关系
+    blob = db.relationship('FileBlob')
+    submission = db.relationship('Submission', backref=db.backref(
+        'file_refs', lazy=True, cascade='all, delete-orphan'
+    ))
+    
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'filename': self.filename,
+            'size': self.blob.size if self.blob else None,
+            'content_type': self.blob.content_type if self.blob else None
+        }
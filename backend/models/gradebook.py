@@ -0,0 +1,39 @@
+from app import db
+from datetime import datetime
+
+class GradebookEntry(db.Model):
+    """成绩册的物化单元格：每个学生在每个实验上的已批改成绩汇总
+
+    批改或修改分数时按 (student_id, experiment_id) 增量刷新，读取成绩册无需扫描提交表。
+    """
+    __tablename__ = 'gradebook_entries'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    experiment_id = db.Column(db.Integer, db.ForeignKey('experiments.id'), nullable=False)
+    best_score = db.Column(db.Float)
+    latest_score = db.Column(db.Float)  # 已批改的最后一次尝试的分数
+    score_sum = db.Column(db.Float, nullable=False, default=0)
+    graded_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'experiment_id', name='unique_gradebook_student_experiment'),
+        db.Index('ix_gradebook_entries_experiment_id', 'experiment_id'),
+    )
+    
+    # 关系
+    experiment = db.relationship('Experiment', backref=db.backref(
+        'gradebook_entries', lazy=True, cascade='all, delete-orphan'
+    ))
+    
+    @property
+    def average_score(self):
+        return self.score_sum / self.graded_count if self.graded_count else None
+    
+    def score(self, policy):
+        if policy == 'latest':
+            return self.latest_score
+        if policy == 'average':
+            return self.average_score
+        return self.best_score
@@ -1,4 +1,4 @@
-from app import db, ma
+from app import db
 from datetime import datetime
 
 class Submission(db.Model):
@@ -8,7 +8,7 @@ class Submission(db.Model):
     experiment_id = db.Column(db.Integer, db.ForeignKey('experiments.id'), nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     attempt_number = db.Column(db.Integer, default=1)
-    status = db.Column(db.String(20), default='draft')  # draft, submitted, graded
+    status = db.Column(db.String(20), default='draft')  # draft, submitted, graded, locked（截止后未提交的草稿）
     content = db.Column(db.Text)  # JSON string
     data_values = db.Column(db.Text)  # JSON string for data points
     files = db.Column(db.Text)  # JSON string for file paths
@@ -19,9 +19,20 @@ class Submission(db.Model):
     submitted_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 每次修改内容递增，用于检测冲突
+    
+    __table_args__ = (
+        db.Index('ix_submissions_experiment_status', 'experiment_id', 'status'),
+        db.Index('ix_submissions_student_experiment', 'student_id', 'experiment_id'),
+        db.Index('ix_submissions_status', 'status'),
+        db.Index('ix_submissions_created_id', 'created_at', 'id'),
+        # 同一学生在同一实验上的尝试次数不重复，由 SubmissionAttemptCounter 分配
+        db.Index('unique_submission_attempt', 'experiment_id', 'student_id', 'attempt_number', unique=True),
+    )
     
     # 关系
     grader = db.relationship('User', foreign_keys=[graded_by], backref='graded_submissions')
+    values = db.relationship('SubmissionValue', backref='submission', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -42,11 +53,101 @@ class Submission(db.Model):
             'graded_at': self.graded_at.isoformat() if self.graded_at else None,
             'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
             'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'updated_at': self.updated_at.isoformat(),
+            'version': self.version
+        }
+
+class SubmissionValue(db.Model):
+    """提交中每个数据点的取值，按数据点类型分列存储，便于在 SQL 中过滤和聚合
+
+    由 data_values 写入时同步生成，data_values 字段本身保持不变。
+    """
+    __tablename__ = 'submission_values'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id'), nullable=False)
+    data_point_id = db.Column(db.Integer, db.ForeignKey('data_points.id'), nullable=False)
+    experiment_id = db.Column(db.Integer, db.ForeignKey('experiments.id'), nullable=False)
+    num_value = db.Column(db.Float)  # number 类型
+    text_value = db.Column(db.Text)  # text/file 类型，或无法解析为数字的原始值
+    option_value = db.Column(db.String(200))  # select 类型
+    
+    __table_args__ = (
+        db.UniqueConstraint('submission_id', 'data_point_id', name='unique_submission_data_point'),
+        db.Index('ix_submission_values_experiment_point', 'experiment_id', 'data_point_id', 'num_value'),
+    )
+    
+    def to_dict(self):
+        return {
+            'submission_id': self.submission_id,
+            'data_point_id': self.data_point_id,
+            'num_value': self.num_value,
+            'text_value': self.text_value,
+            'option_value': self.option_value
         }
 
-class SubmissionSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = Submission
-        load_instance = True
-        include_fk = True
\ No newline at end of file
+class SubmissionAttemptCounter(db.Model):
+    """每个 (实验, 学生) 已分配的最大尝试次数，提交时用一条原子语句递增"""
+    __tablename__ = 'submission_attempt_counters'
+    
+    experiment_id = db.Column(db.Integer, db.ForeignKey('experiments.id'), primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    last_attempt = db.Column(db.Integer, nullable=False, default=0)
+
+class SubmissionRevision(db.Model):
+    """提交内容的历史版本
+
+    每隔若干版本保存一次完整快照（depth 为 0），其余版本只保存相对上一版本的压缩差异，
+    重建任一版本最多读取一个快照加 SNAPSHOT_INTERVAL 个差异（见 utils/revisions.py）。
+    """
+    __tablename__ = 'submission_revisions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    snapshot_version = db.Column(db.Integer, nullable=False)  # 该版本所依赖的快照版本，快照为自身
+    depth = db.Column(db.Integer, nullable=False, default=0)  # 距离快照的差异个数
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib 压缩的 JSON：快照为完整内容，否则为差异
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('submission_id', 'version', name='unique_submission_revision'),
+    )
+    
+    # 关系
+    submission = db.relationship('Submission', backref=db.backref(
+        'revisions', lazy=True, cascade='all, delete-orphan'
+    ))
+    
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'kind': 'snapshot' if self.depth == 0 else 'delta',
+            'stored_size': len(self.payload),
+            'author_id': self.author_id,
+            'created_at': self.created_at.isoformat()
+        }
+
+class SubmissionDraftPatch(db.Model):
+    """自动保存尚未写入 submissions 的 JSON Patch，每次保存一行
+
+    base_version 为这一串补丁所基于的提交版本，version 为应用该补丁后的版本；
+    后台刷新按间隔把连续的补丁合并写入提交后删除（见 utils/autosave.py）。
+    """
+    __tablename__ = 'submission_draft_patches'
+    
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id'), primary_key=True)
+    version = db.Column(db.Integer, primary_key=True)
+    base_version = db.Column(db.Integer, nullable=False)
+    patch = db.Column(db.Text, nullable=False)  # JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_submission_draft_patches_created', 'created_at'),
+    )
+    
+    # 关系
+    submission = db.relationship('Submission', backref=db.backref(
+        'draft_patches', lazy=True, cascade='all, delete-orphan'
+    ))
@@ -1,4 +1,4 @@
-from app import db, ma
+from app import db
 from datetime import datetime
 from werkzeug.security import check_password_hash
 
@@ -14,9 +14,12 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (db.Index('ix_users_role', 'role'),)
+    
     # 关系
     courses_taught = db.relationship('Course', backref='teacher', lazy=True)
-    submissions = db.relationship('Submission', backref='student', lazy=True)
+    submissions = db.relationship('Submission', backref='student', lazy=True,
+                                  foreign_keys='Submission.student_id')
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -31,9 +34,3 @@ class User(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
-
-class UserSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = User
-        exclude = ('password_hash',)
-        load_instance = True
\ No newline at end of file
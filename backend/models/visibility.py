@@ -0,0 +1,42 @@
+from app import db
+
+class StudentCourseAccess(db.Model):
+    """学生可见的课程：通过所在班级关联的课程，或被分配了其中实验的课程
+
+    由 utils/visibility.py 在选课、班级关联课程和分配变化时按学生重建，学生端列表和权限检查直接查此表。
+    """
+    __tablename__ = 'student_course_access'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'course_id', name='unique_student_course_access'),
+        db.Index('ix_student_course_access_course_id', 'course_id'),
+    )
+
+class StudentExperimentAccess(db.Model):
+    """学生可见的实验，以及分配给该学生的截止时间（多个分配取最宽松的，没有截止时间为 NULL）"""
+    __tablename__ = 'student_experiment_access'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    experiment_id = db.Column(db.Integer, db.ForeignKey('experiments.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    assigned = db.Column(db.Boolean, nullable=False, default=False)  # 是否有分配（否则仅通过课程可见）
+    due_date = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'experiment_id', name='unique_student_experiment_access'),
+        db.Index('ix_student_experiment_access_experiment_id', 'experiment_id'),
+    )
+    
+    # 关系
+    experiment = db.relationship('Experiment', viewonly=True)
+    
+    def to_dict(self):
+        data = self.experiment.to_dict()
+        data['assigned'] = self.assigned
+        data['due_date'] = self.due_date.isoformat() if self.due_date else None
+        return data
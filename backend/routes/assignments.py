@@ -0,0 +1,152 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+from sqlalchemy import select
+from app import db
+from models.user import User
+from models.experiment import Experiment
+from models.class_model import Class, StudentClass
+from models.assignment import ExperimentAssignment
+from utils.decorators import teacher_required
+from utils.pagination import paginate, InvalidCursor
+from utils.identity import get_current_user_id, current_identity
+from utils.serializers import with_relations, load_one
+from utils.scheduler import schedule_assignment
+from utils.visibility import assignee_students, refresh_visibility
+from utils.scopes import teacher_experiment_ids
+
+assignments_bp = Blueprint('assignments', __name__)
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+@assignments_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_assignments():
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        course_id = request.args.get('course_id', type=int)
+        experiment_id = request.args.get('experiment_id', type=int)
+        assignee_type = request.args.get('assignee_type')
+        status = request.args.get('status')
+        
+        query = with_relations(ExperimentAssignment.query, 'assignment')
+        
+        # 学生只能看到分配给自己或自己班级的实验，教师只能看到自己课程的分配
+        if current_user.role == 'student':
+            enrolled_classes = select(StudentClass.class_id).where(StudentClass.student_id == current_user_id)
+            query = query.filter(
+                ((ExperimentAssignment.assignee_type == 'student') &
+                 (ExperimentAssignment.assignee_id == current_user_id)) |
+                ((ExperimentAssignment.assignee_type == 'class') &
+                 (ExperimentAssignment.assignee_id.in_(enrolled_classes)))
+            )
+        elif current_user.role == 'teacher':
+            query = query.filter(ExperimentAssignment.experiment_id.in_(teacher_experiment_ids(current_user_id)))
+        
+        if course_id:
+            course_experiments = select(Experiment.id).where(Experiment.course_id == course_id)
+            query = query.filter(ExperimentAssignment.experiment_id.in_(course_experiments))
+        
+        if experiment_id:
+            query = query.filter(ExperimentAssignment.experiment_id == experiment_id)
+        
+        if assignee_type:
+            query = query.filter(ExperimentAssignment.assignee_type == assignee_type)
+        
+        if status:
+            query = query.filter(ExperimentAssignment.status == status)
+        
+        return jsonify(paginate(query, 'assignments', ExperimentAssignment)), 200
+        
+    except InvalidCursor:
+        return jsonify({'message': '无效的分页游标'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@assignments_bp.route('/', methods=['POST'])
+@jwt_required()
+@teacher_required
+def create_assignment():
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        data = request.get_json()
+        experiment_id = data.get('experiment_id')
+        assignee_type = data.get('assignee_type')
+        assignee_id = data.get('assignee_id')
+        max_attempts = data.get('max_attempts', 3)
+        
+        if not experiment_id or not assignee_id or assignee_type not in ['class', 'student']:
+            return jsonify({'message': '实验ID、分配类型和分配对象不能为空'}), 400
+        
+        experiment = Experiment.query.get(experiment_id)
+        if not experiment:
+            return jsonify({'message': '实验不存在'}), 404
+        
+        if current_user.role != 'admin' and experiment.course.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        # 检查被分配对象是否存在
+        if assignee_type == 'class':
+            assignee = Class.query.get(assignee_id)
+        else:
+            assignee = User.query.filter_by(id=assignee_id, role='student').first()
+        if not assignee:
+            return jsonify({'message': '分配对象不存在'}), 404
+        
+        assignment = ExperimentAssignment(
+            experiment_id=experiment_id,
+            assignee_type=assignee_type,
+            assignee_id=assignee_id,
+            start_date=_parse_datetime(data.get('start_date')),
+            due_date=_parse_datetime(data.get('due_date')),
+            max_attempts=max_attempts
+        )
+        
+        db.session.add(assignment)
+        db.session.flush()
+        refresh_visibility(assignee_students(assignee_type, assignee_id))
+        db.session.commit()
+        schedule_assignment(assignment)
+        
+        return jsonify({
+            'message': '实验分配成功',
+            'assignment': assignment.to_dict()
+        }), 201
+        
+    except ValueError:
+        db.session.rollback()
+        return jsonify({'message': '日期格式错误'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
+@assignments_bp.route('/<int:assignment_id>', methods=['DELETE'])
+@jwt_required()
+@teacher_required
+def delete_assignment(assignment_id):
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        assignment = load_one(ExperimentAssignment, assignment_id, 'assignment')
+        if not assignment:
+            return jsonify({'message': '分配不存在'}), 404
+        
+        if current_user.role != 'admin' and assignment.experiment.course.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        db.session.delete(assignment)
+        db.session.flush()
+        refresh_visibility(assignee_students(assignment.assignee_type, assignment.assignee_id))
+        db.session.commit()
+        
+        return jsonify({'message': '分配删除成功'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
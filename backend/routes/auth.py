@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required
 from werkzeug.security import generate_password_hash
 from app import db
 from models.user import User
+from utils.identity import identity_claims, get_current_user
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -19,7 +20,10 @@ def login():
         user = User.query.filter_by(username=username).first()
         
         if user and user.check_password(password) and user.is_active:
-            access_token = create_access_token(identity=user.id)
+            access_token = create_access_token(
+                identity=str(user.id),
+                additional_claims=identity_claims(user)
+            )
             return jsonify({
                 'access_token': access_token,
                 'user': user.to_dict()
@@ -73,8 +77,7 @@ def register():
 @jwt_required()
 def get_profile():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'message': '用户不存在'}), 404
@@ -88,8 +91,7 @@ def get_profile():
 @jwt_required()
 def change_password():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'message': '用户不存在'}), 404
@@ -1,10 +1,21 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
 from app import db
 from models.user import User
 from models.class_model import Class, StudentClass, ClassCourse
 from models.course import Course
 from utils.decorators import teacher_required, admin_required
+from utils.pagination import paginate, InvalidCursor
+from utils.search import apply_search
+from utils.identity import get_current_user_id, current_identity
+from utils.serializers import with_relations, load_one, serialize_class_detail
+from utils.enrollment import parse_student_refs, enroll_students
+from utils.gradebook import gradebook_matrix, gradebook_rows, POLICIES
+from utils.export import FORMATS, stream_query, export_response
+from utils.response_cache import versioned_response, invalidate_response
+from utils.visibility import class_students, refresh_visibility
 
 classes_bp = Blueprint('classes', __name__)
 
@@ -12,76 +23,72 @@ classes_bp = Blueprint('classes', __name__)
 @jwt_required()
 def get_classes():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         search = request.args.get('search')
         
-        query = Class.query
+        query = with_relations(Class.query, 'class')
         
         # 学生只能看到自己加入的班级
         if current_user.role == 'student':
-            enrolled_classes = db.session.query(StudentClass.class_id).filter_by(student_id=current_user_id).subquery()
+            enrolled_classes = select(StudentClass.class_id).where(StudentClass.student_id == current_user_id)
             query = query.filter(Class.id.in_(enrolled_classes))
         elif current_user.role == 'teacher':
             # 教师只能看到自己创建的班级
             query = query.filter(Class.teacher_id == current_user_id)
         
         if search:
-            query = query.filter(Class.name.contains(search))
+            query = apply_search(query, Class, search)
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        classes = [class_obj.to_dict() for class_obj in pagination.items]
-        
-        return jsonify({
-            'classes': classes,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+        return jsonify(paginate(query, 'classes', Class)), 200
         
+    except InvalidCursor:
+        return jsonify({'message': '无效的分页游标'}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+def _class_detail(class_id):
+    class_obj = load_one(Class, class_id, 'class_detail')
+    if not class_obj:
+        return None
+    return {'class': serialize_class_detail(class_obj)}
+
+def _class_version(class_id):
+    """详情内容的版本：班级本身（选课增删时学生人数和 updated_at 随之更新）、教师和学生的用户信息"""
+    teacher = aliased(User)
+    students_updated = db.session.query(func.max(User.updated_at)).join(
+        StudentClass, StudentClass.student_id == User.id
+    ).filter(StudentClass.class_id == Class.id).correlate(Class).scalar_subquery()
+    return db.session.query(
+        Class.teacher_id, Class.updated_at, Class.student_count, teacher.updated_at, students_updated
+    ).outerjoin(teacher, teacher.id == Class.teacher_id).filter(Class.id == class_id).first()
+
 @classes_bp.route('/<int:class_id>', methods=['GET'])
 @jwt_required()
 def get_class(class_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
-        class_obj = Class.query.get(class_id)
-        if not class_obj:
+        version = _class_version(class_id)
+        if not version:
             return jsonify({'message': '班级不存在'}), 404
         
-        # 权限检查
+        # 权限检查：学生按当前的选课记录，教师按当前的班级教师
         if current_user.role == 'student':
-            enrollment = StudentClass.query.filter_by(
-                student_id=current_user_id, 
-                class_id=class_id
+            enrolled = db.session.query(StudentClass.id).filter_by(
+                class_id=class_id, student_id=current_user_id
             ).first()
-            if not enrollment:
+            if not enrolled:
                 return jsonify({'message': '权限不足'}), 403
-        elif current_user.role == 'teacher' and class_obj.teacher_id != current_user_id:
+        elif current_user.role == 'teacher' and version.teacher_id != current_user_id:
             return jsonify({'message': '权限不足'}), 403
         
-        # 获取班级学生列表
-        students = []
-        for enrollment in class_obj.student_enrollments:
-            student_data = enrollment.student.to_dict()
-            student_data['enrolled_at'] = enrollment.enrolled_at.isoformat()
-            students.append(student_data)
-        
-        class_data = class_obj.to_dict()
-        class_data['students'] = students
-        
-        return jsonify({'class': class_data}), 200
+        response = versioned_response('class', class_id, version, lambda: _class_detail(class_id))
+        if response is None:
+            return jsonify({'message': '班级不存在'}), 404
+        return response
         
     except Exception as e:
         return jsonify({'message': str(e)}), 500
@@ -91,8 +98,8 @@ def get_class(class_id):
 @teacher_required
 def create_class():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         data = request.get_json()
         name = data.get('name')
@@ -129,8 +136,8 @@ def create_class():
 @teacher_required
 def add_student_to_class(class_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         class_obj = Class.query.get(class_id)
         if not class_obj:
@@ -165,7 +172,11 @@ def add_student_to_class(class_id):
         )
         
         db.session.add(enrollment)
+        Class.adjust_student_count(class_id, 1)
+        db.session.flush()
+        refresh_visibility([enrollment.student_id])
         db.session.commit()
+        invalidate_response('class', class_id)
         
         return jsonify({'message': '学生添加成功'}), 201
         
@@ -173,13 +184,52 @@ def add_student_to_class(class_id):
         db.session.rollback()
         return jsonify({'message': str(e)}), 500
 
+@classes_bp.route('/<int:class_id>/students/bulk', methods=['POST', 'PUT'])
+@jwt_required()
+@teacher_required
+def bulk_enroll_students(class_id):
+    """批量加入学生（POST），或按名单同步班级学生（PUT，移出名单外的学生）"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        class_obj = Class.query.get(class_id)
+        if not class_obj:
+            return jsonify({'message': '班级不存在'}), 404
+        
+        # 检查权限
+        if current_user.role != 'admin' and class_obj.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        refs = parse_student_refs(request)
+        sync = request.method == 'PUT'
+        if not refs and not sync:
+            return jsonify({'message': '学生列表不能为空'}), 400
+        
+        results, added, removed = enroll_students(class_id, refs, sync=sync)
+        refresh_visibility(result['student_id'] for result in results
+                           if result['status'] in ('added', 'removed'))
+        db.session.commit()
+        invalidate_response('class', class_id)
+        
+        return jsonify({
+            'message': '班级名单更新成功',
+            'added': added,
+            'removed': removed,
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
 @classes_bp.route('/<int:class_id>/join', methods=['POST'])
 @jwt_required()
 def join_class(class_id):
     """学生加入班级"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         if current_user.role != 'student':
             return jsonify({'message': '只有学生可以加入班级'}), 403
@@ -202,10 +252,209 @@ def join_class(class_id):
         )
         
         db.session.add(enrollment)
+        Class.adjust_student_count(class_id, 1)
+        db.session.flush()
+        refresh_visibility([enrollment.student_id])
         db.session.commit()
+        invalidate_response('class', class_id)
         
         return jsonify({'message': '加入班级成功'}), 201
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'message': str(e)}), 500
\ No newline at end of file
+        return jsonify({'message': str(e)}), 500
+
+@classes_bp.route('/<int:class_id>/courses', methods=['GET'])
+@jwt_required()
+def get_class_courses(class_id):
+    """班级关联的课程"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        class_obj = Class.query.get(class_id)
+        if not class_obj:
+            return jsonify({'message': '班级不存在'}), 404
+        
+        # 权限检查：班级教师、管理员或班级中的学生
+        if current_user.role == 'student':
+            if not StudentClass.query.filter_by(student_id=current_user_id, class_id=class_id).first():
+                return jsonify({'message': '权限不足'}), 403
+        elif current_user.role == 'teacher' and class_obj.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        courses = with_relations(Course.query, 'course').join(
+            ClassCourse, ClassCourse.course_id == Course.id
+        ).filter(ClassCourse.class_id == class_id).order_by(ClassCourse.assigned_at)
+        
+        return jsonify({'courses': [course.to_dict() for course in courses]}), 200
+        
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@classes_bp.route('/<int:class_id>/courses', methods=['POST'])
+@jwt_required()
+@teacher_required
+def add_course_to_class(class_id):
+    """为班级关联课程，班级学生随即可以看到课程及其中的实验"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        class_obj = Class.query.get(class_id)
+        if not class_obj:
+            return jsonify({'message': '班级不存在'}), 404
+        
+        data = request.get_json()
+        course_id = data.get('course_id')
+        
+        if not course_id:
+            return jsonify({'message': '课程ID不能为空'}), 400
+        
+        course = Course.query.get(course_id)
+        if not course:
+            return jsonify({'message': '课程不存在'}), 404
+        
+        # 教师只能把自己的课程关联到自己的班级
+        if current_user.role != 'admin' and (class_obj.teacher_id != current_user_id or
+                                             course.teacher_id != current_user_id):
+            return jsonify({'message': '权限不足'}), 403
+        
+        if ClassCourse.query.filter_by(class_id=class_id, course_id=course_id).first():
+            return jsonify({'message': '课程已关联到班级'}), 400
+        
+        db.session.add(ClassCourse(class_id=class_id, course_id=course_id))
+        db.session.flush()
+        refresh_visibility(class_students(class_id))
+        db.session.commit()
+        
+        return jsonify({'message': '课程关联成功'}), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
+@classes_bp.route('/<int:class_id>/courses/<int:course_id>', methods=['DELETE'])
+@jwt_required()
+@teacher_required
+def remove_course_from_class(class_id, course_id):
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        class_obj = Class.query.get(class_id)
+        if not class_obj:
+            return jsonify({'message': '班级不存在'}), 404
+        
+        # 检查权限
+        if current_user.role != 'admin' and class_obj.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        link = ClassCourse.query.filter_by(class_id=class_id, course_id=course_id).first()
+        if not link:
+            return jsonify({'message': '课程未关联到班级'}), 404
+        
+        db.session.delete(link)
+        db.session.flush()
+        refresh_visibility(class_students(class_id))
+        db.session.commit()
+        
+        return jsonify({'message': '已取消课程关联'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
+@classes_bp.route('/<int:class_id>/gradebook', methods=['GET'])
+@jwt_required()
+@teacher_required
+def get_class_gradebook(class_id):
+    """班级成绩册：班级学生 × 班级课程实验，policy 取 best/latest/average"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        class_obj = Class.query.get(class_id)
+        if not class_obj:
+            return jsonify({'message': '班级不存在'}), 404
+        
+        # 检查权限
+        if current_user.role != 'admin' and class_obj.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        policy = request.args.get('policy', 'best')
+        if policy not in POLICIES:
+            return jsonify({'message': '无效的成绩策略'}), 400
+        
+        gradebook = gradebook_matrix(policy, class_id=class_id)
+        gradebook['class_id'] = class_id
+        
+        return jsonify({'gradebook': gradebook}), 200
+        
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@classes_bp.route('/<int:class_id>/gradebook/export', methods=['GET'])
+@jwt_required()
+@teacher_required
+def export_class_gradebook(class_id):
+    """流式导出班级成绩册（format=csv|xlsx）"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        class_obj = Class.query.get(class_id)
+        if not class_obj:
+            return jsonify({'message': '班级不存在'}), 404
+        
+        # 检查权限
+        if current_user.role != 'admin' and class_obj.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        policy = request.args.get('policy', 'best')
+        fmt = request.args.get('format', 'csv')
+        if policy not in POLICIES:
+            return jsonify({'message': '无效的成绩策略'}), 400
+        if fmt not in FORMATS:
+            return jsonify({'message': '不支持的导出格式'}), 400
+        
+        experiments, rows = gradebook_rows(policy, class_id=class_id)
+        header = ['学生ID', '学生'] + [experiment.title for experiment in experiments]
+        
+        return export_response(fmt, 'class-%d-gradebook' % class_id, header, rows)
+        
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@classes_bp.route('/<int:class_id>/students/export', methods=['GET'])
+@jwt_required()
+@teacher_required
+def export_class_roster(class_id):
+    """流式导出班级花名册（format=csv|xlsx）"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        class_obj = Class.query.get(class_id)
+        if not class_obj:
+            return jsonify({'message': '班级不存在'}), 404
+        
+        # 检查权限
+        if current_user.role != 'admin' and class_obj.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        fmt = request.args.get('format', 'csv')
+        if fmt not in FORMATS:
+            return jsonify({'message': '不支持的导出格式'}), 400
+        
+        query = db.session.query(
+            User.id, User.username, User.email, User.is_active, StudentClass.enrolled_at
+        ).join(StudentClass, StudentClass.student_id == User.id).filter(
+            StudentClass.class_id == class_id
+        ).order_by(User.username)
+        
+        header = ['学生ID', '用户名', '邮箱', '是否启用', '加入时间']
+        return export_response(fmt, 'class-%d-roster' % class_id, header, stream_query(query))
+        
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
@@ -1,9 +1,18 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app import db
-from models.user import User
 from models.course import Course
+from models.user import User
+from models.experiment import Experiment
 from utils.decorators import teacher_required, admin_required
+from utils.pagination import paginate, InvalidCursor
+from utils.search import apply_search
+from utils.identity import get_current_user_id, current_identity
+from utils.serializers import with_relations, load_one
+from utils.response_cache import versioned_response, invalidate_response
+from utils.gradebook import gradebook_matrix, gradebook_rows, POLICIES
+from utils.export import FORMATS, export_response
+from utils.visibility import visible_course_ids, can_access_course, course_students, refresh_visibility
 
 courses_bp = Blueprint('courses', __name__)
 
@@ -11,60 +20,73 @@ courses_bp = Blueprint('courses', __name__)
 @jwt_required()
 def get_courses():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         search = request.args.get('search')
         teacher_id = request.args.get('teacher_id', type=int)
         
-        query = Course.query
+        query = with_relations(Course.query, 'course')
         
         # 学生只能看到自己班级的课程，教师只能看到自己的课程
         if current_user.role == 'student':
-            # TODO: 根据学生班级过滤课程
-            pass
+            query = query.filter(Course.id.in_(visible_course_ids(current_user_id)))
         elif current_user.role == 'teacher':
             query = query.filter(Course.teacher_id == current_user_id)
         
         if search:
-            query = query.filter(
-                (Course.name.contains(search)) |
-                (Course.code.contains(search))
-            )
+            query = apply_search(query, Course, search)
         
         if teacher_id and current_user.role == 'admin':
             query = query.filter(Course.teacher_id == teacher_id)
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        courses = [course.to_dict() for course in pagination.items]
-        
-        return jsonify({
-            'courses': courses,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+        return jsonify(paginate(query, 'courses', Course)), 200
         
+    except InvalidCursor:
+        return jsonify({'message': '无效的分页游标'}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+def _course_detail(course_id):
+    course = load_one(Course, course_id, 'course')
+    if not course:
+        return None
+    return {'course': course.to_dict()}
+
+def _course_version(course_id):
+    """详情内容的版本：课程本身和教师名称"""
+    return db.session.query(Course.updated_at, User.updated_at).outerjoin(
+        User, User.id == Course.teacher_id
+    ).filter(Course.id == course_id).first()
+
+def _invalidate_course(course_id, experiment_ids):
+    """使课程详情，以及包含课程名称的实验详情失效"""
+    invalidate_response('course', course_id)
+    invalidate_response('experiment', *experiment_ids)
+
+def _experiment_ids(course_id):
+    return [experiment_id for (experiment_id,) in
+            db.session.query(Experiment.id).filter(Experiment.course_id == course_id)]
+
 @courses_bp.route('/<int:course_id>', methods=['GET'])
 @jwt_required()
 def get_course(course_id):
     try:
-        course = Course.query.get(course_id)
-        if not course:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        version = _course_version(course_id)
+        if not version:
             return jsonify({'message': '课程不存在'}), 404
         
-        # TODO: 权限检查
+        # 学生只能查看自己可见的课程
+        if current_user.role == 'student' and not can_access_course(current_user_id, course_id):
+            return jsonify({'message': '权限不足'}), 403
         
-        return jsonify({'course': course.to_dict()}), 200
+        response = versioned_response('course', course_id, version, lambda: _course_detail(course_id))
+        if response is None:
+            return jsonify({'message': '课程不存在'}), 404
+        return response
         
     except Exception as e:
         return jsonify({'message': str(e)}), 500
@@ -74,8 +96,8 @@ def get_course(course_id):
 @teacher_required
 def create_course():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         data = request.get_json()
         name = data.get('name')
@@ -119,8 +141,8 @@ def create_course():
 @jwt_required()
 def update_course(course_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         course = Course.query.get(course_id)
         if not course:
@@ -153,6 +175,7 @@ def update_course(course_id):
             course.teacher_id = data['teacher_id']
         
         db.session.commit()
+        _invalidate_course(course_id, _experiment_ids(course_id))
         
         return jsonify({
             'message': '课程更新成功',
@@ -167,8 +190,8 @@ def update_course(course_id):
 @jwt_required()
 def delete_course(course_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         course = Course.query.get(course_id)
         if not course:
@@ -178,11 +201,77 @@ def delete_course(course_id):
         if current_user.role != 'admin' and course.teacher_id != current_user_id:
             return jsonify({'message': '权限不足'}), 403
         
+        experiment_ids = _experiment_ids(course_id)
+        student_ids = course_students(course_id)
         db.session.delete(course)
+        db.session.flush()
+        refresh_visibility(student_ids)
         db.session.commit()
+        _invalidate_course(course_id, experiment_ids)
         
         return jsonify({'message': '课程删除成功'}), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'message': str(e)}), 500
\ No newline at end of file
+        return jsonify({'message': str(e)}), 500
+
+@courses_bp.route('/<int:course_id>/gradebook', methods=['GET'])
+@jwt_required()
+@teacher_required
+def get_course_gradebook(course_id):
+    """课程成绩册：关联班级的学生 × 课程实验，policy 取 best/latest/average"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        course = Course.query.get(course_id)
+        if not course:
+            return jsonify({'message': '课程不存在'}), 404
+        
+        # 只有课程教师或管理员可以查看成绩册
+        if current_user.role != 'admin' and course.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        policy = request.args.get('policy', 'best')
+        if policy not in POLICIES:
+            return jsonify({'message': '无效的成绩策略'}), 400
+        
+        gradebook = gradebook_matrix(policy, course_id=course_id)
+        gradebook['course_id'] = course_id
+        
+        return jsonify({'gradebook': gradebook}), 200
+        
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@courses_bp.route('/<int:course_id>/gradebook/export', methods=['GET'])
+@jwt_required()
+@teacher_required
+def export_course_gradebook(course_id):
+    """流式导出课程成绩册（format=csv|xlsx）"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        course = Course.query.get(course_id)
+        if not course:
+            return jsonify({'message': '课程不存在'}), 404
+        
+        # 只有课程教师或管理员可以导出成绩册
+        if current_user.role != 'admin' and course.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        policy = request.args.get('policy', 'best')
+        fmt = request.args.get('format', 'csv')
+        if policy not in POLICIES:
+            return jsonify({'message': '无效的成绩策略'}), 400
+        if fmt not in FORMATS:
+            return jsonify({'message': '不支持的导出格式'}), 400
+        
+        experiments, rows = gradebook_rows(policy, course_id=course_id)
+        header = ['学生ID', '学生'] + [experiment.title for experiment in experiments]
+        
+        return export_response(fmt, '%s-gradebook' % course.code, header, rows)
+        
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
@@ -1,10 +1,19 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from sqlalchemy.orm import contains_eager
 from app import db
-from models.user import User
 from models.course import Course
 from models.experiment import Experiment, ExperimentStep, DataPoint
 from utils.decorators import teacher_required
+from utils.pagination import paginate, InvalidCursor
+from utils.search import apply_search
+from utils.identity import get_current_user_id, current_identity
+from utils.serializers import with_relations, load_one, serialize_experiment_detail
+from utils.statistics import experiment_statistics, DEFAULT_BINS
+from utils.response_cache import versioned_response, invalidate_response
+from utils.visibility import can_access_experiment, course_students, experiment_students, refresh_visibility
+from models.visibility import StudentExperimentAccess
+from utils.scopes import experiment_scope, apply_scope
 
 experiments_bp = Blueprint('experiments', __name__)
 
@@ -12,25 +21,19 @@ experiments_bp = Blueprint('experiments', __name__)
 @jwt_required()
 def get_experiments():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         course_id = request.args.get('course_id', type=int)
         status = request.args.get('status')
         search = request.args.get('search')
         
-        query = Experiment.query
+        query = with_relations(Experiment.query, 'experiment')
         
-        # 学生只能看到已发布的实验
+        # 学生只能看到分配给自己或所在班级课程中已发布的实验，教师只能看到自己课程的实验
+        query = apply_scope(query, Experiment.id, experiment_scope(current_user))
         if current_user.role == 'student':
             query = query.filter(Experiment.status.in_(['published', 'active']))
-        elif current_user.role == 'teacher':
-            # 教师只能看到自己课程的实验
-            teacher_courses = Course.query.filter_by(teacher_id=current_user_id).all()
-            course_ids = [course.id for course in teacher_courses]
-            query = query.filter(Experiment.course_id.in_(course_ids))
         
         if course_id:
             query = query.filter(Experiment.course_id == course_id)
@@ -39,44 +42,80 @@ def get_experiments():
             query = query.filter(Experiment.status == status)
         
         if search:
-            query = query.filter(Experiment.title.contains(search))
+            query = apply_search(query, Experiment, search)
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        return jsonify(paginate(query, 'experiments', Experiment)), 200
         
-        experiments = [experiment.to_dict() for experiment in pagination.items]
+    except InvalidCursor:
+        return jsonify({'message': '无效的分页游标'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@experiments_bp.route('/mine', methods=['GET'])
+@jwt_required()
+def get_my_experiments():
+    """学生的实验列表：分配给自己或所在班级课程中已发布的实验，附截止时间，按截止时间排序"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
-        return jsonify({
-            'experiments': experiments,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+        if current_user.role != 'student':
+            return jsonify({'message': '只有学生可以查看'}), 403
+        
+        access = StudentExperimentAccess
+        query = access.query.join(Experiment, Experiment.id == access.experiment_id).filter(
+            access.student_id == current_user_id,
+            Experiment.status.in_(['published', 'active'])
+        ).options(contains_eager(access.experiment).joinedload(Experiment.course))
+        
+        if request.args.get('assigned', type=int) == 1:
+            query = query.filter(access.assigned.is_(True))
+        
+        course_id = request.args.get('course_id', type=int)
+        if course_id:
+            query = query.filter(access.course_id == course_id)
+        
+        # 有截止时间的在前，最早截止的排最前
+        query = query.order_by(access.due_date.is_(None), access.due_date, access.experiment_id)
         
+        return jsonify(paginate(query, 'experiments', access, sort_column=access.experiment_id)), 200
+        
+    except InvalidCursor:
+        return jsonify({'message': '无效的分页游标'}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+def _experiment_detail(experiment_id):
+    experiment = load_one(Experiment, experiment_id, 'experiment_detail')
+    if not experiment:
+        return None
+    return {'experiment': serialize_experiment_detail(experiment)}
+
+def _experiment_version(experiment_id):
+    """详情内容的版本：实验本身、步骤和数据点的计数（只能新增，计数变化时 updated_at 也会更新）和课程名称"""
+    return db.session.query(
+        Experiment.updated_at, Experiment.steps_count, Experiment.data_points_count, Course.updated_at
+    ).outerjoin(Course, Course.id == Experiment.course_id).filter(Experiment.id == experiment_id).first()
+
 @experiments_bp.route('/<int:experiment_id>', methods=['GET'])
 @jwt_required()
 def get_experiment(experiment_id):
     try:
-        experiment = Experiment.query.get(experiment_id)
-        if not experiment:
-            return jsonify({'message': '实验不存在'}), 404
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
-        # TODO: 权限检查
-        
-        # 获取实验步骤和数据点
-        steps = [step.to_dict() for step in experiment.steps]
-        data_points = [dp.to_dict() for dp in experiment.data_points]
+        version = _experiment_version(experiment_id)
+        if not version:
+            return jsonify({'message': '实验不存在'}), 404
         
-        experiment_data = experiment.to_dict()
-        experiment_data['steps'] = steps
-        experiment_data['data_points'] = data_points
+        # 学生只能查看自己可见的实验
+        if current_user.role == 'student' and not can_access_experiment(current_user_id, experiment_id):
+            return jsonify({'message': '权限不足'}), 403
         
-        return jsonify({'experiment': experiment_data}), 200
+        response = versioned_response('experiment', experiment_id, version, lambda: _experiment_detail(experiment_id))
+        if response is None:
+            return jsonify({'message': '实验不存在'}), 404
+        return response
         
     except Exception as e:
         return jsonify({'message': str(e)}), 500
@@ -86,8 +125,8 @@ def get_experiment(experiment_id):
 @teacher_required
 def create_experiment():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         data = request.get_json()
         title = data.get('title')
@@ -120,6 +159,9 @@ def create_experiment():
         )
         
         db.session.add(experiment)
+        db.session.flush()
+        # 能看到该课程的学生随之能看到新实验
+        refresh_visibility(course_students(course_id))
         db.session.commit()
         
         return jsonify({
@@ -136,8 +178,8 @@ def create_experiment():
 @teacher_required
 def update_experiment(experiment_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         experiment = Experiment.query.get(experiment_id)
         if not experiment:
@@ -161,10 +203,17 @@ def update_experiment(experiment_id):
             experiment.requirements = data['requirements']
         if 'max_score' in data:
             experiment.max_score = data['max_score']
+        status_changed = 'status' in data and data['status'] != experiment.status
         if 'status' in data:
             experiment.status = data['status']
         
+        # 发布或取消发布后重建相关学生的可见性索引
+        if status_changed:
+            db.session.flush()
+            refresh_visibility(experiment_students(experiment_id))
+        
         db.session.commit()
+        invalidate_response('experiment', experiment_id)
         
         return jsonify({
             'message': '实验更新成功',
@@ -180,8 +229,8 @@ def update_experiment(experiment_id):
 @teacher_required
 def add_experiment_step(experiment_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         experiment = Experiment.query.get(experiment_id)
         if not experiment:
@@ -211,7 +260,9 @@ def add_experiment_step(experiment_id):
         )
         
         db.session.add(step)
+        Experiment.adjust_counts(experiment_id, steps=1)
         db.session.commit()
+        invalidate_response('experiment', experiment_id)
         
         return jsonify({
             'message': '实验步骤添加成功',
@@ -227,8 +278,8 @@ def add_experiment_step(experiment_id):
 @teacher_required
 def add_data_point(experiment_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         experiment = Experiment.query.get(experiment_id)
         if not experiment:
@@ -260,7 +311,9 @@ def add_data_point(experiment_id):
         )
         
         db.session.add(data_point)
+        Experiment.adjust_counts(experiment_id, data_points=1)
         db.session.commit()
+        invalidate_response('experiment', experiment_id)
         
         return jsonify({
             'message': '数据点添加成功',
@@ -269,4 +322,33 @@ def add_data_point(experiment_id):
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'message': str(e)}), 500
\ No newline at end of file
+        return jsonify({'message': str(e)}), 500
+
+@experiments_bp.route('/<int:experiment_id>/statistics', methods=['GET'])
+@jwt_required()
+@teacher_required
+def get_experiment_statistics(experiment_id):
+    """实验数值型数据点的班级分布统计"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        experiment = Experiment.query.get(experiment_id)
+        if not experiment:
+            return jsonify({'message': '实验不存在'}), 404
+        
+        # 检查权限
+        if current_user.role != 'admin' and experiment.course.teacher_id != current_user_id:
+            return jsonify({'message': '权限不足'}), 403
+        
+        include_drafts = request.args.get('include_drafts', 0, type=int) == 1
+        bins = request.args.get('bins', DEFAULT_BINS, type=int)
+        if bins < 1 or bins > 100:
+            return jsonify({'message': '分组数需在 1 到 100 之间'}), 400
+        
+        statistics = experiment_statistics(experiment_id, include_drafts=include_drafts, bins=bins)
+        
+        return jsonify({'statistics': statistics}), 200
+        
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
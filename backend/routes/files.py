@@ -0,0 +1,164 @@
+from flask import Blueprint, request, jsonify, send_file, current_app
+from flask_jwt_extended import jwt_required
+from app import db
+from models.file import UploadSession
+from utils.identity import get_current_user_id, current_identity
+from utils.files import (
+    UploadError, blob_path, find_blob, create_upload, parse_content_range,
+    write_chunk, complete_upload, cancel_upload, can_download
+)
+
+files_bp = Blueprint('files', __name__)
+
+def _own_upload(upload_id, current_user_id):
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or upload.owner_id != current_user_id:
+        return None
+    return upload
+
+def _upload_response(upload, code, message=None):
+    upload_data = upload.to_dict()
+    upload_data['chunk_size'] = current_app.config['UPLOAD_CHUNK_SIZE']
+    result = {'complete': False, 'upload': upload_data}
+    if message:
+        result['message'] = message
+    return jsonify(result), code
+
+@files_bp.route('/uploads', methods=['POST'])
+@jwt_required()
+def start_upload():
+    """开始分块上传；声明的 sha256 已存在时直接返回文件，不需要再传内容"""
+    try:
+        current_user_id = get_current_user_id()
+        
+        data = request.get_json()
+        blob, upload = create_upload(
+            current_user_id,
+            data.get('filename'),
+            data.get('size'),
+            content_type=data.get('content_type'),
+            sha256=data.get('sha256')
+        )
+        
+        if blob is not None:
+            return jsonify({'complete': True, 'file': blob.to_dict()}), 200
+        
+        db.session.commit()
+        
+        # 空文件无需上传分块
+        if upload.total_size == 0:
+            return jsonify({'complete': True, 'file': complete_upload(upload).to_dict()}), 201
+        
+        return _upload_response(upload, 201)
+        
+    except UploadError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
+@files_bp.route('/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload(upload_id):
+    """查询上传进度，客户端从返回的 offset 继续上传"""
+    try:
+        current_user_id = get_current_user_id()
+        
+        upload = _own_upload(upload_id, current_user_id)
+        if not upload:
+            return jsonify({'message': '上传不存在'}), 404
+        
+        return _upload_response(upload, 200)
+        
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@files_bp.route('/uploads/<upload_id>', methods=['PUT'])
+@jwt_required()
+def upload_chunk(upload_id):
+    """上传一个分块：请求体为原始字节，Content-Range 指明位置（缺省为当前偏移）"""
+    try:
+        current_user_id = get_current_user_id()
+        
+        upload = _own_upload(upload_id, current_user_id)
+        if not upload:
+            return jsonify({'message': '上传不存在'}), 404
+        
+        if request.content_length is not None and request.content_length > current_app.config['UPLOAD_CHUNK_SIZE']:
+            return jsonify({'message': '分块大小超过限制'}), 413
+        
+        start, end = parse_content_range(request.headers.get('Content-Range'), upload, request.content_length)
+        try:
+            write_chunk(upload, start, end, request.stream)
+        except UploadError as e:
+            # 偏移不匹配时返回当前进度，客户端从该偏移续传
+            if e.status != 409:
+                raise
+            db.session.refresh(upload)
+            return _upload_response(upload, 409, str(e))
+        
+        if upload.received == upload.total_size:
+            blob = complete_upload(upload)
+            return jsonify({'complete': True, 'file': blob.to_dict()}), 201
+        
+        return _upload_response(upload, 200)
+        
+    except UploadError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
+@files_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def delete_upload(upload_id):
+    """取消上传并删除临时文件"""
+    try:
+        current_user_id = get_current_user_id()
+        
+        upload = _own_upload(upload_id, current_user_id)
+        if not upload:
+            return jsonify({'message': '上传不存在'}), 404
+        
+        cancel_upload(upload)
+        db.session.commit()
+        
+        return jsonify({'message': '上传已取消'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
+@files_bp.route('/<sha256>', methods=['GET'])
+@jwt_required()
+def download_file(sha256):
+    """下载文件：send_file 直接发送磁盘文件，支持 Range 和 ETag/If-Modified-Since 条件请求"""
+    try:
+        current_user = current_identity()
+        
+        blob = find_blob(sha256.lower())
+        if not blob:
+            return jsonify({'message': '文件不存在'}), 404
+        
+        if not can_download(blob, current_user):
+            return jsonify({'message': '权限不足'}), 403
+        
+        # 内容由摘要决定，永不改变，可以长期缓存
+        response = send_file(
+            blob_path(blob.sha256),
+            mimetype=blob.content_type or 'application/octet-stream',
+            as_attachment=True,
+            download_name=request.args.get('filename') or blob.sha256,
+            conditional=True,
+            etag=blob.sha256,
+            max_age=365 * 24 * 3600
+        )
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.cache_control.immutable = True
+        return response
+        
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
@@ -0,0 +1,25 @@
+from flask import Blueprint, jsonify
+from sqlalchemy import text
+from app import db
+from utils.lifecycle import is_draining
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/live', methods=['GET'])
+def liveness():
+    """存活检查：进程能处理请求即可，不访问数据库，避免数据库故障导致进程被反复重启"""
+    return jsonify({'status': 'ok'}), 200
+
+@health_bp.route('/ready', methods=['GET'])
+def readiness():
+    """就绪检查：数据库可用且进程未处于排空状态时才接收流量"""
+    if is_draining():
+        return jsonify({'status': 'draining'}), 503
+    
+    try:
+        db.session.execute(text('SELECT 1'))
+        return jsonify({'status': 'ok', 'database': 'ok'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'unavailable', 'database': str(e)}), 503
@@ -1,59 +1,114 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+import math
 from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.orm import aliased
 from app import db
 from models.user import User
+from models.course import Course
 from models.experiment import Experiment
-from models.submission import Submission
+from models.submission import Submission, SubmissionRevision
 from utils.decorators import teacher_required
+from utils.pagination import paginate, InvalidCursor
+from utils.identity import get_current_user_id, current_identity
+from utils.serializers import with_relations, load_one
+from utils.data_values import store_data_values
+from utils.statistics import invalidate_experiment_statistics
+from utils.gradebook import refresh_entries
+from utils.export import FORMATS, stream_query, export_response
+from utils.files import UploadError, parse_file_refs, attach_files
+from utils.attempts import allocate_attempt, max_attempts_for, AttemptLimitReached
+from utils.visibility import can_access_experiment
+from utils.scopes import submission_scope, can_manage_experiment
+from utils.scheduler import deadline_passed
+from utils.json_patch import JsonPatchError
+from utils.revisions import (
+    document_of, record_revision, rebuild, diff_versions, RevisionNotFound
+)
+from utils.autosave import (
+    autosave, flush_draft, DraftNotFound, DraftForbidden, DraftLocked, DraftConflict
+)
 
 submissions_bp = Blueprint('submissions', __name__)
 
+# 分数校验失败的原因，批量批改时作为单项结果返回
+SCORE_ERRORS = {'invalid_score': '分数必须是数字', 'out_of_range': '分数超出范围'}
+
+def _score_error(score, max_score):
+    """校验分数：不是数字或超出 0 到实验满分时返回 SCORE_ERRORS 中的原因，否则返回 None"""
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or not math.isfinite(score):
+        return 'invalid_score'
+    if score < 0 or (max_score is not None and score > max_score):
+        return 'out_of_range'
+    return None
+
+def _filter_submissions(query, current_user_id, current_user):
+    """按当前用户角色和请求参数过滤提交，列表与导出共用"""
+    experiment_id = request.args.get('experiment_id', type=int)
+    student_id = request.args.get('student_id', type=int)
+    status = request.args.get('status')
+    
+    # 学生只能看到自己的提交，教师只能看到自己课程实验的提交
+    scope = submission_scope(current_user)
+    if scope is not None:
+        query = query.filter(scope)
+    
+    if experiment_id:
+        query = query.filter(Submission.experiment_id == experiment_id)
+    
+    if student_id and current_user.role in ['admin', 'teacher']:
+        query = query.filter(Submission.student_id == student_id)
+    
+    if status:
+        query = query.filter(Submission.status == status)
+    
+    return query
+
 @submissions_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_submissions():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        experiment_id = request.args.get('experiment_id', type=int)
-        student_id = request.args.get('student_id', type=int)
-        status = request.args.get('status')
-        
-        query = Submission.query
-        
-        # 学生只能看到自己的提交
-        if current_user.role == 'student':
-            query = query.filter(Submission.student_id == current_user_id)
-        elif current_user.role == 'teacher':
-            # 教师只能看到自己课程实验的提交
-            # TODO: 根据教师的课程过滤
-            pass
-        
-        if experiment_id:
-            query = query.filter(Submission.experiment_id == experiment_id)
-        
-        if student_id and current_user.role in ['admin', 'teacher']:
-            query = query.filter(Submission.student_id == student_id)
-        
-        if status:
-            query = query.filter(Submission.status == status)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        query = _filter_submissions(with_relations(Submission.query, 'submission'), current_user_id, current_user)
         
-        submissions = [submission.to_dict() for submission in pagination.items]
+        return jsonify(paginate(query, 'submissions', Submission)), 200
         
-        return jsonify({
-            'submissions': submissions,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+    except InvalidCursor:
+        return jsonify({'message': '无效的分页游标'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@submissions_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_submissions():
+    """流式导出提交列表（format=csv|xlsx），过滤参数与列表接口相同"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        fmt = request.args.get('format', 'csv')
+        if fmt not in FORMATS:
+            return jsonify({'message': '不支持的导出格式'}), 400
+        
+        # 只选择导出列，不构造 ORM 对象
+        student = aliased(User)
+        grader = aliased(User)
+        query = db.session.query(
+            Submission.id, Submission.experiment_id, Experiment.title,
+            Submission.student_id, student.username, Submission.attempt_number,
+            Submission.status, Submission.score, grader.username,
+            Submission.submitted_at, Submission.graded_at, Submission.created_at
+        ).join(Experiment, Submission.experiment_id == Experiment.id).join(
+            student, Submission.student_id == student.id
+        ).outerjoin(grader, Submission.graded_by == grader.id)
+        query = _filter_submissions(query, current_user_id, current_user).order_by(Submission.id)
+        
+        header = ['提交ID', '实验ID', '实验名称', '学生ID', '学生', '尝试次数',
+                  '状态', '分数', '批改人', '提交时间', '批改时间', '创建时间']
+        return export_response(fmt, 'submissions', header, stream_query(query))
         
     except Exception as e:
         return jsonify({'message': str(e)}), 500
@@ -62,19 +117,19 @@ def get_submissions():
 @jwt_required()
 def get_submission(submission_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
-        submission = Submission.query.get(submission_id)
+        flush_draft(submission_id)
+        submission = load_one(Submission, submission_id, 'submission')
         if not submission:
             return jsonify({'message': '提交不存在'}), 404
         
         # 权限检查：学生只能看自己的提交，教师可以看自己课程的提交
         if current_user.role == 'student' and submission.student_id != current_user_id:
             return jsonify({'message': '权限不足'}), 403
-        elif current_user.role == 'teacher':
-            # TODO: 检查是否是教师的课程
-            pass
+        elif current_user.role == 'teacher' and not can_manage_experiment(current_user, submission.experiment_id):
+            return jsonify({'message': '权限不足'}), 403
         
         return jsonify({'submission': submission.to_dict()}), 200
         
@@ -85,8 +140,8 @@ def get_submission(submission_id):
 @jwt_required()
 def create_submission():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         if current_user.role != 'student':
             return jsonify({'message': '只有学生可以提交实验'}), 403
@@ -95,7 +150,7 @@ def create_submission():
         experiment_id = data.get('experiment_id')
         content = data.get('content', '')
         data_values = data.get('data_values', '')
-        files = data.get('files', '')
+        file_refs = parse_file_refs(data.get('files'))
         
         if not experiment_id:
             return jsonify({'message': '实验ID不能为空'}), 400
@@ -105,15 +160,22 @@ def create_submission():
         if not experiment:
             return jsonify({'message': '实验不存在'}), 404
         
-        # 检查是否有权限提交（TODO: 检查实验分配）
+        # 只能提交被分配或所在班级课程中的实验
+        if not can_access_experiment(current_user_id, experiment_id):
+            return jsonify({'message': '没有该实验的访问权限'}), 403
         
-        # 获取当前提交次数
-        existing_submissions = Submission.query.filter_by(
-            experiment_id=experiment_id,
-            student_id=current_user_id
-        ).count()
+        # 分配给该学生的都已截止时不能再开始新的尝试
+        if deadline_passed(experiment_id, current_user_id):
+            return jsonify({'message': '已过截止时间'}), 400
         
-        attempt_number = existing_submissions + 1
+        # 原子地分配尝试次数，并按实验分配的 max_attempts 限制提交次数
+        try:
+            attempt_number = allocate_attempt(
+                experiment_id, current_user_id, max_attempts_for(experiment_id, current_user_id)
+            )
+        except AttemptLimitReached:
+            db.session.rollback()
+            return jsonify({'message': '已达到最大提交次数'}), 400
         
         submission = Submission(
             experiment_id=experiment_id,
@@ -121,18 +183,26 @@ def create_submission():
             attempt_number=attempt_number,
             content=content,
             data_values=data_values,
-            files=files,
             status='draft'
         )
         
         db.session.add(submission)
+        store_data_values(submission)
+        attach_files(submission, file_refs)
+        db.session.flush()
+        record_revision(submission.id, submission.version or 0,
+                        document_of(content, data_values), author_id=current_user_id)
         db.session.commit()
+        invalidate_experiment_statistics(experiment_id)
         
         return jsonify({
             'message': '实验提交创建成功',
             'submission': submission.to_dict()
         }), 201
         
+    except UploadError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': str(e)}), 500
@@ -141,9 +211,10 @@ def create_submission():
 @jwt_required()
 def update_submission(submission_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
+        flush_draft(submission_id)
         submission = Submission.query.get(submission_id)
         if not submission:
             return jsonify({'message': '提交不存在'}), 404
@@ -156,25 +227,47 @@ def update_submission(submission_id):
             # 已批改的提交不能修改
             if submission.status == 'graded':
                 return jsonify({'message': '已批改的提交不能修改'}), 400
+            # 分配截止后未提交的草稿已被锁定
+            if submission.status == 'locked':
+                return jsonify({'message': '已过截止时间，提交已锁定'}), 400
+            # 已提交的不会被锁定，截止后同样不能再修改
+            if deadline_passed(submission.experiment_id, current_user_id):
+                return jsonify({'message': '已过截止时间'}), 400
         
         data = request.get_json()
         
         # 学生更新提交内容
         if current_user.role == 'student':
+            # 带上 version 时检查是否基于最新版本修改
+            if 'version' in data and data['version'] != submission.version:
+                return jsonify({'message': '提交已被修改', 'version': submission.version}), 409
+            previous = (submission.version or 0, document_of(submission.content, submission.data_values))
+            if any(field in data for field in ('content', 'data_values', 'files')):
+                submission.version = (submission.version or 0) + 1
             if 'content' in data:
                 submission.content = data['content']
             if 'data_values' in data:
                 submission.data_values = data['data_values']
+                store_data_values(submission)
             if 'files' in data:
-                submission.files = data['files']
+                attach_files(submission, parse_file_refs(data['files']))
             if 'status' in data and data['status'] in ['draft', 'submitted']:
                 submission.status = data['status']
                 if data['status'] == 'submitted':
                     submission.submitted_at = datetime.utcnow()
+            if submission.version != previous[0]:
+                record_revision(submission.id, submission.version,
+                                document_of(submission.content, submission.data_values),
+                                previous=previous, author_id=current_user_id)
         
-        # 教师批改
+        # 教师批改：只能批改自己课程实验的提交
         elif current_user.role in ['admin', 'teacher']:
+            if not can_manage_experiment(current_user, submission.experiment_id):
+                return jsonify({'message': '权限不足'}), 403
             if 'score' in data:
+                error = data['score'] is not None and _score_error(data['score'], submission.experiment.max_score)
+                if error:
+                    return jsonify({'message': SCORE_ERRORS[error]}), 400
                 submission.score = data['score']
             if 'feedback' in data:
                 submission.feedback = data['feedback']
@@ -182,31 +275,166 @@ def update_submission(submission_id):
                 submission.status = 'graded'
                 submission.graded_by = current_user_id
                 submission.graded_at = datetime.utcnow()
+            
+            # 分数或批改状态变化时增量刷新该学生在该实验上的成绩册单元格
+            if 'score' in data or 'status' in data:
+                refresh_entries([(submission.student_id, submission.experiment_id)])
         
         db.session.commit()
+        invalidate_experiment_statistics(submission.experiment_id)
         
         return jsonify({
             'message': '提交更新成功',
             'submission': submission.to_dict()
         }), 200
         
+    except UploadError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
+@submissions_bp.route('/<int:submission_id>/autosave', methods=['PATCH'])
+@jwt_required()
+def autosave_submission(submission_id):
+    """草稿自动保存：请求体为 {"base_version": n, "patch": [JSON Patch 操作]}
+
+    patch 作用于 {"content": ..., "data_values": ...}；每次保存插入一行补丁，按间隔合并写入提交。
+    base_version 不是当前版本时返回 409 和当前文档，由客户端合并后重试；
+    草稿开始后提交被整体修改过时还返回尚未写入的草稿 draft。
+    """
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        if current_user.role != 'student':
+            return jsonify({'message': '只有学生可以保存草稿'}), 403
+        
+        data = request.get_json()
+        base_version = data.get('base_version')
+        patch = data.get('patch')
+        
+        if not isinstance(base_version, int) or isinstance(base_version, bool) or not patch:
+            return jsonify({'message': 'base_version 和 patch 不能为空'}), 400
+        
+        version = autosave(submission_id, current_user_id, base_version, patch)
+        
+        return jsonify({'message': '草稿已保存', 'version': version}), 200
+        
+    except DraftNotFound:
+        return jsonify({'message': '提交不存在'}), 404
+    except DraftForbidden:
+        return jsonify({'message': '权限不足'}), 403
+    except DraftLocked:
+        return jsonify({'message': '已批改或已截止的提交不能修改'}), 400
+    except DraftConflict as e:
+        body = {'message': '版本冲突', 'version': e.version, 'document': e.document}
+        if e.draft is not None:
+            body['draft'] = e.draft
+        return jsonify(body), 409
+    except (JsonPatchError, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': str(e)}), 500
 
+def _revision_access(submission_id):
+    """查看历史版本前的检查，返回 (错误响应, 状态码)，可以查看时返回 None"""
+    current_user_id = get_current_user_id()
+    current_user = current_identity()
+    
+    flush_draft(submission_id)
+    row = db.session.query(Submission.student_id, Submission.experiment_id).filter(
+        Submission.id == submission_id
+    ).first()
+    if row is None:
+        return jsonify({'message': '提交不存在'}), 404
+    
+    # 权限检查：学生只能看自己的提交，教师可以看自己课程的提交
+    if current_user.role == 'student' and row.student_id != current_user_id:
+        return jsonify({'message': '权限不足'}), 403
+    elif current_user.role == 'teacher' and not can_manage_experiment(current_user, row.experiment_id):
+        return jsonify({'message': '权限不足'}), 403
+    return None
+
+@submissions_bp.route('/<int:submission_id>/versions', methods=['GET'])
+@jwt_required()
+def get_submission_versions(submission_id):
+    """历史版本列表（新的在前），不包含内容"""
+    try:
+        denied = _revision_access(submission_id)
+        if denied:
+            return denied
+        
+        query = SubmissionRevision.query.filter(
+            SubmissionRevision.submission_id == submission_id
+        ).order_by(SubmissionRevision.version.desc())
+        
+        return jsonify(paginate(query, 'versions', SubmissionRevision,
+                                sort_column=SubmissionRevision.version)), 200
+        
+    except InvalidCursor:
+        return jsonify({'message': '无效的分页游标'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@submissions_bp.route('/<int:submission_id>/versions/<int:version>', methods=['GET'])
+@jwt_required()
+def get_submission_version(submission_id, version):
+    try:
+        denied = _revision_access(submission_id)
+        if denied:
+            return denied
+        
+        document = rebuild(submission_id, version)
+        
+        return jsonify({'version': version, **document}), 200
+        
+    except RevisionNotFound:
+        return jsonify({'message': '版本不存在'}), 404
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@submissions_bp.route('/<int:submission_id>/versions/diff', methods=['GET'])
+@jwt_required()
+def diff_submission_versions(submission_id):
+    """两个版本之间的差异：?from=旧版本&to=新版本，结果为每个字段的 unified diff 行"""
+    try:
+        from_version = request.args.get('from', type=int)
+        to_version = request.args.get('to', type=int)
+        if from_version is None or to_version is None:
+            return jsonify({'message': 'from 和 to 不能为空'}), 400
+        
+        denied = _revision_access(submission_id)
+        if denied:
+            return denied
+        
+        diff = diff_versions(submission_id, from_version, to_version)
+        
+        return jsonify({'from': from_version, 'to': to_version, 'diff': diff}), 200
+        
+    except RevisionNotFound:
+        return jsonify({'message': '版本不存在'}), 404
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
 @submissions_bp.route('/<int:submission_id>/grade', methods=['POST'])
 @jwt_required()
 @teacher_required
 def grade_submission(submission_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
+        flush_draft(submission_id)
         submission = Submission.query.get(submission_id)
         if not submission:
             return jsonify({'message': '提交不存在'}), 404
         
-        # 检查权限：TODO 检查是否是教师的课程
+        # 检查权限：只能批改自己课程实验的提交
+        if not can_manage_experiment(current_user, submission.experiment_id):
+            return jsonify({'message': '权限不足'}), 403
         
         data = request.get_json()
         score = data.get('score')
@@ -215,13 +443,19 @@ def grade_submission(submission_id):
         if score is None:
             return jsonify({'message': '分数不能为空'}), 400
         
+        error = _score_error(score, submission.experiment.max_score)
+        if error:
+            return jsonify({'message': SCORE_ERRORS[error]}), 400
+        
         submission.score = score
         submission.feedback = feedback
         submission.status = 'graded'
         submission.graded_by = current_user_id
         submission.graded_at = datetime.utcnow()
+        refresh_entries([(submission.student_id, submission.experiment_id)])
         
         db.session.commit()
+        invalidate_experiment_statistics(submission.experiment_id)
         
         return jsonify({
             'message': '批改完成',
@@ -230,4 +464,87 @@ def grade_submission(submission_id):
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'message': str(e)}), 500
\ No newline at end of file
+        return jsonify({'message': str(e)}), 500
+
+@submissions_bp.route('/grade/batch', methods=['POST'])
+@jwt_required()
+@teacher_required
+def batch_grade_submissions():
+    """批量批改：一次权限检查、一次分数校验，在单个事务中批量更新"""
+    try:
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
+        
+        data = request.get_json()
+        items = data.get('grades') if isinstance(data, dict) else data
+        
+        if not items:
+            return jsonify({'message': '批改列表不能为空'}), 400
+        
+        # 每项必须带整数的 submission_id，格式错误时整批拒绝
+        if not isinstance(items, list) or not all(
+            isinstance(item, dict) and isinstance(item.get('submission_id'), int)
+            and not isinstance(item.get('submission_id'), bool) for item in items
+        ):
+            return jsonify({'message': '批改项格式无效'}), 400
+        
+        submission_ids = {item['submission_id'] for item in items}
+        for submission_id in submission_ids:
+            flush_draft(submission_id)
+        
+        # 一次查询取出所有提交的实验满分和课程教师
+        rows = db.session.query(
+            Submission.id, Submission.experiment_id, Submission.student_id, Experiment.max_score, Course.teacher_id
+        ).join(Experiment, Submission.experiment_id == Experiment.id).join(
+            Course, Experiment.course_id == Course.id
+        ).filter(Submission.id.in_(submission_ids)).all()
+        targets = {row.id: row for row in rows}
+        
+        now = datetime.utcnow()
+        results = []
+        updates = []
+        seen = set()
+        for item in items:
+            submission_id = item['submission_id']
+            score = item.get('score')
+            target = targets.get(submission_id)
+            
+            if target is None:
+                status = 'not_found'
+            elif submission_id in seen:
+                status = 'duplicate'
+            elif current_user.role != 'admin' and target.teacher_id != current_user_id:
+                status = 'forbidden'
+            else:
+                status = _score_error(score, target.max_score) or 'graded'
+            
+            if status == 'graded':
+                seen.add(submission_id)
+                updates.append({
+                    'id': submission_id,
+                    'score': score,
+                    'feedback': item.get('feedback', ''),
+                    'status': 'graded',
+                    'graded_by': current_user_id,
+                    'graded_at': now
+                })
+            results.append({'submission_id': submission_id, 'status': status})
+        
+        if updates:
+            # 按主键的批量 UPDATE（executemany），单个事务提交
+            db.session.execute(update(Submission), updates)
+            refresh_entries((targets[item['id']].student_id, targets[item['id']].experiment_id) for item in updates)
+            db.session.commit()
+            for experiment_id in {targets[item['id']].experiment_id for item in updates}:
+                invalidate_experiment_statistics(experiment_id)
+        
+        return jsonify({
+            'message': '批量批改完成',
+            'graded': len(updates),
+            'failed': len(items) - len(updates),
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
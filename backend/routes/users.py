@@ -1,9 +1,14 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required
 from werkzeug.security import generate_password_hash
 from app import db
 from models.user import User
 from utils.decorators import admin_required
+from utils.pagination import paginate, InvalidCursor
+from utils.search import apply_search
+from utils.user_import import parse_user_rows, import_users
+from utils.identity import get_current_user_id, current_identity, invalidate_identity
 
 users_bp = Blueprint('users', __name__)
 
@@ -12,8 +17,6 @@ users_bp = Blueprint('users', __name__)
 @admin_required
 def get_users():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         role = request.args.get('role')
         search = request.args.get('search')
         
@@ -23,25 +26,12 @@ def get_users():
             query = query.filter(User.role == role)
         
         if search:
-            query = query.filter(
-                (User.username.contains(search)) |
-                (User.email.contains(search))
-            )
+            query = apply_search(query, User, search)
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        users = [user.to_dict() for user in pagination.items]
-        
-        return jsonify({
-            'users': users,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+        return jsonify(paginate(query, 'users', User)), 200
         
+    except InvalidCursor:
+        return jsonify({'message': '无效的分页游标'}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -49,8 +39,8 @@ def get_users():
 @jwt_required()
 def get_user(user_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         # 只有管理员或用户本人可以查看用户详情
         if current_user.role != 'admin' and current_user_id != user_id:
@@ -106,12 +96,38 @@ def create_user():
         db.session.rollback()
         return jsonify({'message': str(e)}), 500
 
+@users_bp.route('/import', methods=['POST'])
+@jwt_required()
+@admin_required
+def bulk_import_users():
+    """批量导入用户（JSON 或 CSV），stream=1 时以 NDJSON 逐批返回进度"""
+    try:
+        rows = parse_user_rows(request)
+        if not rows:
+            return jsonify({'message': '导入数据不能为空'}), 400
+        
+        if request.args.get('stream', 0, type=int) == 1:
+            events = (json.dumps(event, ensure_ascii=False) + '\n' for event in import_users(rows))
+            return Response(stream_with_context(events), mimetype='application/x-ndjson')
+        
+        summary = None
+        for event in import_users(rows):
+            summary = event
+        summary.pop('type')
+        summary['message'] = '用户导入完成'
+        
+        return jsonify(summary), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
 @users_bp.route('/<int:user_id>', methods=['PUT'])
 @jwt_required()
 def update_user(user_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_user = current_identity()
         
         # 只有管理员或用户本人可以更新用户信息
         if current_user.role != 'admin' and current_user_id != user_id:
@@ -138,14 +154,22 @@ def update_user(user_id):
                 return jsonify({'message': '邮箱已存在'}), 400
             user.email = data['email']
         
+        identity_changed = False
+        
         if 'role' in data and current_user.role == 'admin':
+            identity_changed = identity_changed or user.role != data['role']
             user.role = data['role']
         
         if 'is_active' in data and current_user.role == 'admin':
+            identity_changed = identity_changed or user.is_active != data['is_active']
             user.is_active = data['is_active']
         
         db.session.commit()
         
+        # 角色或启用状态变化后，旧令牌中的身份声明不再可信
+        if identity_changed:
+            invalidate_identity(user.id)
+        
         return jsonify({
             'message': '用户信息更新成功',
             'user': user.to_dict()
@@ -0,0 +1,172 @@
+import os
+import sys
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ADMIN_PASSWORD = 'admin123'
+PASSWORD = 'password'
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """每个测试一个独立的 SQLite 文件数据库，按 migrate 命令的方式建表并执行迁移"""
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'ioedu.db'))
+    monkeypatch.setenv('UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    # 自动保存的后台刷新由测试显式调用 flush_drafts 代替
+    monkeypatch.setenv('AUTOSAVE_FLUSH_INTERVAL', '3600')
+
+    from app import create_app, db
+    from migrations import upgrade
+    from models.user import User
+    from werkzeug.security import generate_password_hash
+    from utils.response_cache import _responses
+    from utils.statistics import _stats_cache
+    from utils.autosave import _documents
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        upgrade(db.engine, log=lambda message: None)
+        db.session.add(User(username='admin', email='admin@ioedu.com', role='admin', is_active=True,
+                            password_hash=generate_password_hash(ADMIN_PASSWORD)))
+        db.session.commit()
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    _responses.clear()
+    _stats_cache.clear()
+    _documents.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class Api:
+    """测试用的接口调用助手：登录后以 Authorization 头调用，返回 (状态码, JSON)"""
+
+    def __init__(self, app, client):
+        self.app = app
+        self.client = client
+        self.admin = self.login('admin', ADMIN_PASSWORD)
+
+    def login(self, username, password=PASSWORD):
+        response = self.client.post('/api/auth/login', json={'username': username, 'password': password})
+        assert response.status_code == 200, response.get_json()
+        return {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+
+    def call(self, method, url, auth, **kwargs):
+        headers = dict(auth, **(kwargs.pop('headers', None) or {}))
+        response = getattr(self.client, method)(url, headers=headers, **kwargs)
+        return response.status_code, response.get_json(silent=True)
+
+    def get(self, url, auth, **kwargs):
+        return self.call('get', url, auth, **kwargs)
+
+    def post(self, url, auth, **kwargs):
+        return self.call('post', url, auth, **kwargs)
+
+    def put(self, url, auth, **kwargs):
+        return self.call('put', url, auth, **kwargs)
+
+    def patch(self, url, auth, **kwargs):
+        return self.call('patch', url, auth, **kwargs)
+
+    def delete(self, url, auth, **kwargs):
+        return self.call('delete', url, auth, **kwargs)
+
+    def user(self, username, role='student'):
+        """由管理员创建用户，返回 (用户 ID, 登录后的请求头)"""
+        status, body = self.post('/api/users/', self.admin, json={
+            'username': username, 'email': f'{username}@ioedu.com', 'password': PASSWORD, 'role': role
+        })
+        assert status == 201, body
+        return body['user']['id'], self.login(username)
+
+    def course(self, teacher, code, name=None):
+        status, body = self.post('/api/courses/', teacher, json={
+            'name': name or code, 'code': code, 'semester': '2024-2025-1'
+        })
+        assert status == 201, body
+        return body['course']['id']
+
+    def experiment(self, teacher, course_id, title='实验', publish=True):
+        status, body = self.post('/api/experiments/', teacher, json={'title': title, 'course_id': course_id})
+        assert status == 201, body
+        experiment_id = body['experiment']['id']
+        if publish:
+            status, body = self.put(f'/api/experiments/{experiment_id}', teacher, json={'status': 'published'})
+            assert status == 200, body
+        return experiment_id
+
+    def klass(self, teacher, name, student_ids=(), course_ids=()):
+        status, body = self.post('/api/classes/', teacher, json={'name': name})
+        assert status == 201, body
+        class_id = body['class']['id']
+        if student_ids:
+            status, body = self.post(f'/api/classes/{class_id}/students/bulk', teacher,
+                                     json={'students': list(student_ids)})
+            assert status == 200, body
+        for course_id in course_ids:
+            status, body = self.post(f'/api/classes/{class_id}/courses', teacher, json={'course_id': course_id})
+            assert status in (200, 201), body
+        return class_id
+
+    def submission(self, student, experiment_id, **fields):
+        status, body = self.post('/api/submissions/', student, json=dict(experiment_id=experiment_id, **fields))
+        assert status == 201, body
+        return body['submission']['id']
+
+
+@pytest.fixture
+def api(app, client):
+    return Api(app, client)
+
+
+class School:
+    """常用场景：教师 t0 的课程和已发布实验通过班级关联给学生 s0、s1；教师 t1 和学生 s2 与之无关"""
+
+    def __init__(self, api):
+        self.t0_id, self.t0 = api.user('t0', 'teacher')
+        self.t1_id, self.t1 = api.user('t1', 'teacher')
+        self.s0_id, self.s0 = api.user('s0')
+        self.s1_id, self.s1 = api.user('s1')
+        self.s2_id, self.s2 = api.user('s2')
+        self.course_id = api.course(self.t0, 'PHY101', '大学物理实验')
+        self.experiment_id = api.experiment(self.t0, self.course_id, '单摆测重力加速度')
+        self.class_id = api.klass(self.t0, '物理1班', [self.s0_id, self.s1_id], [self.course_id])
+
+
+@pytest.fixture
+def school(api):
+    return School(api)
+
+
+@pytest.fixture
+def count_queries(app):
+    """统计 with 块中执行的 SQL 语句数"""
+    from app import db
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+    return counter
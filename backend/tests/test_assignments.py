@@ -0,0 +1,63 @@
+def _assign(api, teacher, experiment_id, assignee_type, assignee_id, **fields):
+    return api.post('/api/assignments/', teacher, json=dict(
+        experiment_id=experiment_id, assignee_type=assignee_type, assignee_id=assignee_id, **fields
+    ))
+
+
+def test_assignee_names_resolved_for_both_types(api, school):
+    status, body = _assign(api, school.t0, school.experiment_id, 'class', school.class_id)
+    assert status == 201
+    assert body['assignment']['assignee_name'] == '物理1班'
+    status, body = _assign(api, school.t0, school.experiment_id, 'student', school.s2_id)
+    assert status == 201
+    assert body['assignment']['assignee_name'] == 's2'
+
+    status, body = api.get('/api/assignments/', school.t0)
+    assert status == 200
+    assert {(item['assignee_type'], item['assignee_name']) for item in body['assignments']} == {
+        ('class', '物理1班'), ('student', 's2')
+    }
+
+
+def test_assignment_list_query_count_does_not_grow_with_rows(api, school, count_queries):
+    _assign(api, school.t0, school.experiment_id, 'class', school.class_id)
+    with count_queries() as few:
+        api.get('/api/assignments/', school.t0)
+
+    for student_id in (school.s0_id, school.s1_id, school.s2_id):
+        _assign(api, school.t0, school.experiment_id, 'student', student_id)
+    with count_queries() as many:
+        status, body = api.get('/api/assignments/', school.t0)
+    assert status == 200
+    assert len(body['assignments']) == 4
+    assert len(many) == len(few)
+
+
+def test_students_see_only_their_own_and_class_assignments(api, school):
+    _assign(api, school.t0, school.experiment_id, 'class', school.class_id)
+    _assign(api, school.t0, school.experiment_id, 'student', school.s2_id)
+
+    status, body = api.get('/api/assignments/', school.s0)
+    assert status == 200
+    assert [item['assignee_type'] for item in body['assignments']] == ['class']
+
+    status, body = api.get('/api/assignments/', school.s2)
+    assert [item['assignee_id'] for item in body['assignments']] == [school.s2_id]
+
+
+def test_only_the_course_teacher_can_assign_or_delete(api, school):
+    status, _ = _assign(api, school.t1, school.experiment_id, 'student', school.s2_id)
+    assert status == 403
+    status, _ = _assign(api, school.s0, school.experiment_id, 'student', school.s0_id)
+    assert status == 403
+    status, _ = _assign(api, school.t0, school.experiment_id, 'student', school.t1_id)
+    assert status == 404
+
+    status, body = _assign(api, school.t0, school.experiment_id, 'student', school.s2_id)
+    assignment_id = body['assignment']['id']
+    status, _ = api.delete(f'/api/assignments/{assignment_id}', school.t1)
+    assert status == 403
+    status, body = api.get('/api/assignments/', school.t1)
+    assert body['assignments'] == []
+    status, _ = api.delete(f'/api/assignments/{assignment_id}', school.t0)
+    assert status == 200
@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _attempts(api, headers):
+    status, body = api.get('/api/submissions/', headers)
+    assert status == 200
+    return sorted(submission['attempt_number'] for submission in body['submissions'])
+
+
+def test_attempts_are_numbered_per_student(api, school):
+    for _ in range(3):
+        api.submission(school.s0, school.experiment_id)
+    api.submission(school.s1, school.experiment_id)
+    assert _attempts(api, school.s0) == [1, 2, 3]
+    assert _attempts(api, school.s1) == [1]
+
+
+def test_max_attempts_uses_the_most_lenient_assignment(api, school):
+    status, _ = api.post('/api/assignments/', school.t0, json={
+        'experiment_id': school.experiment_id, 'assignee_type': 'class',
+        'assignee_id': school.class_id, 'max_attempts': 1
+    })
+    assert status == 201
+    status, _ = api.post('/api/assignments/', school.t0, json={
+        'experiment_id': school.experiment_id, 'assignee_type': 'student',
+        'assignee_id': school.s1_id, 'max_attempts': 2
+    })
+    assert status == 201
+
+    api.submission(school.s0, school.experiment_id)
+    status, body = api.post('/api/submissions/', school.s0, json={'experiment_id': school.experiment_id})
+    assert (status, body['message']) == (400, '已达到最大提交次数')
+
+    api.submission(school.s1, school.experiment_id)
+    api.submission(school.s1, school.experiment_id)
+    assert api.post('/api/submissions/', school.s1, json={'experiment_id': school.experiment_id})[0] == 400
+    assert _attempts(api, school.s1) == [1, 2]
+
+
+def test_concurrent_allocation_never_exceeds_the_limit(app, school):
+    from app import db
+    from utils.attempts import allocate_attempt, AttemptLimitReached
+
+    def allocate(_):
+        with app.app_context():
+            try:
+                attempt = allocate_attempt(school.experiment_id, school.s0_id, 5)
+                db.session.commit()
+                return attempt
+            except AttemptLimitReached:
+                db.session.rollback()
+                return None
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(allocate, range(12)))
+    assert sorted(attempt for attempt in results if attempt is not None) == [1, 2, 3, 4, 5]
+
+
+def test_only_students_create_submissions(api, school):
+    status, _ = api.post('/api/submissions/', school.t0, json={'experiment_id': school.experiment_id})
+    assert status == 403
+    other_course = api.course(school.t1, 'CHEM101')
+    hidden = api.experiment(school.t1, other_course)
+    assert api.post('/api/submissions/', school.s0, json={'experiment_id': hidden})[0] == 403
+    assert _attempts(api, school.s0) == []
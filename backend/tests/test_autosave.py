@@ -0,0 +1,130 @@
+from sqlalchemy import update
+
+
+def _replace(path, value):
+    return [{'op': 'replace', 'path': path, 'value': value}]
+
+
+def _autosave(api, headers, submission_id, base_version, patch):
+    return api.patch(f'/api/submissions/{submission_id}/autosave', headers,
+                     json={'base_version': base_version, 'patch': patch})
+
+
+def _flush(app, **kwargs):
+    from utils.autosave import flush_drafts
+
+    with app.app_context():
+        return flush_drafts(**kwargs)
+
+
+def test_saves_coalesce_until_flushed(app, api, school):
+    submission_id = api.submission(school.s0, school.experiment_id)
+    assert _autosave(api, school.s0, submission_id, 0, _replace('/content', '第一段'))[1]['version'] == 1
+    status, body = _autosave(api, school.s0, submission_id, 1, _replace('/data_values', {'周期': 2.01}))
+    assert (status, body['version']) == (200, 2)
+
+    # 未到刷新间隔的草稿不写入
+    assert _flush(app) == 0
+    assert _flush(app, force=True) == 1
+    status, body = api.get(f'/api/submissions/{submission_id}', school.s0)
+    submission = body['submission']
+    assert (submission['content'], submission['data_values'], submission['version']) == ('第一段', '{"周期": 2.01}', 2)
+
+    status, body = api.get(f'/api/submissions/{submission_id}/versions', school.s0)
+    assert status == 200
+    # 合并的两次保存只记录为一个历史版本
+    assert [version['version'] for version in body['versions']] == [2, 0]
+
+
+def test_reading_the_submission_writes_the_pending_draft(api, school):
+    submission_id = api.submission(school.s0, school.experiment_id)
+    _autosave(api, school.s0, submission_id, 0, _replace('/content', '草稿'))
+    status, body = api.get(f'/api/submissions/{submission_id}', school.t0)
+    assert (body['submission']['content'], body['submission']['version']) == ('草稿', 1)
+
+
+def test_stale_base_version_returns_the_server_document(api, school):
+    submission_id = api.submission(school.s0, school.experiment_id)
+    _autosave(api, school.s0, submission_id, 0, _replace('/content', '甲'))
+    status, body = _autosave(api, school.s0, submission_id, 0, _replace('/content', '乙'))
+    assert status == 409
+    assert (body['version'], body['document']['content']) == (1, '甲')
+    assert 'draft' not in body
+
+
+def test_draft_overtaken_by_a_full_update_is_returned_not_lost(app, api, school):
+    from app import db
+    from models.submission import Submission
+
+    submission_id = api.submission(school.s0, school.experiment_id)
+    _autosave(api, school.s0, submission_id, 0, _replace('/content', '草稿内容'))
+    # 其他进程整体修改了提交而草稿尚未写入
+    with app.app_context():
+        db.session.execute(update(Submission).where(Submission.id == submission_id)
+                           .values(content='整体修改', version=5))
+        db.session.commit()
+    assert _flush(app, force=True) == 0
+
+    status, body = _autosave(api, school.s0, submission_id, 1, _replace('/content', '继续编辑'))
+    assert status == 409
+    assert (body['version'], body['document']['content'], body['draft']['content']) == (5, '整体修改', '草稿内容')
+
+    status, body = _autosave(api, school.s0, submission_id, 5, _replace('/content', '合并结果'))
+    assert (status, body['version']) == (200, 6)
+    assert _flush(app, force=True) == 1
+    status, body = api.get(f'/api/submissions/{submission_id}', school.s0)
+    assert (body['submission']['content'], body['submission']['version']) == ('合并结果', 6)
+
+
+def test_invalid_patches_are_rejected(api, school):
+    submission_id = api.submission(school.s0, school.experiment_id)
+    assert _autosave(api, school.s0, submission_id, 0, _replace('', ['not', 'a', 'document']))[0] == 400
+    assert _autosave(api, school.s0, submission_id, 0, [{'op': 'remove', 'path': '/content'}])[0] == 400
+    assert _autosave(api, school.s0, submission_id, 0, [{'op': 'move', 'path': '/x'}])[0] == 400
+    assert _autosave(api, school.s0, submission_id, 0, [])[0] == 400
+
+
+def test_only_the_owner_can_autosave_an_open_submission(api, school):
+    submission_id = api.submission(school.s0, school.experiment_id)
+    patch = _replace('/content', 'x')
+    assert _autosave(api, school.s1, submission_id, 0, patch)[0] == 403
+    assert _autosave(api, school.t0, submission_id, 0, patch)[0] == 403
+    assert _autosave(api, school.s0, 9999, 0, patch)[0] == 404
+
+    api.post(f'/api/submissions/{submission_id}/grade', school.t0, json={'score': 90})
+    status, body = api.get(f'/api/submissions/{submission_id}', school.s0)
+    assert _autosave(api, school.s0, submission_id, body['submission']['version'], patch)[0] == 400
+
+
+def test_a_cached_save_only_inserts_the_patch(api, school, count_queries):
+    submission_id = api.submission(school.s0, school.experiment_id)
+    _autosave(api, school.s0, submission_id, 0, _replace('/content', '一'))
+    with count_queries() as statements:
+        status, body = _autosave(api, school.s0, submission_id, 1, _replace('/content', '一二'))
+    assert (status, body['version']) == (200, 2)
+    touched = [statement for statement in statements if 'submission' in statement]
+    assert len(touched) == 1 and touched[0].startswith('INSERT INTO submission_draft_patches')
+
+
+def test_saves_from_another_process_replay_the_patches(app, api, school):
+    from utils.autosave import _documents
+
+    submission_id = api.submission(school.s0, school.experiment_id)
+    _autosave(api, school.s0, submission_id, 0, _replace('/content', '一'))
+    # 下一次保存落到没有缓存的进程上：从提交和补丁重放出草稿
+    _documents.clear()
+    _autosave(api, school.s0, submission_id, 1, _replace('/data_values', {'周期': 1}))
+    _documents.clear()
+    assert _autosave(api, school.s0, submission_id, 1, _replace('/content', '二'))[0] == 409
+
+    _autosave(api, school.s0, submission_id, 2, _replace('/content', '一二'))
+    stale = _documents.get(submission_id)
+    assert _flush(app, force=True) == 1
+    # 其他进程刷新后本进程的缓存仍基于旧版本：条件插入失败，重新读取后保存
+    _documents.set(submission_id, stale)
+    assert _autosave(api, school.s0, submission_id, 3, _replace('/content', '一二三'))[1]['version'] == 4
+    _documents.clear()
+    assert _flush(app, force=True) == 1
+    status, body = api.get(f'/api/submissions/{submission_id}', school.s0)
+    submission = body['submission']
+    assert (submission['content'], submission['data_values'], submission['version']) == ('一二三', '{"周期": 1}', 4)
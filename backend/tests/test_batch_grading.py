@@ -0,0 +1,76 @@
+def test_batch_grading_reports_each_item(api, school):
+    first = api.submission(school.s0, school.experiment_id)
+    second = api.submission(school.s1, school.experiment_id)
+    third = api.submission(school.s1, school.experiment_id)
+
+    status, body = api.post('/api/submissions/grade/batch', school.t0, json={'grades': [
+        {'submission_id': first, 'score': 95, 'feedback': '很好'},
+        {'submission_id': second, 'score': 80},
+        {'submission_id': first, 'score': 10},
+        {'submission_id': third, 'score': 101},
+        {'submission_id': third, 'score': '90'},
+        {'submission_id': 9999, 'score': 50},
+    ]})
+    assert status == 200
+    assert (body['graded'], body['failed']) == (2, 4)
+    assert [result['status'] for result in body['results']] == [
+        'graded', 'graded', 'duplicate', 'out_of_range', 'invalid_score', 'not_found'
+    ]
+
+    status, body = api.get(f'/api/submissions/{first}', school.s0)
+    submission = body['submission']
+    assert (submission['status'], submission['score'], submission['feedback']) == ('graded', 95, '很好')
+    assert submission['grader_name'] == 't0'
+    status, body = api.get(f'/api/submissions/{third}', school.s1)
+    assert body['submission']['status'] == 'draft'
+
+
+def test_batch_grading_runs_a_fixed_number_of_queries(api, school, count_queries):
+    ids = [api.submission(student, school.experiment_id) for student in (school.s0, school.s1)]
+    with count_queries() as few:
+        api.post('/api/submissions/grade/batch', school.t0,
+                 json=[{'submission_id': submission_id, 'score': 60} for submission_id in ids[:1]])
+
+    ids += [api.submission(student, school.experiment_id) for student in (school.s0, school.s1) * 2]
+    with count_queries() as many:
+        status, body = api.post('/api/submissions/grade/batch', school.t0,
+                                json=[{'submission_id': submission_id, 'score': 70} for submission_id in ids])
+    assert body['graded'] == 6
+    # 每个提交各有一次草稿检查，其余语句数与批量大小无关
+    assert len(many) - len(ids) <= len(few) - 1
+
+
+def test_other_teachers_and_students_cannot_batch_grade(api, school):
+    submission_id = api.submission(school.s0, school.experiment_id)
+    status, body = api.post('/api/submissions/grade/batch', school.t1,
+                            json=[{'submission_id': submission_id, 'score': 100}])
+    assert status == 200
+    assert body['results'] == [{'submission_id': submission_id, 'status': 'forbidden'}]
+    status, _ = api.post('/api/submissions/grade/batch', school.s0,
+                         json=[{'submission_id': submission_id, 'score': 100}])
+    assert status == 403
+
+    status, body = api.get(f'/api/submissions/{submission_id}', school.s0)
+    assert body['submission']['score'] is None
+
+
+def test_malformed_batches_are_rejected(api, school):
+    submission_id = api.submission(school.s0, school.experiment_id)
+    for items in ([{'submission_id': [submission_id], 'score': 90}], [{'submission_id': {'id': 1}}],
+                  [{'submission_id': str(submission_id), 'score': 90}], [{'submission_id': True}], [submission_id],
+                  {'grades': {'submission_id': submission_id}}):
+        status, body = api.post('/api/submissions/grade/batch', school.t0, json=items)
+        assert (status, body['message']) == (400, '批改项格式无效'), items
+
+
+def test_single_grading_checks_the_score_like_the_batch(api, school):
+    submission_id = api.submission(school.s0, school.experiment_id)
+    for score, message in ((101, '分数超出范围'), (-1, '分数超出范围'), ('90', '分数必须是数字'), (True, '分数必须是数字')):
+        status, body = api.post(f'/api/submissions/{submission_id}/grade', school.t0, json={'score': score})
+        assert (status, body['message']) == (400, message)
+        status, body = api.put(f'/api/submissions/{submission_id}', school.t0, json={'score': score})
+        assert (status, body['message']) == (400, message)
+
+    status, body = api.get(f'/api/submissions/{submission_id}', school.s0)
+    assert body['submission']['score'] is None
+    assert api.post(f'/api/submissions/{submission_id}/grade', school.t0, json={'score': 100})[0] == 200
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import inspect
+
+
+def _invoke(app, *args):
+    # flask 命令行会为每个命令推入应用上下文
+    with app.app_context():
+        return app.test_cli_runner().invoke(args=list(args))
+
+
+@pytest.fixture
+def fresh_app(tmp_path, monkeypatch):
+    """未初始化的数据库：create_app 本身不建表"""
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'fresh.db'))
+    from app import create_app, db
+
+    app = create_app('testing')
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_create_app_does_not_touch_the_schema(fresh_app):
+    from app import db
+
+    with fresh_app.app_context():
+        assert inspect(db.engine).get_table_names() == []
+
+
+def test_init_db_then_migrate_is_idempotent(fresh_app):
+    from app import db
+    from migrations import pending_migrations
+
+    result = _invoke(fresh_app, 'init-db')
+    assert result.exit_code == 0, result.output
+    with fresh_app.app_context():
+        assert inspect(db.engine).has_table('users')
+        assert pending_migrations(db.engine) == []
+
+    result = _invoke(fresh_app, 'init-db')
+    assert result.exit_code != 0
+    result = _invoke(fresh_app, 'migrate')
+    assert result.exit_code == 0, result.output
+    assert '0 migration(s) applied' in result.output
+
+
+def test_create_admin_reads_the_password_from_the_environment(fresh_app, monkeypatch):
+    _invoke(fresh_app, 'init-db')
+
+    monkeypatch.setenv('ADMIN_PASSWORD', 's3cret-pass')
+    result = _invoke(fresh_app, 'create-admin', '--username', 'root')
+    assert result.exit_code == 0, result.output
+    response = fresh_app.test_client().post('/api/auth/login', json={'username': 'root', 'password': 's3cret-pass'})
+    assert response.status_code == 200
+    assert response.get_json()['user']['role'] == 'admin'
+
+    # 已存在时不修改密码
+    monkeypatch.setenv('ADMIN_PASSWORD', 'other-pass')
+    result = _invoke(fresh_app, 'create-admin', '--username', 'root')
+    assert '已存在' in result.output
+    response = fresh_app.test_client().post('/api/auth/login', json={'username': 'root', 'password': 'other-pass'})
+    assert response.status_code == 401
+
+
+def test_startup_stays_under_the_profile_threshold(fresh_app):
+    # 阈值取 testing 配置档的 STARTUP_MAX_MS，启动期重新做建表、哈希密码等重活时失败
+    result = _invoke(fresh_app, 'bench-startup', '--runs', '3')
+    assert result.exit_code == 0, result.output
+    assert 'median' in result.output
+
+    result = _invoke(fresh_app, 'bench-startup', '--runs', '1', '--max-ms', '1')
+    assert result.exit_code != 0
+    assert '超过阈值' in result.output
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import text
+
+
+def test_profiles_and_environment_overrides(monkeypatch):
+    from config import load_config
+
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    production = load_config('production')
+    assert (production['DB_POOL_SIZE'], production['DB_POOL_PRE_PING'], production['DB_POOL_RECYCLE']) == (10, True, 1800)
+    assert load_config('testing')['TESTING'] is True
+
+    monkeypatch.setenv('DB_POOL_SIZE', '3')
+    monkeypatch.setenv('DB_POOL_PRE_PING', 'no')
+    monkeypatch.setenv('IOEDU_ENV', 'production')
+    config = load_config()
+    assert (config['IOEDU_ENV'], config['DB_POOL_SIZE'], config['DB_POOL_PRE_PING']) == ('production', 3, False)
+    with pytest.raises(ValueError):
+        load_config('staging')
+
+
+def test_engine_options_follow_the_database_url():
+    from config import load_config
+    from utils.database import engine_options
+
+    config = load_config('testing')
+    config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    options = engine_options(config)
+    assert 'pool_size' not in options
+    assert options['connect_args']['check_same_thread'] is False
+
+    config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://ioedu@localhost/ioedu'
+    options = engine_options(config)
+    assert (options['pool_size'], options['max_overflow']) == (config['DB_POOL_SIZE'], config['DB_MAX_OVERFLOW'])
+    assert 'connect_args' not in options
+
+
+def test_file_databases_use_wal(app):
+    from app import db
+
+    with app.app_context():
+        connection = db.session.connection()
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_BUSY_TIMEOUT']
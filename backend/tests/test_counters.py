@@ -0,0 +1,63 @@
+def _class(api, headers, class_id):
+    status, body = api.get(f'/api/classes/{class_id}', headers)
+    assert status == 200, body
+    return body['class']
+
+
+def _experiment(api, headers, experiment_id):
+    status, body = api.get(f'/api/experiments/{experiment_id}', headers)
+    assert status == 200, body
+    return body['experiment']
+
+
+def test_student_count_follows_enrollment_changes(api, school):
+    assert _class(api, school.t0, school.class_id)['student_count'] == 2
+
+    status, _ = api.post(f'/api/classes/{school.class_id}/join', school.s2)
+    assert status == 201
+    status, _ = api.post(f'/api/classes/{school.class_id}/join', school.s2)
+    assert status == 400
+    assert _class(api, school.t0, school.class_id)['student_count'] == 3
+
+    status, _ = api.put(f'/api/classes/{school.class_id}/students/bulk', school.t0,
+                        json={'students': [school.s2_id]})
+    assert status == 200
+    detail = _class(api, school.t0, school.class_id)
+    assert detail['student_count'] == len(detail['students']) == 1
+
+    status, body = api.get('/api/classes/', school.t0)
+    assert body['classes'][0]['student_count'] == 1
+
+
+def test_step_and_data_point_counts(api, school):
+    experiment_id = school.experiment_id
+    for order in (1, 2):
+        status, _ = api.post(f'/api/experiments/{experiment_id}/steps', school.t0,
+                             json={'title': f'步骤{order}', 'order': order})
+        assert status == 201
+    status, _ = api.post(f'/api/experiments/{experiment_id}/data-points', school.t0,
+                         json={'name': '周期', 'type': 'number', 'unit': 's'})
+    assert status == 201
+
+    detail = _experiment(api, school.s0, experiment_id)
+    assert detail['steps_count'] == len(detail['steps']) == 2
+    assert detail['data_points_count'] == len(detail['data_points']) == 1
+
+    status, body = api.get('/api/experiments/', school.t0)
+    assert body['experiments'][0]['steps_count'] == 2
+
+
+def test_rejected_changes_leave_counters_alone(api, school):
+    experiment_id = school.experiment_id
+    status, _ = api.post(f'/api/experiments/{experiment_id}/steps', school.t1, json={'title': '越权'})
+    assert status == 403
+    status, _ = api.post(f'/api/experiments/{experiment_id}/steps', school.s0, json={'title': '越权'})
+    assert status == 403
+    status, _ = api.post(f'/api/experiments/{experiment_id}/steps', school.t0, json={})
+    assert status == 400
+    status, _ = api.post(f'/api/classes/{school.class_id}/students', school.t1,
+                         json={'student_id': school.s2_id})
+    assert status == 403
+
+    assert _experiment(api, school.t0, experiment_id)['steps_count'] == 0
+    assert _class(api, school.t0, school.class_id)['student_count'] == 2
@@ -0,0 +1,67 @@
+import json
+
+
+def _data_point(api, school, name, type_value, **fields):
+    status, body = api.post(f'/api/experiments/{school.experiment_id}/data-points', school.t0,
+                            json=dict(name=name, type=type_value, **fields))
+    assert status == 201, body
+    return body['data_point']['id']
+
+
+def _values(app, submission_id):
+    from models.submission import SubmissionValue
+
+    with app.app_context():
+        rows = SubmissionValue.query.filter_by(submission_id=submission_id).all()
+        return {row.data_point_id: (row.num_value, row.text_value, row.option_value) for row in rows}
+
+
+def test_values_are_stored_by_type(app, api, school):
+    period = _data_point(api, school, '周期', 'number', unit='s')
+    note = _data_point(api, school, '备注', 'text')
+    material = _data_point(api, school, '摆球材料', 'select', options='["钢", "木"]')
+
+    submission_id = api.submission(school.s0, school.experiment_id, data_values=json.dumps({
+        str(period): '2.01', '备注': '室温 20 度', str(material): '钢', '不存在': 1
+    }))
+    assert _values(app, submission_id) == {
+        period: (2.01, None, None), note: (None, '室温 20 度', None), material: (None, None, '钢')
+    }
+
+    # 列表形式同样支持；更新时整体重写，空值不存储
+    status, body = api.put(f'/api/submissions/{submission_id}', school.s0, json={'data_values': json.dumps([
+        {'data_point_id': period, 'value': 1.98}, {'name': '备注', 'value': ''}
+    ])})
+    assert status == 200, body
+    assert _values(app, submission_id) == {period: (1.98, None, None)}
+
+
+def test_unparseable_values_keep_the_raw_text(app, api, school):
+    period = _data_point(api, school, '周期', 'number')
+    submission_id = api.submission(school.s0, school.experiment_id, data_values=json.dumps({'周期': '约两秒'}))
+    assert _values(app, submission_id) == {period: (None, '约两秒', None)}
+
+    # 非有限的数值不作为数值存储
+    for raw in ('inf', '-Infinity', 'nan', '1e999'):
+        submission_id = api.submission(school.s0, school.experiment_id, data_values=json.dumps({'周期': raw}))
+        assert _values(app, submission_id) == {period: (None, raw, None)}
+
+    submission_id = api.submission(school.s1, school.experiment_id, data_values='not json')
+    assert _values(app, submission_id) == {}
+    status, body = api.get(f'/api/submissions/{submission_id}', school.s1)
+    assert body['submission']['data_values'] == 'not json'
+
+
+def test_other_teachers_cannot_add_data_points(api, school):
+    for headers, expected in ((school.t1, 403), (school.s0, 403)):
+        status, _ = api.post(f'/api/experiments/{school.experiment_id}/data-points', headers,
+                             json={'name': '周期', 'type': 'number'})
+        assert status == expected
+
+
+def test_backfill_uses_the_same_conversion():
+    from migrations.v0004_submission_values import _typed
+
+    assert _typed('number', '2.5') == (2.5, None, None)
+    assert _typed('number', float('inf')) == (None, 'inf', None)
+    assert _typed('number', 'NaN') == (None, 'NaN', None)
@@ -0,0 +1,61 @@
+import io
+
+
+def _statuses(body):
+    return {str(result['ref']): result['status'] for result in body['results']}
+
+
+def test_bulk_enroll_reports_each_reference(api, school):
+    class_id = api.klass(school.t0, '物理2班', [school.s0_id])
+    status, body = api.post(f'/api/classes/{class_id}/students/bulk', school.t0, json={
+        'students': [school.s0_id, 's1', school.s1_id, school.t1_id, 'nobody', 's2']
+    })
+    assert status == 200
+    assert body['added'] == 2 and body['removed'] == 0
+    assert _statuses(body) == {
+        str(school.s0_id): 'already_enrolled', 's1': 'added', str(school.s1_id): 'duplicate',
+        str(school.t1_id): 'not_student', 'nobody': 'not_found', 's2': 'added'
+    }
+
+
+def test_roster_sync_removes_students_not_listed(api, school):
+    status, body = api.put(f'/api/classes/{school.class_id}/students/bulk', school.t0,
+                           json={'students': ['s1', 's2']})
+    assert status == 200
+    assert (body['added'], body['removed']) == (1, 1)
+    status, body = api.get(f'/api/classes/{school.class_id}', school.t0)
+    assert sorted(student['username'] for student in body['class']['students']) == ['s1', 's2']
+
+    status, body = api.get('/api/classes/', school.s2)
+    assert [klass['id'] for klass in body['classes']] == [school.class_id]
+    assert api.get('/api/classes/', school.s0)[1]['classes'] == []
+
+    # 移出班级后不再能看到班级课程
+    status, _ = api.get(f'/api/courses/{school.course_id}', school.s0)
+    assert status == 403
+    status, _ = api.get(f'/api/courses/{school.course_id}', school.s2)
+    assert status == 200
+
+
+def test_csv_roster_upload(api, school):
+    class_id = api.klass(school.t0, '物理2班')
+    csv_file = (io.BytesIO('username,name\ns0,张三\ns2,李四\n'.encode('utf-8')), 'roster.csv')
+    status, body = api.post(f'/api/classes/{class_id}/students/bulk', school.t0,
+                            data={'file': csv_file}, content_type='multipart/form-data')
+    assert status == 200
+    assert body['added'] == 2
+
+    status, body = api.post(f'/api/classes/{class_id}/students/bulk', school.t0,
+                            data=f'student_id\n{school.s1_id}\n', content_type='text/csv')
+    assert status == 200
+    assert _statuses(body) == {str(school.s1_id): 'added'}
+
+
+def test_only_the_class_teacher_can_change_the_roster(api, school):
+    for headers in (school.t1, school.s0):
+        status, _ = api.put(f'/api/classes/{school.class_id}/students/bulk', headers, json={'students': []})
+        assert status == 403
+    status, _ = api.post(f'/api/classes/{school.class_id}/students/bulk', school.t0, json={'students': []})
+    assert status == 400
+    status, body = api.get(f'/api/classes/{school.class_id}', school.t0)
+    assert body['class']['student_count'] == 2
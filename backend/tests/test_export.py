@@ -0,0 +1,59 @@
+import csv
+import io
+import zipfile
+
+
+def _csv(api, url, headers):
+    response = api.client.get(url, headers=headers)
+    assert response.status_code == 200, response.get_json(silent=True)
+    assert response.mimetype == 'text/csv'
+    assert response.is_streamed
+    return list(csv.reader(io.StringIO(response.get_data().decode('utf-8-sig'))))
+
+
+def test_submission_export_is_scoped_to_the_caller(api, school):
+    first = api.submission(school.s0, school.experiment_id)
+    second = api.submission(school.s1, school.experiment_id)
+    status, _ = api.post(f'/api/submissions/{first}/grade', school.t0, json={'score': 88})
+    assert status == 200
+
+    rows = _csv(api, '/api/submissions/export', school.t0)
+    assert rows[0][:3] == ['提交ID', '实验ID', '实验名称']
+    assert [(row[0], row[4], row[7], row[8]) for row in rows[1:]] == [
+        (str(first), 's0', '88.0', 't0'), (str(second), 's1', '', '')
+    ]
+    assert [row[0] for row in _csv(api, '/api/submissions/export', school.s0)[1:]] == [str(first)]
+    assert _csv(api, '/api/submissions/export', school.t1)[1:] == []
+
+
+def test_xlsx_export_is_a_valid_workbook(api, school):
+    api.submission(school.s0, school.experiment_id)
+    response = api.client.get('/api/submissions/export?format=xlsx', headers=school.t0)
+    assert response.status_code == 200
+    assert "filename*=UTF-8''submissions.xlsx" in response.headers['Content-Disposition']
+
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+        assert archive.testzip() is None
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    assert sheet.count('<row>') == 2
+    assert '单摆测重力加速度' in sheet
+
+    assert api.get('/api/submissions/export?format=pdf', school.t0)[0] == 400
+
+
+def test_roster_and_gradebook_exports(api, school):
+    rows = _csv(api, f'/api/classes/{school.class_id}/students/export', school.t0)
+    assert [row[1] for row in rows[1:]] == ['s0', 's1']
+
+    submission_id = api.submission(school.s1, school.experiment_id)
+    api.post(f'/api/submissions/{submission_id}/grade', school.t0, json={'score': 70})
+    rows = _csv(api, f'/api/courses/{school.course_id}/gradebook/export', school.t0)
+    assert rows == [['学生ID', '学生', '单摆测重力加速度'], [str(school.s0_id), 's0', ''], [str(school.s1_id), 's1', '70.0']]
+
+
+def test_only_the_owning_teacher_can_export_class_data(api, school):
+    for url in (f'/api/classes/{school.class_id}/students/export',
+                f'/api/classes/{school.class_id}/gradebook/export',
+                f'/api/courses/{school.course_id}/gradebook/export'):
+        assert api.get(url, school.t1)[0] == 403
+        assert api.get(url, school.s0)[0] == 403
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+
+
+def _start(api, headers, data, **fields):
+    return api.post('/api/files/uploads', headers, json=dict(
+        filename='data.bin', size=len(data), sha256=hashlib.sha256(data).hexdigest(), **fields
+    ))
+
+
+def _upload(api, headers, data):
+    status, body = _start(api, headers, data)
+    assert status == 201, body
+    status, body = api.put(f"/api/files/uploads/{body['upload']['upload_id']}", headers, data=data)
+    assert status == 201, body
+    return body['file']['sha256']
+
+
+def test_chunked_upload_resumes_from_the_server_offset(api, school):
+    data = os.urandom(3000)
+    status, body = _start(api, school.s0, data, content_type='application/octet-stream')
+    assert status == 201
+    url = f"/api/files/uploads/{body['upload']['upload_id']}"
+
+    status, body = api.put(url, school.s0, data=data[:1000], headers={'Content-Range': 'bytes 0-999/3000'})
+    assert (status, body['upload']['offset']) == (200, 1000)
+    # 偏移不对时返回当前进度，从该偏移继续
+    status, body = api.put(url, school.s0, data=data[2000:], headers={'Content-Range': 'bytes 2000-2999/3000'})
+    assert (status, body['upload']['offset']) == (409, 1000)
+    assert api.get(url, school.s1)[0] == 404
+    status, body = api.put(url, school.s0, data=data[1000:])
+    assert status == 201 and body['complete']
+
+    response = api.client.get(f"/api/files/{body['file']['sha256']}", headers=school.s0)
+    assert response.status_code == 200
+    assert response.get_data() == data
+    response = api.client.get(f"/api/files/{body['file']['sha256']}", headers=school.s0,
+                              environ_overrides={'HTTP_RANGE': 'bytes=0-9'})
+    assert response.status_code == 206 and response.get_data() == data[:10]
+
+
+def test_corrupt_upload_is_rejected(api, school):
+    data = os.urandom(100)
+    status, body = _start(api, school.s0, data)
+    status, body = api.put(f"/api/files/uploads/{body['upload']['upload_id']}", school.s0, data=os.urandom(100))
+    assert status == 422
+
+
+def test_dedupe_only_skips_the_transfer_for_the_uploader(api, school):
+    data = os.urandom(500)
+    sha256 = _upload(api, school.s0, data)
+    status, body = _start(api, school.s0, data)
+    assert (status, body['complete']) == (200, True)
+
+    # 其他用户声明同一摘要时仍需上传完整内容
+    status, body = _start(api, school.s1, data)
+    assert (status, body['complete']) == (201, False)
+    assert api.client.get(f'/api/files/{sha256}', headers=school.s1).status_code == 403
+    assert _upload(api, school.s1, data) == sha256
+    assert api.client.get(f'/api/files/{sha256}', headers=school.s1).status_code == 200
+
+
+def test_attach_and_download_follow_submission_access(api, school):
+    sha256 = _upload(api, school.s0, os.urandom(200))
+
+    status, body = api.post('/api/submissions/', school.s1, json={
+        'experiment_id': school.experiment_id, 'files': [sha256]
+    })
+    assert status == 404
+    submission_id = api.submission(school.s0, school.experiment_id, files=[{'sha256': sha256, 'filename': '原始数据.csv'}])
+    status, body = api.get(f'/api/submissions/{submission_id}', school.s0)
+    assert json.loads(body['submission']['files'])[0]['filename'] == '原始数据.csv'
+
+    assert api.client.get(f'/api/files/{sha256}', headers=school.t0).status_code == 200
+    assert api.client.get(f'/api/files/{sha256}', headers=api.admin).status_code == 200
+    for headers in (school.t1, school.s1, school.s2):
+        assert api.client.get(f'/api/files/{sha256}', headers=headers).status_code == 403
+    assert api.client.get('/api/files/' + '0' * 64, headers=school.s0).status_code == 404
@@ -0,0 +1,46 @@
+def _grade(api, school, student, score, experiment_id=None):
+    submission_id = api.submission(student, experiment_id or school.experiment_id)
+    status, body = api.post(f'/api/submissions/{submission_id}/grade', school.t0, json={'score': score})
+    assert status == 200, body
+    return submission_id
+
+
+def _scores(gradebook):
+    return {student['username']: student['scores'] for student in gradebook['students']}
+
+
+def test_class_gradebook_applies_the_policy(api, school):
+    second = api.experiment(school.t0, school.course_id, '杨氏模量测定')
+    _grade(api, school, school.s0, 60)
+    _grade(api, school, school.s0, 90)
+    _grade(api, school, school.s0, 75)
+    _grade(api, school, school.s1, 80, second)
+
+    url = f'/api/classes/{school.class_id}/gradebook'
+    status, body = api.get(url, school.t0)
+    assert status == 200, body
+    gradebook = body['gradebook']
+    assert [experiment['id'] for experiment in gradebook['experiments']] == [school.experiment_id, second]
+    assert _scores(gradebook) == {'s0': [90, None], 's1': [None, 80]}
+
+    assert _scores(api.get(url + '?policy=latest', school.t0)[1]['gradebook'])['s0'] == [75, None]
+    assert _scores(api.get(url + '?policy=average', school.t0)[1]['gradebook'])['s0'] == [75, None]
+    assert api.get(url + '?policy=worst', school.t0)[0] == 400
+
+
+def test_regrading_refreshes_the_cell(api, school):
+    submission_id = _grade(api, school, school.s0, 60)
+    status, _ = api.put(f'/api/submissions/{submission_id}', school.t0, json={'score': 95, 'status': 'graded'})
+    assert status == 200
+    status, body = api.get(f'/api/courses/{school.course_id}/gradebook', school.t0)
+    assert status == 200, body
+    assert _scores(body['gradebook']) == {'s0': [95], 's1': [None]}
+
+
+def test_only_the_owning_teacher_can_read_gradebooks(api, school):
+    for url in (f'/api/classes/{school.class_id}/gradebook', f'/api/courses/{school.course_id}/gradebook'):
+        assert api.get(url, school.t1)[0] == 403
+        assert api.get(url, school.s0)[0] == 403
+        assert api.get(url, api.admin)[0] == 200
+    assert api.get('/api/classes/9999/gradebook', school.t0)[0] == 404
+    assert api.get('/api/courses/9999/gradebook', school.t0)[0] == 404
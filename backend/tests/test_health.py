@@ -0,0 +1,51 @@
+import os
+import signal
+import pytest
+
+
+@pytest.fixture
+def draining():
+    from utils.lifecycle import _draining
+    yield _draining
+    _draining.clear()
+
+
+def test_probes_need_no_login(client):
+    response = client.get('/api/health/live')
+    assert (response.status_code, response.get_json()) == (200, {'status': 'ok'})
+    response = client.get('/api/health/ready')
+    assert (response.status_code, response.get_json()['database']) == (200, 'ok')
+
+
+def test_readiness_fails_while_draining(client, draining):
+    from utils.lifecycle import begin_draining
+
+    begin_draining()
+    assert client.get('/api/health/ready').status_code == 503
+    # 排空期间进程仍然存活
+    assert client.get('/api/health/live').status_code == 200
+
+
+def test_readiness_fails_when_the_database_is_unavailable(app, client, monkeypatch):
+    from app import db
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(db.session, 'execute', unavailable)
+    response = client.get('/api/health/ready')
+    assert (response.status_code, response.get_json()['status']) == (503, 'unavailable')
+
+
+def test_drain_handler_keeps_the_previous_handler(draining):
+    from utils.lifecycle import install_drain_handler, is_draining
+
+    received = []
+    previous = signal.signal(signal.SIGUSR1, lambda signum, frame: received.append(signum))
+    try:
+        install_drain_handler(signal.SIGUSR1)
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert is_draining()
+        assert received == [signal.SIGUSR1]
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
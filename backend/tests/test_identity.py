@@ -0,0 +1,51 @@
+def _user_lookups(statements):
+    return [statement for statement in statements if 'WHERE users.id = ' in statement]
+
+
+def test_current_user_loaded_at_most_once_per_request(api, school, count_queries):
+    # teacher_required 和处理函数都要读取当前用户
+    with count_queries() as statements:
+        status, _ = api.post(f'/api/experiments/{school.experiment_id}/steps', school.t0, json={
+            'title': '测量摆长', 'content': '用米尺测量', 'step_number': 1
+        })
+    assert status == 201
+    assert len(_user_lookups(statements)) <= 1
+
+
+def test_role_claims_skip_the_user_lookup(app, api, count_queries):
+    app.config['JWT_ROLE_CLAIMS'] = True
+    admin = api.login('admin', 'admin123')
+    with count_queries() as statements:
+        status, _ = api.get('/api/users/', admin)
+    assert status == 200
+    assert _user_lookups(statements) == []
+
+
+def test_role_change_revokes_claims_in_issued_tokens(app, api):
+    app.config['JWT_ROLE_CLAIMS'] = True
+    teacher_id, teacher = api.user('t0', 'teacher')
+    status, _ = api.post('/api/courses/', teacher, json={'name': 'A', 'code': 'A1', 'semester': 'S'})
+    assert status == 201
+
+    status, _ = api.put(f'/api/users/{teacher_id}', api.admin, json={'role': 'student'})
+    assert status == 200
+    status, _ = api.post('/api/courses/', teacher, json={'name': 'B', 'code': 'B1', 'semester': 'S'})
+    assert status == 403
+
+
+def test_deactivated_user_is_rejected_without_claims(api):
+    teacher_id, teacher = api.user('t0', 'teacher')
+    status, _ = api.put(f'/api/users/{teacher_id}', api.admin, json={'is_active': False})
+    assert status == 200
+    status, _ = api.post('/api/courses/', teacher, json={'name': 'A', 'code': 'A1', 'semester': 'S'})
+    assert status == 403
+
+
+def test_users_cannot_change_their_own_role(api):
+    student_id, student = api.user('s0')
+    status, body = api.put(f'/api/users/{student_id}', student, json={'role': 'admin', 'email': 'new@ioedu.com'})
+    assert status == 200
+    assert body['user']['role'] == 'student'
+    assert body['user']['email'] == 'new@ioedu.com'
+    status, _ = api.get('/api/users/', student)
+    assert status == 403
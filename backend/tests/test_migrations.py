@@ -0,0 +1,47 @@
+from sqlalchemy import inspect, text
+
+
+def test_all_migrations_applied_and_rerun_is_a_no_op(app):
+    from app import db
+    from migrations import load_migrations, pending_migrations, upgrade
+
+    with app.app_context():
+        assert pending_migrations(db.engine) == []
+        applied = db.session.execute(text('SELECT version FROM schema_migrations')).scalars().all()
+        assert sorted(applied) == [module.revision for module in load_migrations()]
+        assert upgrade(db.engine, log=lambda message: None) == []
+
+
+def test_hot_path_indexes_exist_and_are_used(app):
+    from app import db
+    from migrations.v0002_hot_path_indexes import INDEXES
+
+    with app.app_context():
+        inspector = inspect(db.engine)
+        for name, table, columns in INDEXES:
+            indexes = {index['name']: index['column_names'] for index in inspector.get_indexes(table)}
+            assert indexes.get(name) == columns, name
+
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM submissions WHERE experiment_id = 1 AND status = 'submitted'"
+        )).all()
+        assert any('ix_submissions_experiment_status' in row[-1] for row in plan)
+
+
+def test_counter_migration_backfills_existing_rows(app, api, school):
+    from app import db
+    from migrations import upgrade
+
+    with app.app_context():
+        # 模拟计数列加入之前的数据库：删除列并撤销 0001 的执行记录
+        db.session.execute(text('ALTER TABLE classes DROP COLUMN student_count'))
+        db.session.execute(text('DELETE FROM schema_migrations WHERE version = 1'))
+        db.session.commit()
+        db.session.remove()
+
+        executed = upgrade(db.engine, log=lambda message: None)
+        assert [module.revision for module in executed] == [1]
+        count = db.session.execute(
+            text('SELECT student_count FROM classes WHERE id = :id'), {'id': school.class_id}
+        ).scalar()
+        assert count == 2
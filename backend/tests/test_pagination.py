@@ -0,0 +1,53 @@
+def _walk(api, url, headers, key, per_page=2):
+    """按 next_cursor 翻到最后一页，返回每页的 ID 列表和最后一页的响应"""
+    pages, cursor = [], ''
+    while True:
+        status, body = api.get(f'{url}?cursor={cursor}&per_page={per_page}', headers)
+        assert status == 200, body
+        pages.append([item['id'] for item in body[key]])
+        if body['next_cursor'] is None:
+            return pages, body
+        cursor = body['next_cursor']
+
+
+def test_cursor_pages_cover_every_row_once(api):
+    for index in range(5):
+        api.user(f's{index}')
+
+    pages, last = _walk(api, '/api/users/', api.admin, 'users')
+    ids = [user_id for page in pages for user_id in page]
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert len(ids) == 6 and len(set(ids)) == 6
+    assert 'total' not in last
+
+    status, body = api.get(f"/api/users/?cursor={last['prev_cursor']}&per_page=2", api.admin)
+    assert status == 200
+    assert [user['id'] for user in body['users']] == pages[1]
+
+
+def test_totals_are_optional(api):
+    api.user('s0')
+    status, body = api.get('/api/users/', api.admin)
+    assert body['total'] == 2 and body['pages'] == 1
+    status, body = api.get('/api/users/?with_total=0', api.admin)
+    assert 'total' not in body and len(body['users']) == 2
+    status, body = api.get('/api/users/?cursor=&with_total=1', api.admin)
+    assert body['total'] == 2
+
+
+def test_invalid_cursor_is_rejected(api):
+    status, body = api.get('/api/users/?cursor=not-a-cursor', api.admin)
+    assert status == 400
+    assert body['message'] == '无效的分页游标'
+
+
+def test_cursor_pages_keep_the_role_filter(api, school):
+    for index in range(3):
+        api.course(school.t1, f'CHEM10{index}')
+
+    pages, _ = _walk(api, '/api/courses/', school.t0, 'courses')
+    assert [len(page) for page in pages] == [1]
+    pages, _ = _walk(api, '/api/courses/', school.t1, 'courses')
+    assert sum(len(page) for page in pages) == 3
+    pages, _ = _walk(api, '/api/courses/', school.s2, 'courses')
+    assert pages == [[]]
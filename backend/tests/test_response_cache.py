@@ -0,0 +1,51 @@
+def _get(api, url, headers, etag=None):
+    extra = {'If-None-Match': etag} if etag else {}
+    return api.client.get(url, headers=dict(headers, **extra))
+
+
+def test_conditional_get_returns_304_until_the_record_changes(api, school):
+    url = f'/api/experiments/{school.experiment_id}'
+    response = _get(api, url, school.s0)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.get_json()['experiment']['title'] == '单摆测重力加速度'
+
+    response = _get(api, url, school.s0, etag)
+    assert response.status_code == 304 and response.get_data() == b''
+
+    status, _ = api.post(url + '/steps', school.t0, json={'title': '测量摆长', 'content': '用米尺测量'})
+    assert status == 201
+    response = _get(api, url, school.s0, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['experiment']['steps'][0]['title'] == '测量摆长'
+
+
+def test_etag_depends_only_on_the_record_version(api, school):
+    from utils.response_cache import _responses
+
+    url = f'/api/courses/{school.course_id}'
+    etag = _get(api, url, school.t0).headers['ETag']
+    # 其他进程没有缓存的正文，也为同一版本得到相同的 ETag
+    _responses.clear()
+    assert _get(api, url, school.t0, etag).status_code == 304
+
+    status, _ = api.put(url, school.t0, json={'name': '近代物理实验'})
+    assert status == 200
+    response = _get(api, url, school.t0, etag)
+    assert response.status_code == 200
+    assert response.get_json()['course']['name'] == '近代物理实验'
+
+
+def test_permissions_are_checked_before_the_cached_response(api, school):
+    url = f'/api/classes/{school.class_id}'
+    etag = _get(api, url, school.s0).headers['ETag']
+    assert _get(api, url, school.t1, etag).status_code == 403
+
+    status, _ = api.put(f'/api/classes/{school.class_id}/students/bulk', school.t0,
+                        json={'students': [school.s1_id, school.s2_id]})
+    assert status == 200
+    assert _get(api, url, school.s0, etag).status_code == 403
+    response = _get(api, url, school.s2, etag)
+    assert response.status_code == 200
+    assert sorted(student['username'] for student in response.get_json()['class']['students']) == ['s1', 's2']
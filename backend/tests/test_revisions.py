@@ -0,0 +1,65 @@
+import random
+
+
+def test_text_delta_round_trips():
+    from utils.revisions import text_delta, apply_delta
+
+    rng = random.Random(7)
+    for _ in range(200):
+        old = ''.join(rng.choice('ab摆长\n') for _ in range(rng.randrange(40)))
+        new = list(old)
+        for _ in range(rng.randrange(4)):
+            position = rng.randrange(len(new) + 1)
+            new[position:position + rng.randrange(3)] = rng.choice(['', 'x', '周期'])
+        new = ''.join(new)
+        assert apply_delta(old, text_delta(old, new)) == new
+
+
+def test_every_version_can_be_rebuilt(app, api, school):
+    from models.submission import SubmissionRevision
+    from utils.revisions import SNAPSHOT_INTERVAL
+
+    base = '实验报告\n' + '测量数据记录。\n' * 20
+    submission_id = api.submission(school.s0, school.experiment_id, content=base)
+    contents = {0: base}
+    for version in range(1, SNAPSHOT_INTERVAL + 4):
+        content = contents[version - 1] + '第 %d 次测量\n' % version
+        status, body = api.put(f'/api/submissions/{submission_id}', school.s0, json={'content': content})
+        assert (status, body['submission']['version']) == (200, version)
+        contents[version] = content
+
+    for version, content in contents.items():
+        status, body = api.get(f'/api/submissions/{submission_id}/versions/{version}', school.t0)
+        assert status == 200
+        assert body['content'] == content
+
+    with app.app_context():
+        depths = [revision.depth for revision in SubmissionRevision.query.filter_by(
+            submission_id=submission_id).order_by(SubmissionRevision.version)]
+    # 小改动只保存差异，差异链达到上限后重新保存快照
+    assert depths[0] == 0 and depths[1] == 1
+    assert max(depths) < SNAPSHOT_INTERVAL
+    assert depths.count(0) == 2
+
+
+def test_diff_between_versions(api, school):
+    submission_id = api.submission(school.s0, school.experiment_id, content='周期 2.01\n摆长 1.00')
+    api.put(f'/api/submissions/{submission_id}', school.s0, json={'content': '周期 2.03\n摆长 1.00'})
+
+    status, body = api.get(f'/api/submissions/{submission_id}/versions/diff?from=0&to=1', school.s0)
+    assert status == 200
+    assert list(body['diff']) == ['content']
+    assert '-周期 2.01' in body['diff']['content'] and '+周期 2.03' in body['diff']['content']
+    assert api.get(f'/api/submissions/{submission_id}/versions/diff?from=0', school.s0)[0] == 400
+    assert api.get(f'/api/submissions/{submission_id}/versions/diff?from=0&to=9', school.s0)[0] == 404
+
+
+def test_history_is_visible_only_to_the_owner_and_course_teacher(api, school):
+    submission_id = api.submission(school.s0, school.experiment_id, content='原始')
+    for url in (f'/api/submissions/{submission_id}/versions',
+                f'/api/submissions/{submission_id}/versions/0',
+                f'/api/submissions/{submission_id}/versions/diff?from=0&to=0'):
+        assert api.get(url, school.s1)[0] == 403
+        assert api.get(url, school.t1)[0] == 403
+        assert api.get(url, school.t0)[0] == 200
+    assert api.get('/api/submissions/9999/versions', school.s0)[0] == 404
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+
+def _assign(api, school, assignee_type, assignee_id, **dates):
+    status, body = api.post('/api/assignments/', school.t0, json=dict(
+        experiment_id=school.experiment_id, assignee_type=assignee_type, assignee_id=assignee_id,
+        **{key: value.isoformat() for key, value in dates.items()}
+    ))
+    assert status == 201, body
+    return body['assignment']['id']
+
+
+def _run_scheduler(app, now):
+    from utils.scheduler import _Scheduler, run_transitions
+
+    scheduler = _Scheduler(app)
+    with app.app_context():
+        scheduler._reload()
+        return run_transitions(scheduler._pop_due(now), now, app)
+
+
+def test_boundaries_activate_remind_and_expire(app, api, school):
+    from utils.scheduler import assignment_expired
+
+    now = datetime.utcnow()
+    assignment_id = _assign(api, school, 'class', school.class_id,
+                            start_date=now + timedelta(hours=1), due_date=now + timedelta(hours=30))
+    draft = api.submission(school.s0, school.experiment_id)
+    submitted = api.submission(school.s1, school.experiment_id)
+    api.put(f'/api/submissions/{submitted}', school.s1, json={'status': 'submitted'})
+
+    assert _run_scheduler(app, now)['activated'] == []
+    assert _run_scheduler(app, now + timedelta(hours=2))['activated'] == [assignment_id]
+    assert _run_scheduler(app, now + timedelta(hours=7))['reminded'] == [assignment_id]
+
+    events = []
+    def record(sender, assignment_ids):
+        events.append(assignment_ids)
+    with assignment_expired.connected_to(record):
+        result = _run_scheduler(app, now + timedelta(hours=31))
+    assert (result['expired'], result['locked']) == ([assignment_id], 1)
+    assert events == [[assignment_id]]
+    # 已处理的边界不会重复触发
+    assert _run_scheduler(app, now + timedelta(hours=32))['expired'] == []
+
+    status, body = api.get('/api/assignments/', school.t0)
+    assert body['assignments'][0]['status'] == 'expired'
+    assert api.get(f'/api/submissions/{draft}', school.s0)[1]['submission']['status'] == 'locked'
+    assert api.get(f'/api/submissions/{submitted}', school.s1)[1]['submission']['status'] == 'submitted'
+    status, body = api.put(f'/api/submissions/{draft}', school.s0, json={'content': '补交'})
+    assert status == 400
+
+
+def test_drafts_stay_open_while_another_assignment_is_open(app, api, school):
+    now = datetime.utcnow()
+    _assign(api, school, 'class', school.class_id, due_date=now + timedelta(hours=1))
+    _assign(api, school, 'student', school.s0_id, due_date=now + timedelta(days=3))
+    first = api.submission(school.s0, school.experiment_id)
+    second = api.submission(school.s1, school.experiment_id)
+
+    assert _run_scheduler(app, now + timedelta(hours=2))['locked'] == 1
+    assert api.get(f'/api/submissions/{first}', school.s0)[1]['submission']['status'] == 'draft'
+    assert api.get(f'/api/submissions/{second}', school.s1)[1]['submission']['status'] == 'locked'
+
+
+def test_past_deadlines_reject_new_work_before_the_scheduler_runs(api, school):
+    now = datetime.utcnow()
+    _assign(api, school, 'class', school.class_id, due_date=now + timedelta(days=1))
+    submission_id = api.submission(school.s0, school.experiment_id)
+    _assign(api, school, 'student', school.s1_id, due_date=now - timedelta(minutes=1))
+
+    # s1 的个人分配已截止，但所在班级的分配未截止，按最宽松的分配判断
+    status, body = api.put(f'/api/submissions/{submission_id}', school.s0, json={'content': '数据'})
+    assert status == 200
+    assert api.post('/api/submissions/', school.s1, json={'experiment_id': school.experiment_id})[0] == 201
+
+    _assign(api, school, 'student', school.s2_id, due_date=now - timedelta(minutes=1))
+    status, body = api.post('/api/submissions/', school.s2, json={'experiment_id': school.experiment_id})
+    assert (status, body['message']) == (400, '已过截止时间')
+
+
+def test_only_the_course_teacher_can_assign(api, school):
+    for headers, expected in ((school.t1, 403), (school.s0, 403)):
+        status, _ = api.post('/api/assignments/', headers, json={
+            'experiment_id': school.experiment_id, 'assignee_type': 'class', 'assignee_id': school.class_id
+        })
+        assert status == expected
+    status, _ = api.post('/api/assignments/', school.t0, json={
+        'experiment_id': school.experiment_id, 'assignee_type': 'class',
+        'assignee_id': school.class_id, 'due_date': 'tomorrow'
+    })
+    assert status == 400
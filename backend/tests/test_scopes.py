@@ -0,0 +1,46 @@
+def _ids(api, url, headers, key):
+    status, body = api.get(url, headers)
+    assert status == 200, body
+    return sorted(item['id'] for item in body[key])
+
+
+def test_list_endpoints_are_scoped_per_role(api, school):
+    other_course = api.course(school.t1, 'CHEM101', '化学实验')
+    other_experiment = api.experiment(school.t1, other_course, '滴定')
+    mine = api.submission(school.s0, school.experiment_id)
+    theirs = api.submission(school.s1, school.experiment_id)
+
+    assert _ids(api, '/api/courses/', school.t0, 'courses') == [school.course_id]
+    assert _ids(api, '/api/courses/', school.t1, 'courses') == [other_course]
+    assert _ids(api, '/api/courses/', api.admin, 'courses') == sorted([school.course_id, other_course])
+    assert _ids(api, '/api/experiments/', school.t1, 'experiments') == [other_experiment]
+    assert _ids(api, '/api/experiments/', school.s0, 'experiments') == [school.experiment_id]
+    assert _ids(api, '/api/submissions/', school.t0, 'submissions') == sorted([mine, theirs])
+    assert _ids(api, '/api/submissions/', school.t1, 'submissions') == []
+    assert _ids(api, '/api/submissions/', school.s0, 'submissions') == [mine]
+
+
+def test_course_transfer_moves_grading_rights_immediately(api, school):
+    submission_id = api.submission(school.s0, school.experiment_id)
+    assert api.post(f'/api/submissions/{submission_id}/grade', school.t0, json={'score': 60})[0] == 200
+    assert api.post(f'/api/submissions/{submission_id}/grade', school.t1, json={'score': 70})[0] == 403
+
+    status, _ = api.put(f'/api/courses/{school.course_id}', api.admin, json={'teacher_id': school.t1_id})
+    assert status == 200
+
+    assert api.post(f'/api/submissions/{submission_id}/grade', school.t0, json={'score': 80})[0] == 403
+    assert api.put(f'/api/submissions/{submission_id}', school.t0, json={'score': 80})[0] == 403
+    assert api.get(f'/api/submissions/{submission_id}/versions', school.t0)[0] == 403
+    assert _ids(api, '/api/submissions/', school.t0, 'submissions') == []
+
+    status, body = api.post(f'/api/submissions/{submission_id}/grade', school.t1, json={'score': 90})
+    assert (status, body['submission']['score']) == (200, 90)
+    status, body = api.post('/api/submissions/grade/batch', school.t0, json=[{'submission_id': submission_id, 'score': 10}])
+    assert body['results'][0]['status'] == 'forbidden'
+
+
+def test_teachers_cannot_transfer_courses(api, school):
+    status, _ = api.put(f'/api/courses/{school.course_id}', school.t0, json={'teacher_id': school.t1_id})
+    assert status == 200
+    assert _ids(api, '/api/courses/', school.t0, 'courses') == [school.course_id]
+    assert api.put(f'/api/courses/{school.course_id}', school.t1, json={'teacher_id': school.t1_id})[0] == 403
@@ -0,0 +1,47 @@
+def _names(api, url, headers, key, field):
+    status, body = api.get(url, headers)
+    assert status == 200, body
+    return sorted(item[field] for item in body[key])
+
+
+def test_full_text_search_matches_substrings(api):
+    for username in ('zhang_wei', 'zhangsan', 'li_ming'):
+        api.user(username)
+    assert _names(api, '/api/users/?search=zhang', api.admin, 'users', 'username') == ['zhang_wei', 'zhangsan']
+    assert _names(api, '/api/users/?search=ming@ioedu', api.admin, 'users', 'username') == ['li_ming']
+    # 短于 3 个字符的关键字回退到 LIKE 匹配
+    assert _names(api, '/api/users/?search=li', api.admin, 'users', 'username') == ['li_ming']
+
+
+def test_search_terms_are_not_parsed_as_query_syntax(api):
+    api.user('zhang_wei')
+    for term in ('"zhang', 'zhang OR li', 'NEAR(zhang)', 'zha*'):
+        status, body = api.get('/api/users/', api.admin, query_string={'search': term})
+        assert status == 200, (term, body)
+
+
+def test_index_follows_updates(api, school):
+    status, _ = api.put(f'/api/courses/{school.course_id}', school.t0, json={'name': '近代物理实验'})
+    assert status == 200
+    assert _names(api, '/api/courses/?search=近代物理', school.t0, 'courses', 'name') == ['近代物理实验']
+    assert _names(api, '/api/courses/?search=大学物理', school.t0, 'courses', 'name') == []
+
+
+def test_search_keeps_the_role_filter(api, school):
+    api.course(school.t1, 'PHY201', '大学物理实验（二）')
+    assert _names(api, '/api/courses/?search=大学物理', school.t0, 'courses', 'code') == ['PHY101']
+    assert _names(api, '/api/courses/?search=大学物理', school.s0, 'courses', 'code') == ['PHY101']
+    assert _names(api, '/api/courses/?search=大学物理', school.s2, 'courses', 'code') == []
+    assert _names(api, '/api/courses/?search=大学物理', api.admin, 'courses', 'code') == ['PHY101', 'PHY201']
+
+
+def test_migrated_index_matches_the_searchable_columns(app):
+    from sqlalchemy import text
+    from app import db
+    from utils.search import SEARCH_COLUMNS
+
+    # 修改 SEARCH_COLUMNS 而没有新增重建索引的迁移时失败
+    with app.app_context():
+        for table, columns in SEARCH_COLUMNS.items():
+            indexed = [row[1] for row in db.session.execute(text(f'PRAGMA table_info({table}_fts)'))]
+            assert indexed == columns, table
@@ -0,0 +1,52 @@
+def _list_queries(api, count_queries, url, headers):
+    with count_queries() as statements:
+        status, body = api.get(url, headers)
+    assert status == 200, body
+    return len(statements), body
+
+
+def test_submission_list_query_count_does_not_grow_with_rows(api, school, count_queries):
+    api.submission(school.s0, school.experiment_id)
+    few, body = _list_queries(api, count_queries, '/api/submissions/', school.t0)
+    assert len(body['submissions']) == 1
+
+    for _ in range(2):
+        api.submission(school.s0, school.experiment_id)
+    for _ in range(3):
+        api.submission(school.s1, school.experiment_id)
+    many, body = _list_queries(api, count_queries, '/api/submissions/', school.t0)
+    assert len(body['submissions']) == 6
+    assert many == few
+
+    names = {item['student_name'] for item in body['submissions']}
+    assert names == {'s0', 's1'}
+    assert all(item['experiment_title'] == '单摆测重力加速度' for item in body['submissions'])
+
+
+def test_course_and_class_lists_query_count_does_not_grow_with_rows(api, school, count_queries):
+    few_courses, _ = _list_queries(api, count_queries, '/api/courses/', school.t0)
+    few_classes, _ = _list_queries(api, count_queries, '/api/classes/', school.t0)
+    for index in range(4):
+        api.course(school.t0, f'PHY20{index}')
+        api.klass(school.t0, f'物理{index + 2}班', [school.s0_id])
+
+    many_courses, body = _list_queries(api, count_queries, '/api/courses/', school.t0)
+    assert len(body['courses']) == 5
+    assert {course['teacher_name'] for course in body['courses']} == {'t0'}
+    many_classes, body = _list_queries(api, count_queries, '/api/classes/', school.t0)
+    assert len(body['classes']) == 5
+    assert many_courses == few_courses
+    assert many_classes == few_classes
+
+
+def test_students_only_list_their_own_submissions(api, school):
+    api.submission(school.s0, school.experiment_id)
+    api.submission(school.s1, school.experiment_id)
+
+    status, body = api.get('/api/submissions/', school.s0)
+    assert status == 200
+    assert [item['student_id'] for item in body['submissions']] == [school.s0_id]
+
+    status, body = api.get('/api/submissions/', school.t1)
+    assert status == 200
+    assert body['submissions'] == []
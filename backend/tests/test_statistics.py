@@ -0,0 +1,79 @@
+import json
+import pytest
+
+
+def _period(api, school):
+    status, body = api.post(f'/api/experiments/{school.experiment_id}/data-points', school.t0,
+                            json={'name': '周期', 'type': 'number', 'unit': 's', 'value_range': '1.5-2.5'})
+    assert status == 201, body
+    return body['data_point']['id']
+
+
+def _submit(api, student, experiment_id, period, value):
+    submission_id = api.submission(student, experiment_id, data_values=json.dumps({str(period): value}))
+    status, body = api.put(f'/api/submissions/{submission_id}', student, json={'status': 'submitted'})
+    assert status == 200, body
+    return submission_id
+
+
+def test_statistics_describe_submitted_values(api, school):
+    period = _period(api, school)
+    _submit(api, school.s0, school.experiment_id, period, 2.0)
+    _submit(api, school.s1, school.experiment_id, period, 2.2)
+    outlier = _submit(api, school.s0, school.experiment_id, period, 3.0)
+    api.submission(school.s1, school.experiment_id, data_values=json.dumps({str(period): 9.9}))
+
+    status, body = api.get(f'/api/experiments/{school.experiment_id}/statistics?bins=4', school.t0)
+    assert status == 200, body
+    point = body['statistics']['data_points'][0]
+    assert point['data_point_id'] == period
+    assert point['count'] == 3
+    assert point['mean'] == pytest.approx(7.2 / 3)
+    assert (point['min'], point['median'], point['max']) == pytest.approx((2.0, 2.2, 3.0))
+    assert sum(point['histogram']['counts']) == 3 and len(point['histogram']['bin_edges']) == 5
+    assert point['outliers'] == [{'submission_id': outlier, 'value': 3.0}]
+
+    status, body = api.get(f'/api/experiments/{school.experiment_id}/statistics?include_drafts=1', school.t0)
+    assert body['statistics']['data_points'][0]['count'] == 4
+
+
+def test_new_submissions_invalidate_cached_statistics(api, school):
+    period = _period(api, school)
+    url = f'/api/experiments/{school.experiment_id}/statistics'
+    status, body = api.get(url, school.t0)
+    assert body['statistics']['data_points'][0]['count'] == 0
+
+    _submit(api, school.s0, school.experiment_id, period, 2.0)
+    status, body = api.get(url, school.t0)
+    assert body['statistics']['data_points'][0]['count'] == 1
+
+
+def test_only_the_course_teacher_can_read_statistics(api, school):
+    url = f'/api/experiments/{school.experiment_id}/statistics'
+    assert api.get(url, school.t1)[0] == 403
+    assert api.get(url, school.s0)[0] == 403
+    assert api.get(url, api.admin)[0] == 200
+    assert api.get(url + '?bins=0', school.t0)[0] == 400
+    assert api.get('/api/experiments/9999/statistics', school.t0)[0] == 404
+
+
+def test_non_finite_values_are_ignored(app, api, school):
+    from sqlalchemy import update
+    from app import db
+    from models.submission import SubmissionValue
+
+    period = _period(api, school)
+    _submit(api, school.s0, school.experiment_id, period, 2.0)
+    bad = [_submit(api, school.s1, school.experiment_id, period, 2.1) for _ in range(2)]
+    # 修复前写入的 inf/nan 仍留在已有数据库中
+    with app.app_context():
+        for submission_id, value in zip(bad, (float('inf'), float('nan'))):
+            db.session.execute(update(SubmissionValue).where(SubmissionValue.submission_id == submission_id)
+                               .values(num_value=value))
+        db.session.commit()
+
+    response = api.client.get(f'/api/experiments/{school.experiment_id}/statistics', headers=school.t0)
+    assert response.status_code == 200
+    assert b'NaN' not in response.get_data() and b'Infinity' not in response.get_data()
+    point = response.get_json()['statistics']['data_points'][0]
+    assert (point['count'], point['mean']) == (1, 2.0)
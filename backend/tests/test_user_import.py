@@ -0,0 +1,51 @@
+import json
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def hash_pool():
+    from utils.user_import import shutdown_hash_pool
+    yield
+    shutdown_hash_pool()
+
+
+def test_import_hashes_passwords_and_reports_each_row(api):
+    api.user('taken')
+    status, body = api.post('/api/users/import', api.admin, json={'users': [
+        {'username': 'stu1', 'email': 'stu1@ioedu.com', 'password': 'secret1'},
+        {'username': 'tea1', 'email': 'tea1@ioedu.com', 'password': 'secret2', 'role': 'teacher'},
+        {'username': 'stu1', 'email': 'other@ioedu.com', 'password': 'secret3'},
+        {'username': 'taken', 'email': 'taken2@ioedu.com', 'password': 'secret4'},
+        {'username': 'bad', 'email': 'bad@ioedu.com', 'password': 'x', 'role': 'root'},
+        {'username': 'nopass', 'email': 'nopass@ioedu.com'},
+    ]})
+    assert status == 200
+    assert (body['total'], body['created'], body['failed']) == (6, 2, 4)
+    assert [result['status'] for result in body['results']] == [
+        'created', 'created', 'duplicate', 'duplicate', 'invalid', 'invalid'
+    ]
+
+    api.login('stu1', 'secret1')
+    status, body = api.get('/api/auth/profile', api.login('tea1', 'secret2'))
+    assert body['user']['role'] == 'teacher'
+
+
+def test_csv_import_streams_progress(api):
+    csv_body = 'username,email,password\nstu1,stu1@ioedu.com,secret1\nstu2,stu2@ioedu.com,secret2\n'
+    response = api.client.post('/api/users/import?stream=1', headers=api.admin,
+                               data=csv_body, content_type='text/csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [event['type'] for event in events] == ['progress', 'summary']
+    assert events[-1]['created'] == 2
+
+
+def test_only_admins_can_import(api):
+    _, teacher = api.user('t0', 'teacher')
+    status, _ = api.post('/api/users/import', teacher, json={'users': [
+        {'username': 'stu1', 'email': 'stu1@ioedu.com', 'password': 'secret1', 'role': 'admin'}
+    ]})
+    assert status == 403
+    status, _ = api.post('/api/users/import', api.admin, json={'users': []})
+    assert status == 400
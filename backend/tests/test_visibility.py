@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+
+def _titles(api, url, headers):
+    status, body = api.get(url, headers)
+    assert status == 200, body
+    return sorted(experiment['title'] for experiment in body['experiments'])
+
+
+def test_draft_experiments_stay_hidden_until_published(api, school):
+    draft = api.experiment(school.t0, school.course_id, '杨氏模量测定', publish=False)
+    status, _ = api.post('/api/assignments/', school.t0, json={
+        'experiment_id': draft, 'assignee_type': 'student', 'assignee_id': school.s2_id
+    })
+    assert status == 201
+
+    for student in (school.s0, school.s2):
+        assert '杨氏模量测定' not in _titles(api, '/api/experiments/mine', student)
+        assert '杨氏模量测定' not in _titles(api, '/api/experiments/', student)
+        assert api.get(f'/api/experiments/{draft}', student)[0] == 403
+        assert api.post('/api/submissions/', student, json={'experiment_id': draft})[0] == 403
+
+    api.put(f'/api/experiments/{draft}', school.t0, json={'status': 'published'})
+    assert _titles(api, '/api/experiments/mine', school.s0) == ['单摆测重力加速度', '杨氏模量测定']
+    assert _titles(api, '/api/experiments/mine', school.s2) == ['杨氏模量测定']
+    assert api.get(f'/api/experiments/{draft}', school.s2)[0] == 200
+
+    # 取消发布后重新隐藏
+    api.put(f'/api/experiments/{draft}', school.t0, json={'status': 'draft'})
+    assert _titles(api, '/api/experiments/mine', school.s2) == []
+
+
+def test_my_experiments_merge_assignment_sources(api, school):
+    due = datetime.utcnow() + timedelta(days=2)
+    api.post('/api/assignments/', school.t0, json={
+        'experiment_id': school.experiment_id, 'assignee_type': 'class',
+        'assignee_id': school.class_id, 'due_date': due.isoformat()
+    })
+    api.post('/api/assignments/', school.t0, json={
+        'experiment_id': school.experiment_id, 'assignee_type': 'student',
+        'assignee_id': school.s0_id, 'due_date': (due + timedelta(days=1)).isoformat()
+    })
+    unassigned = api.experiment(school.t0, school.course_id, '杨氏模量测定')
+
+    status, body = api.get('/api/experiments/mine', school.s0)
+    items = {item['id']: item for item in body['experiments']}
+    assert items[school.experiment_id]['assigned'] is True
+    assert items[school.experiment_id]['due_date'] == (due + timedelta(days=1)).isoformat()
+    assert (items[unassigned]['assigned'], items[unassigned]['due_date']) == (False, None)
+    # 有截止时间的排在前面
+    assert [item['id'] for item in body['experiments']] == [school.experiment_id, unassigned]
+    assert [item['id'] for item in api.get('/api/experiments/mine?assigned=1', school.s0)[1]['experiments']] \
+        == [school.experiment_id]
+
+
+def test_roster_and_course_links_update_visibility(api, school):
+    assert _titles(api, '/api/experiments/mine', school.s2) == []
+    status, body = api.get('/api/courses/', school.s2)
+    assert body['courses'] == []
+
+    api.put(f'/api/classes/{school.class_id}/students/bulk', school.t0, json={'students': [school.s1_id, school.s2_id]})
+    assert _titles(api, '/api/experiments/mine', school.s2) == ['单摆测重力加速度']
+    assert _titles(api, '/api/experiments/mine', school.s0) == []
+    status, body = api.get('/api/courses/', school.s2)
+    assert [course['id'] for course in body['courses']] == [school.course_id]
+
+    status, _ = api.delete(f'/api/classes/{school.class_id}/courses/{school.course_id}', school.t0)
+    assert status == 200
+    assert _titles(api, '/api/experiments/mine', school.s2) == []
+    assert api.get(f'/api/courses/{school.course_id}', school.s2)[0] == 403
+
+
+def test_teachers_cannot_use_the_student_list(api, school):
+    assert api.get('/api/experiments/mine', school.t0)[0] == 403
+
+
+def test_migration_builds_the_same_index_as_the_application(app, api, school):
+    from sqlalchemy import text
+    from app import db
+    from migrations.v0010_student_visibility import upgrade
+    from utils.visibility import populate
+
+    due = datetime.utcnow() + timedelta(days=1)
+    second = api.experiment(school.t0, school.course_id, '杨氏模量测定')
+    api.experiment(school.t0, school.course_id, '未发布', publish=False)
+    for experiment_id, assignee_type, assignee_id, due_date in (
+            (school.experiment_id, 'class', school.class_id, due),
+            (school.experiment_id, 'student', school.s0_id, None),
+            (second, 'student', school.s2_id, due)):
+        api.post('/api/assignments/', school.t0, json={
+            'experiment_id': experiment_id, 'assignee_type': assignee_type, 'assignee_id': assignee_id,
+            'due_date': due_date.isoformat() if due_date else None
+        })
+
+    def snapshot():
+        return (
+            sorted(db.session.execute(text(
+                'SELECT student_id, experiment_id, course_id, assigned, due_date FROM student_experiment_access'
+            )).all()),
+            sorted(db.session.execute(text('SELECT student_id, course_id FROM student_course_access')).all())
+        )
+
+    with app.app_context():
+        populate(db.session)
+        expected = snapshot()
+        upgrade(db.session.connection())
+        assert snapshot() == expected
+        assert len(expected[0]) == 5
@@ -0,0 +1,67 @@
+from sqlalchemy import func, or_, and_
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from models.class_model import StudentClass
+from models.assignment import ExperimentAssignment
+from models.submission import SubmissionAttemptCounter
+
+
+class AttemptLimitReached(Exception):
+    pass
+
+
+def max_attempts_for(experiment_id, student_id):
+    """学生在该实验上允许的最大尝试次数
+
+    取分配给学生本人或其所在班级的所有分配中最宽松的一个；没有分配时不限制（返回 None）。
+    """
+    enrolled_classes = db.session.query(StudentClass.class_id).filter(StudentClass.student_id == student_id)
+    return db.session.query(func.max(ExperimentAssignment.max_attempts)).filter(
+        ExperimentAssignment.experiment_id == experiment_id,
+        or_(
+            and_(ExperimentAssignment.assignee_type == 'student',
+                 ExperimentAssignment.assignee_id == student_id),
+            and_(ExperimentAssignment.assignee_type == 'class',
+                 ExperimentAssignment.assignee_id.in_(enrolled_classes))
+        )
+    ).scalar()
+
+
+def allocate_attempt(experiment_id, student_id, max_attempts=None):
+    """原子地分配下一个尝试次数，超过 max_attempts 时抛出 AttemptLimitReached
+
+    用一条 INSERT ... ON CONFLICT DO UPDATE ... RETURNING 完成“读取、检查上限、递增”，
+    同一学生同时提交时由数据库行锁串行化，不需要 COUNT 查询。在调用方事务中执行，
+    提交失败回滚时分配的次数一并回滚。
+    """
+    if max_attempts is not None and max_attempts < 1:
+        raise AttemptLimitReached()
+
+    counter = SubmissionAttemptCounter
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert(counter).values(
+            experiment_id=experiment_id, student_id=student_id, last_attempt=1
+        ).on_conflict_do_update(
+            index_elements=['experiment_id', 'student_id'],
+            set_={'last_attempt': counter.last_attempt + 1},
+            where=(counter.last_attempt < max_attempts) if max_attempts is not None else None
+        ).returning(counter.last_attempt)
+        attempt = db.session.execute(statement).scalar()
+    else:
+        row = db.session.query(counter).filter_by(
+            experiment_id=experiment_id, student_id=student_id
+        ).with_for_update().first()
+        if row is None:
+            row = counter(experiment_id=experiment_id, student_id=student_id, last_attempt=0)
+            db.session.add(row)
+        if max_attempts is None or row.last_attempt < max_attempts:
+            row.last_attempt += 1
+            attempt = row.last_attempt
+        else:
+            attempt = None
+
+    if attempt is None:
+        raise AttemptLimitReached()
+    return attempt
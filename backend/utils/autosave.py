@@ -0,0 +1,309 @@
+import json
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, delete, insert, literal, exists
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models.submission import Submission, SubmissionDraftPatch
+from utils.cache import TTLCache
+from utils.json_patch import apply_patch
+from utils.data_values import store_data_values
+from utils.statistics import invalidate_experiment_statistics
+from utils.revisions import document_of, record_revision, rebuild, RevisionNotFound
+from utils.scheduler import deadline_passed
+
+# 自动保存的文档包含这两个字段，patch 路径形如 /content/... 或 /data_values/...
+FIELDS = ('content', 'data_values')
+# 补丁最多在 submission_draft_patches 中停留这么多秒再合并写入 submissions
+DEFAULT_FLUSH_INTERVAL = 5
+# 已批改或已截止的提交不能再修改
+LOCKED_STATUSES = ('graded', 'locked')
+# 条件插入失败（其他进程刚保存或刷新过）后重新读取的次数
+_ATTEMPTS = 3
+
+# 本进程最近保存过的草稿：submission_id -> _State。命中时保存只需插入一行补丁，不读数据库；
+# 其他进程改动过时条件插入失败，丢弃缓存重新读取。ttl 内不重复检查截止时间，
+# 截止后由定时任务把提交改为 locked，插入条件中的状态检查随即生效
+_documents = TTLCache(ttl=60, max_entries=1024)
+_State = namedtuple('_State', 'student_id experiment_id base version document')
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+class DraftNotFound(Exception):
+    pass
+
+
+class DraftForbidden(Exception):
+    pass
+
+
+class DraftLocked(Exception):
+    pass
+
+
+class DraftConflict(Exception):
+    """base_version 与当前版本不一致：version 和 document 为服务器上的当前版本，供客户端合并
+
+    提交在草稿开始后被整体修改时，draft 为尚未写入的草稿内容，不会被丢弃。
+    """
+
+    def __init__(self, version, document, draft=None):
+        super().__init__('版本冲突')
+        self.version = version
+        self.document = document
+        self.draft = draft
+
+
+def _decode(raw):
+    """content/data_values 存的是 JSON 字符串；不是 JSON 对象或数组时按原文处理"""
+    if raw in (None, ''):
+        return ''
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        return raw
+    return value if isinstance(value, (dict, list)) else raw
+
+
+def _encode(value):
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _document(values):
+    """编码后的 {content, data_values} 解码为 patch 作用的文档"""
+    return {field: _decode(values[field]) for field in FIELDS}
+
+
+def _patched(document, patch):
+    document = apply_patch(document, patch)
+    if not isinstance(document, dict) or set(document) != set(FIELDS):
+        raise ValueError('只能修改 content 和 data_values')
+    return {field: _encode(document[field]) for field in FIELDS}
+
+
+def _load_submission(submission_id):
+    return db.session.execute(select(
+        Submission.id, Submission.student_id, Submission.experiment_id, Submission.status,
+        Submission.version, Submission.content, Submission.data_values
+    ).where(Submission.id == submission_id)).first()
+
+
+def _load_patches(submission_id):
+    return db.session.execute(select(
+        SubmissionDraftPatch.base_version, SubmissionDraftPatch.version, SubmissionDraftPatch.patch
+    ).where(SubmissionDraftPatch.submission_id == submission_id)
+        .order_by(SubmissionDraftPatch.version)).all()
+
+
+def _replay(values, patches, base):
+    """从版本 base 的内容依次应用补丁，返回 (最后版本, 内容)；只应用从 base 开始连续的补丁"""
+    version = base
+    for patch in patches:
+        if patch.base_version != base or patch.version != version + 1:
+            continue
+        values = _patched(_document(values), json.loads(patch.patch))
+        version = patch.version
+    return version, values
+
+
+def _stale_draft(submission_id, patches):
+    """提交被整体修改前的草稿：从补丁基于的历史版本重放，历史版本缺失时返回 None"""
+    base = patches[0].base_version
+    try:
+        values = rebuild(submission_id, base)
+    except RevisionNotFound:
+        return None
+    return _document(_replay(values, patches, base)[1])
+
+
+def _load(submission_id, student_id, base_version):
+    """缓存未命中时读取提交和补丁，重放出当前草稿；返回 _State
+
+    补丁基于的版本已被整体修改覆盖时，客户端以提交的当前版本保存表示已合并，删除过期补丁；
+    否则抛出 DraftConflict 并带上过期的草稿。
+    """
+    row = _load_submission(submission_id)
+    if row is None:
+        raise DraftNotFound()
+    if row.student_id != student_id:
+        raise DraftForbidden()
+    if row.status in LOCKED_STATUSES or deadline_passed(row.experiment_id, student_id):
+        raise DraftLocked()
+
+    values = {field: getattr(row, field) for field in FIELDS}
+    patches = _load_patches(submission_id)
+    stale = [patch for patch in patches if patch.base_version != row.version]
+    if stale:
+        if base_version != row.version:
+            raise DraftConflict(row.version, _document(values), draft=_stale_draft(submission_id, stale))
+        db.session.execute(delete(SubmissionDraftPatch).where(
+            SubmissionDraftPatch.submission_id == submission_id,
+            SubmissionDraftPatch.base_version != row.version
+        ).execution_options(synchronize_session=False))
+        db.session.commit()
+
+    version, values = _replay(values, patches, row.version)
+    return _State(row.student_id, row.experiment_id, row.version, version, values)
+
+
+def _append(submission_id, state, patch):
+    """插入一行补丁，条件是提交仍为 state.base 版本且未锁定；被其他进程抢先时返回 False"""
+    version = state.version + 1
+    current = exists().where(
+        Submission.id == submission_id,
+        Submission.version == state.base,
+        Submission.status.notin_(LOCKED_STATUSES)
+    )
+    try:
+        inserted = db.session.execute(insert(SubmissionDraftPatch).from_select(
+            ['submission_id', 'version', 'base_version', 'patch', 'created_at'],
+            select(literal(submission_id), literal(version), literal(state.base),
+                   literal(json.dumps(patch, ensure_ascii=False)), literal(datetime.utcnow())).where(current)
+        )).rowcount
+    except IntegrityError:
+        inserted = 0
+    if not inserted:
+        db.session.rollback()
+        return False
+    db.session.commit()
+    return True
+
+
+def autosave(submission_id, student_id, base_version, patch):
+    """把 patch 追加为一行补丁，返回新版本号
+
+    本进程缓存了该草稿时只插入一行补丁；后台线程按间隔把补丁合并写入提交（见 _write）。
+    base_version 必须等于当前版本（有未写入的补丁时为最后一个补丁的版本），否则抛出 DraftConflict。
+    """
+    _ensure_flusher()
+    for _ in range(_ATTEMPTS):
+        state = _documents.get(submission_id)
+        if state is None or state.version != base_version:
+            state = _load(submission_id, student_id, base_version)
+            _documents.set(submission_id, state)
+        if state.student_id != student_id:
+            raise DraftForbidden()
+        if state.version != base_version:
+            raise DraftConflict(state.version, _document(state.document))
+
+        values = _patched(_document(state.document), patch)
+        if _append(submission_id, state, patch):
+            _documents.set(submission_id, state._replace(version=base_version + 1, document=values))
+            return base_version + 1
+        _documents.invalidate(submission_id)
+
+    state = _load(submission_id, student_id, base_version)
+    raise DraftConflict(state.version, _document(state.document))
+
+
+def _write(submission_id):
+    """在单独的事务中把一个提交的补丁合并写入提交，返回是否写入
+
+    以补丁的 base_version 做条件更新；提交已被整体修改或已锁定时保留补丁，由学生下次保存时合并。
+    """
+    row = _load_submission(submission_id)
+    patches = _load_patches(submission_id)
+    if row is None or not patches:
+        db.session.rollback()
+        return False
+    version, values = _replay({field: getattr(row, field) for field in FIELDS}, patches, row.version)
+    if version == row.version:
+        db.session.rollback()
+        return False
+
+    written = db.session.execute(
+        update(Submission).where(
+            Submission.id == submission_id,
+            Submission.version == row.version,
+            Submission.status.notin_(LOCKED_STATUSES)
+        ).values(version=version, **values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not written:
+        db.session.rollback()
+        return False
+
+    if values['data_values'] != row.data_values:
+        store_data_values(db.session.get(Submission, submission_id, populate_existing=True))
+    # 合并的多次保存作为一个历史版本记录
+    record_revision(
+        submission_id, version, document_of(values['content'], values['data_values']),
+        previous=(row.version, document_of(row.content, row.data_values)), author_id=row.student_id
+    )
+    db.session.execute(delete(SubmissionDraftPatch).where(
+        SubmissionDraftPatch.submission_id == submission_id,
+        SubmissionDraftPatch.version <= version
+    ).execution_options(synchronize_session=False))
+    # 读取补丁后又有新的保存：保留新补丁，改为基于刚写入的版本
+    db.session.execute(update(SubmissionDraftPatch).where(
+        SubmissionDraftPatch.submission_id == submission_id
+    ).values(base_version=version).execution_options(synchronize_session=False))
+    db.session.commit()
+
+    state = _documents.get(submission_id)
+    if state is not None and state.base == row.version:
+        _documents.set(submission_id, state._replace(base=version))
+    invalidate_experiment_statistics(row.experiment_id)
+    return True
+
+
+def flush_drafts(force=False, submission_id=None):
+    """把补丁合并写入提交：默认只写最早的补丁已超过刷新间隔的，force=True 时全部写入
+
+    每个提交单独提交事务，一个失败不影响其他。返回写入的提交个数。
+    """
+    query = select(SubmissionDraftPatch.submission_id).distinct()
+    if submission_id is not None:
+        query = query.where(SubmissionDraftPatch.submission_id == submission_id)
+    elif not force:
+        interval = current_app.config.get('AUTOSAVE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        query = query.where(SubmissionDraftPatch.created_at <= datetime.utcnow() - timedelta(seconds=interval))
+    pending = db.session.execute(query).scalars().all()
+
+    flushed = 0
+    for pending_id in pending:
+        try:
+            if _write(pending_id):
+                flushed += 1
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('autosave flush failed for submission %s', pending_id)
+    return flushed
+
+
+def flush_draft(submission_id):
+    """读取、整体修改或批改提交前调用：写入该提交尚未写入的自动保存内容"""
+    if db.session.execute(select(SubmissionDraftPatch.submission_id).where(
+        SubmissionDraftPatch.submission_id == submission_id
+    )).first() is not None:
+        flush_drafts(submission_id=submission_id)
+
+
+def _ensure_flusher():
+    """每个进程首次自动保存时启动后台刷新线程（在 fork 之后创建，不会被工作进程继承丢失）"""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    app = current_app._get_current_object()
+    interval = app.config.get('AUTOSAVE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    def _run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    flush_drafts()
+                except Exception:
+                    app.logger.exception('autosave flush failed')
+
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_run, name='autosave-flusher', daemon=True)
+            _flusher.start()
@@ -0,0 +1,99 @@
+import json
+import math
+from app import db
+from models.experiment import DataPoint
+from models.submission import SubmissionValue
+
+
+def parse_data_values(raw):
+    """解析 data_values JSON，返回 {数据点ID或名称: 值}
+
+    支持对象形式 {"12": 3.5, "温度": "20"} 和列表形式 [{"data_point_id": 12, "value": 3.5}]。
+    无法解析时返回空字典。
+    """
+    if not raw:
+        return {}
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return {}
+
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, list):
+        return {
+            item.get('data_point_id', item.get('name')): item.get('value')
+            for item in raw if isinstance(item, dict)
+        }
+    return {}
+
+
+def typed_value(data_point, value):
+    """按数据点类型把取值转换为 (num_value, text_value, option_value)"""
+    if value is None or value == '':
+        return None, None, None
+    if data_point.type == 'number':
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None, str(value), None
+        # inf、nan 不是有效的测量值，按原文保存，不参与数值统计
+        if not math.isfinite(number):
+            return None, str(value), None
+        return number, None, None
+    if data_point.type == 'select':
+        return None, None, str(value)
+    return None, value if isinstance(value, str) else json.dumps(value, ensure_ascii=False), None
+
+
+def store_data_values(submission):
+    """按 submission.data_values 重写该提交的分列取值，在调用方事务中执行"""
+    values = parse_data_values(submission.data_values)
+
+    if submission.id is None:
+        db.session.flush()
+    SubmissionValue.query.filter_by(submission_id=submission.id).delete(synchronize_session=False)
+    if not values:
+        return
+
+    data_points = DataPoint.query.filter_by(experiment_id=submission.experiment_id).all()
+    by_key = {}
+    for data_point in data_points:
+        by_key[str(data_point.id)] = data_point
+        by_key.setdefault(data_point.name, data_point)
+
+    rows = []
+    seen = set()
+    for key, value in values.items():
+        data_point = by_key.get(str(key))
+        if data_point is None or data_point.id in seen:
+            continue
+        num_value, text_value, option_value = typed_value(data_point, value)
+        if num_value is None and text_value is None and option_value is None:
+            continue
+        seen.add(data_point.id)
+        rows.append({
+            'submission_id': submission.id,
+            'data_point_id': data_point.id,
+            'experiment_id': submission.experiment_id,
+            'num_value': num_value,
+            'text_value': text_value,
+            'option_value': option_value
+        })
+
+    if rows:
+        db.session.execute(SubmissionValue.__table__.insert(), rows)
+
+
+def numeric_values_query(experiment_id, data_point_id=None):
+    """某实验数值型数据点的取值查询 (data_point_id, submission_id, num_value)，走覆盖索引"""
+    query = db.session.query(
+        SubmissionValue.data_point_id, SubmissionValue.submission_id, SubmissionValue.num_value
+    ).filter(
+        SubmissionValue.experiment_id == experiment_id,
+        SubmissionValue.num_value.isnot(None)
+    )
+    if data_point_id is not None:
+        query = query.filter(SubmissionValue.data_point_id == data_point_id)
+    return query
@@ -0,0 +1,60 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """由 DB_* 配置生成 SQLALCHEMY_ENGINE_OPTIONS"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+    # 内存 SQLite 使用单连接池，不支持连接数相关参数
+    if not _is_memory_sqlite(url):
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+        )
+    if url.get_backend_name() == 'sqlite':
+        # 等待写锁由 busy_timeout 负责；允许连接在池中跨线程复用
+        options['connect_args'] = {
+            'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000,
+            'check_same_thread': False,
+        }
+    return options
+
+
+def configure_sqlite(engine, config):
+    """为每个新的 SQLite 连接设置 pragma
+
+    WAL 模式下读不阻塞写、写不阻塞读，批改等写事务进行时学生仍可正常读取；
+    synchronous=NORMAL 在 WAL 下只在检查点时同步磁盘，仍能保证崩溃后数据库一致。
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    memory = _is_memory_sqlite(engine.url)
+    pragmas = [
+        'PRAGMA busy_timeout = %d' % config['SQLITE_BUSY_TIMEOUT'],
+        'PRAGMA cache_size = %d' % config['SQLITE_CACHE_SIZE'],
+    ]
+    if not memory:
+        pragmas += [
+            'PRAGMA journal_mode = WAL',
+            'PRAGMA synchronous = NORMAL',
+            'PRAGMA mmap_size = %d' % config['SQLITE_MMAP_SIZE'],
+        ]
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
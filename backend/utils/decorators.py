@@ -1,15 +1,13 @@
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import get_jwt_identity
-from models.user import User
+from utils.identity import current_identity
 
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        identity = current_identity()
         
-        if not user or user.role != 'admin':
+        if not identity or not identity.is_active or identity.role != 'admin':
             return jsonify({'message': '需要管理员权限'}), 403
         
         return f(*args, **kwargs)
@@ -18,10 +16,9 @@ def admin_required(f):
 def teacher_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        identity = current_identity()
         
-        if not user or user.role not in ['admin', 'teacher']:
+        if not identity or not identity.is_active or identity.role not in ['admin', 'teacher']:
             return jsonify({'message': '需要教师权限'}), 403
         
         return f(*args, **kwargs)
@@ -30,11 +27,10 @@ def teacher_required(f):
 def student_or_teacher_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        identity = current_identity()
         
-        if not user or user.role not in ['admin', 'teacher', 'student']:
+        if not identity or not identity.is_active or identity.role not in ['admin', 'teacher', 'student']:
             return jsonify({'message': '需要登录'}), 403
         
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
@@ -0,0 +1,131 @@
+import csv
+import io
+from sqlalchemy import or_
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from models.user import User
+from models.class_model import Class, StudentClass
+
+# 单条 INSERT 语句中的最大行数，避免超出数据库绑定参数上限
+INSERT_CHUNK_SIZE = 500
+
+
+def parse_student_refs(request):
+    """从请求中读取学生列表
+
+    JSON: {"students": [12, "2024001", ...]}，整数视为学生ID，字符串视为用户名；
+    CSV（text/csv 请求体或 multipart 的 file 字段）：表头含 student_id 或 username 列，
+    没有可识别表头时第一列视为用户名。
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+    elif request.mimetype == 'text/csv':
+        text = request.get_data(as_text=True)
+    else:
+        data = request.get_json() or {}
+        return list(data.get('students') or [])
+
+    rows = [row for row in csv.reader(io.StringIO(text)) if row and row[0].strip()]
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    if 'student_id' in header:
+        index = header.index('student_id')
+        return [_to_int(row[index]) for row in rows[1:] if len(row) > index]
+    if 'username' in header:
+        index = header.index('username')
+        return [row[index].strip() for row in rows[1:] if len(row) > index]
+    return [row[0].strip() for row in rows]
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value.strip()
+
+
+def _insert_ignore_conflicts(rows):
+    """批量插入选课记录，已存在的 (student_id, class_id) 由 unique_student_class 约束忽略，返回实际插入行数"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        insert = sqlite.insert
+    elif dialect == 'postgresql':
+        insert = postgresql.insert
+    else:
+        insert = None
+
+    inserted = 0
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + INSERT_CHUNK_SIZE]
+        if insert is not None:
+            statement = insert(StudentClass).values(chunk).on_conflict_do_nothing(
+                index_elements=['student_id', 'class_id']
+            )
+            inserted += db.session.execute(statement).rowcount
+        else:
+            db.session.execute(StudentClass.__table__.insert(), chunk)
+            inserted += len(chunk)
+    return inserted
+
+
+def enroll_students(class_id, refs, sync=False):
+    """批量加入学生，sync=True 时同步为名单：不在名单中的已有学生会被移出
+
+    所有校验都是集合查询（一次查学生、一次查现有选课），增删在调用方的同一事务中完成。
+    返回 (结果列表, 新增人数, 移出人数)。
+    """
+    ids = {ref for ref in refs if isinstance(ref, int)}
+    usernames = {ref for ref in refs if isinstance(ref, str) and ref}
+
+    users = []
+    if ids or usernames:
+        users = User.query.filter(or_(User.id.in_(ids), User.username.in_(usernames))).all()
+    by_id = {user.id: user for user in users}
+    by_username = {user.username: user for user in users}
+
+    enrolled = {
+        student_id for (student_id,) in
+        db.session.query(StudentClass.student_id).filter_by(class_id=class_id)
+    }
+
+    results = []
+    roster = set()
+    to_add = []
+    for ref in refs:
+        user = by_id.get(ref) if isinstance(ref, int) else by_username.get(ref)
+        result = {'ref': ref, 'student_id': user.id if user else None}
+        if user is None:
+            result['status'] = 'not_found'
+        elif user.role != 'student':
+            result['status'] = 'not_student'
+        elif user.id in roster:
+            result['status'] = 'duplicate'
+        elif user.id in enrolled:
+            result['status'] = 'already_enrolled'
+        else:
+            result['status'] = 'added'
+            to_add.append({'student_id': user.id, 'class_id': class_id})
+        if user is not None and user.role == 'student':
+            roster.add(user.id)
+        results.append(result)
+
+    added = _insert_ignore_conflicts(to_add) if to_add else 0
+
+    removed = 0
+    if sync:
+        to_remove = enrolled - roster
+        if to_remove:
+            removed = StudentClass.query.filter(
+                StudentClass.class_id == class_id,
+                StudentClass.student_id.in_(to_remove)
+            ).delete(synchronize_session=False)
+            results.extend({'ref': student_id, 'student_id': student_id, 'status': 'removed'}
+                           for student_id in sorted(to_remove))
+
+    if added or removed:
+        Class.adjust_student_count(class_id, added - removed)
+
+    return results, added, removed
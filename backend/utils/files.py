@@ -0,0 +1,303 @@
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models.submission import Submission
+from models.file import FileBlob, FileBlobUploader, UploadSession, SubmissionFile
+from utils.scopes import submission_scope
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+# 读写文件时的缓冲大小
+COPY_BUFFER_SIZE = 1024 * 1024
+# 超过该时间未更新的上传会话视为放弃
+STALE_UPLOAD_AGE = timedelta(days=1)
+
+
+class UploadError(ValueError):
+    """上传请求无效，status 为对应的 HTTP 状态码"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _storage_root():
+    return current_app.config['UPLOAD_FOLDER']
+
+
+def blob_path(sha256):
+    """内容文件路径：按摘要前两级分目录，避免单个目录文件过多"""
+    return os.path.join(_storage_root(), 'blobs', sha256[:2], sha256[2:4], sha256)
+
+
+def _part_path(upload_id):
+    return os.path.join(_storage_root(), 'partial', upload_id)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def find_blob(sha256, size=None):
+    if not sha256 or not SHA256_PATTERN.match(sha256):
+        return None
+    blob = db.session.get(FileBlob, sha256)
+    if blob is None or (size is not None and blob.size != size):
+        return None
+    return blob
+
+
+def has_uploaded(sha256, user_id):
+    return db.session.get(FileBlobUploader, (sha256, user_id)) is not None
+
+
+def _add_uploader(sha256, user_id):
+    if not has_uploaded(sha256, user_id):
+        db.session.add(FileBlobUploader(sha256=sha256, user_id=user_id))
+
+
+def cleanup_stale_uploads(now=None):
+    """删除长时间未更新的上传会话及其临时文件"""
+    cutoff = (now or datetime.utcnow()) - STALE_UPLOAD_AGE
+    stale = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in stale:
+        _remove(_part_path(upload.id))
+        db.session.delete(upload)
+    return len(stale)
+
+
+def create_upload(owner_id, filename, total_size, content_type=None, sha256=None):
+    """开始上传；若该用户上传过声明摘要对应的文件，直接返回该文件，无需再传输内容
+
+    只知道摘要不能取得文件：其他用户上传过的内容仍需完整上传一次（完成时只保留一份存储）。
+    返回 (blob, upload)，两者恰有一个不为 None。
+    """
+    max_size = current_app.config['MAX_UPLOAD_SIZE']
+    if not filename:
+        raise UploadError('文件名不能为空')
+    if not isinstance(total_size, int) or isinstance(total_size, bool) or total_size < 0:
+        raise UploadError('文件大小无效')
+    if total_size > max_size:
+        raise UploadError('文件大小超过限制', 413)
+    if sha256 is not None:
+        sha256 = str(sha256).lower()
+        if not SHA256_PATTERN.match(sha256):
+            raise UploadError('无效的 SHA-256 摘要')
+
+    blob = find_blob(sha256, total_size)
+    if blob is not None and has_uploaded(blob.sha256, owner_id):
+        return blob, None
+
+    cleanup_stale_uploads()
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        owner_id=owner_id,
+        filename=os.path.basename(filename)[:255],
+        content_type=content_type,
+        total_size=total_size,
+        sha256=sha256,
+        received=0
+    )
+    os.makedirs(os.path.dirname(_part_path(upload.id)), exist_ok=True)
+    open(_part_path(upload.id), 'wb').close()
+    db.session.add(upload)
+    return None, upload
+
+
+def parse_content_range(header, upload, content_length):
+    """解析 Content-Range（bytes start-end/total），没有时默认从当前偏移续传"""
+    if not header:
+        if content_length is None:
+            raise UploadError('缺少 Content-Length', 411)
+        return upload.received, upload.received + content_length
+    match = _CONTENT_RANGE.match(header.strip())
+    if not match:
+        raise UploadError('无效的 Content-Range')
+    start, end = int(match.group(1)), int(match.group(2)) + 1
+    if end <= start or (match.group(3) != '*' and int(match.group(3)) != upload.total_size):
+        raise UploadError('无效的 Content-Range')
+    if content_length is not None and content_length != end - start:
+        raise UploadError('Content-Range 与 Content-Length 不一致')
+    return start, end
+
+
+def write_chunk(upload, start, end, stream):
+    """写入一个分块，start 必须等于已接收的字节数
+
+    先用条件 UPDATE 占用 [start, end) 区间，同一会话的并发请求只有一个能成功；
+    写入失败时归还区间，客户端可从原偏移重试。
+    """
+    if end > upload.total_size:
+        raise UploadError('分块超出文件大小', 416)
+
+    claimed = UploadSession.query.filter(
+        UploadSession.id == upload.id, UploadSession.received == start
+    ).update({UploadSession.received: end, UploadSession.updated_at: datetime.utcnow()},
+             synchronize_session=False)
+    db.session.commit()
+    if not claimed:
+        raise UploadError('分块偏移不匹配', 409)
+
+    written = 0
+    try:
+        with open(_part_path(upload.id), 'r+b') as part:
+            part.seek(start)
+            while written < end - start:
+                data = stream.read(min(COPY_BUFFER_SIZE, end - start - written))
+                if not data:
+                    break
+                part.write(data)
+                written += len(data)
+            part.truncate(start + written)
+    finally:
+        if written != end - start:
+            UploadSession.query.filter(
+                UploadSession.id == upload.id, UploadSession.received == end
+            ).update({UploadSession.received: start}, synchronize_session=False)
+            db.session.commit()
+    if written != end - start:
+        raise UploadError('分块数据不完整')
+
+    db.session.refresh(upload)
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for data in iter(lambda: source.read(COPY_BUFFER_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def complete_upload(upload):
+    """所有分块到齐后校验摘要并归档为内容文件；相同内容已存在时只删除临时文件"""
+    part = _part_path(upload.id)
+    sha256 = _file_digest(part)
+    if upload.sha256 and upload.sha256 != sha256:
+        _remove(part)
+        db.session.delete(upload)
+        db.session.commit()
+        raise UploadError('文件摘要校验失败', 422)
+
+    target = blob_path(sha256)
+    if os.path.exists(target):
+        _remove(part)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(part, target)
+
+    owner_id = upload.owner_id
+    blob = db.session.get(FileBlob, sha256)
+    if blob is None:
+        blob = FileBlob(sha256=sha256, size=upload.total_size,
+                        content_type=upload.content_type, created_by=owner_id)
+        db.session.add(blob)
+        db.session.flush()
+    _add_uploader(sha256, owner_id)
+    db.session.delete(upload)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # 并发上传了相同内容
+        db.session.rollback()
+        UploadSession.query.filter_by(id=upload.id).delete()
+        _add_uploader(sha256, owner_id)
+        db.session.commit()
+        blob = db.session.get(FileBlob, sha256)
+    return blob
+
+
+def cancel_upload(upload):
+    _remove(_part_path(upload.id))
+    db.session.delete(upload)
+
+
+def parse_file_refs(raw):
+    """提交中的文件引用：[{"sha256": ..., "filename": ...}] 或摘要字符串列表（也接受 JSON 字符串）"""
+    if raw in (None, ''):
+        return []
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raise UploadError('文件列表格式无效')
+    if not isinstance(raw, list):
+        raise UploadError('文件列表格式无效')
+
+    refs = []
+    for item in raw:
+        if isinstance(item, str):
+            item = {'sha256': item}
+        if not isinstance(item, dict) or not isinstance(item.get('sha256'), str):
+            raise UploadError('文件列表格式无效')
+        refs.append((item['sha256'].lower(), item.get('filename')))
+    return refs
+
+
+def attach_files(submission, refs):
+    """用文件引用替换提交的文件列表
+
+    摘要必须是提交者本人上传过的文件，或该提交已经引用的文件；否则与不存在一样返回 404，
+    不透露其他用户的文件是否存在。files 字段同步保存为 JSON，保持原有响应格式。
+    """
+    unique = {}
+    for sha256, filename in refs:
+        unique.setdefault(sha256, filename)
+
+    blobs = {}
+    if unique:
+        uploaded = db.session.query(FileBlobUploader.sha256).filter(
+            FileBlobUploader.user_id == submission.student_id,
+            FileBlobUploader.sha256.in_(list(unique))
+        )
+        allowed = FileBlob.sha256.in_(uploaded)
+        if submission.id is not None:
+            referenced = db.session.query(SubmissionFile.sha256).filter(
+                SubmissionFile.submission_id == submission.id
+            )
+            allowed = allowed | FileBlob.sha256.in_(referenced)
+        blobs = {blob.sha256: blob for blob in FileBlob.query.filter(
+            FileBlob.sha256.in_(list(unique)), allowed
+        )}
+    missing = [sha256 for sha256 in unique if sha256 not in blobs]
+    if missing:
+        raise UploadError('文件不存在: %s' % ', '.join(missing), 404)
+
+    if submission.id is None:
+        db.session.flush()
+    SubmissionFile.query.filter_by(submission_id=submission.id).delete(synchronize_session=False)
+
+    files = []
+    for sha256, filename in unique.items():
+        filename = os.path.basename(filename or sha256)[:255]
+        db.session.add(SubmissionFile(submission_id=submission.id, sha256=sha256, filename=filename))
+        files.append({'sha256': sha256, 'filename': filename, 'size': blobs[sha256].size})
+    submission.files = json.dumps(files, ensure_ascii=False) if files else ''
+
+
+def can_download(blob, identity):
+    """管理员可以下载所有文件；其他用户可以下载自己上传的文件，以及自己可访问的提交中引用的文件
+
+    学生可访问的是自己的提交，教师是自己课程实验的提交（见 utils/scopes.py）。
+    """
+    if identity.role == 'admin':
+        return True
+    if has_uploaded(blob.sha256, identity.id):
+        return True
+    query = db.session.query(SubmissionFile.id).join(
+        Submission, Submission.id == SubmissionFile.submission_id
+    ).filter(SubmissionFile.sha256 == blob.sha256)
+    scope = submission_scope(identity)
+    if scope is not None:
+        query = query.filter(scope)
+    return query.first() is not None
+
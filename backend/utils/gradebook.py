@@ -0,0 +1,168 @@
+from sqlalchemy import func, and_
+from app import db
+from models.user import User
+from models.experiment import Experiment
+from models.class_model import StudentClass, ClassCourse
+from models.submission import Submission
+from models.gradebook import GradebookEntry
+
+POLICIES = ('best', 'latest', 'average')
+
+
+def _aggregate(condition):
+    """对满足条件的已批改提交按 (学生, 实验) 做一次分组聚合，
+    返回 student_id, experiment_id, best_score, latest_score, score_sum, graded_count
+    """
+    graded = and_(Submission.status == 'graded', Submission.score.isnot(None), condition)
+    summary = db.session.query(
+        Submission.student_id.label('student_id'),
+        Submission.experiment_id.label('experiment_id'),
+        func.max(Submission.score).label('best_score'),
+        func.sum(Submission.score).label('score_sum'),
+        func.count(Submission.id).label('graded_count'),
+        func.max(Submission.attempt_number).label('latest_attempt')
+    ).filter(graded).group_by(Submission.student_id, Submission.experiment_id).subquery()
+
+    latest = db.session.query(
+        Submission.student_id, Submission.experiment_id, Submission.attempt_number,
+        func.max(Submission.score).label('score')
+    ).filter(graded).group_by(
+        Submission.student_id, Submission.experiment_id, Submission.attempt_number
+    ).subquery()
+
+    return db.session.query(
+        summary.c.student_id, summary.c.experiment_id, summary.c.best_score,
+        latest.c.score.label('latest_score'), summary.c.score_sum, summary.c.graded_count
+    ).join(latest, and_(
+        latest.c.student_id == summary.c.student_id,
+        latest.c.experiment_id == summary.c.experiment_id,
+        latest.c.attempt_number == summary.c.latest_attempt
+    ))
+
+
+def refresh_entries(pairs):
+    """增量刷新指定 (student_id, experiment_id) 的成绩册单元格，在调用方事务中执行
+
+    只重新聚合涉及的学生和实验的提交，而不是重建整个成绩册。
+    按学生集合 × 实验集合刷新，多出的组合重新聚合后结果不变。
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+
+    student_ids = sorted({student_id for student_id, _ in pairs})
+    experiment_ids = sorted({experiment_id for _, experiment_id in pairs})
+    rows = _aggregate(and_(
+        Submission.student_id.in_(student_ids),
+        Submission.experiment_id.in_(experiment_ids)
+    )).all()
+
+    GradebookEntry.query.filter(
+        GradebookEntry.student_id.in_(student_ids),
+        GradebookEntry.experiment_id.in_(experiment_ids)
+    ).delete(synchronize_session=False)
+
+    if rows:
+        db.session.execute(GradebookEntry.__table__.insert(), [{
+            'student_id': row.student_id,
+            'experiment_id': row.experiment_id,
+            'best_score': row.best_score,
+            'latest_score': row.latest_score,
+            'score_sum': row.score_sum,
+            'graded_count': row.graded_count
+        } for row in rows])
+
+
+def _scoped_queries(class_id=None, course_id=None):
+    """成绩册的学生查询和实验查询
+
+    班级成绩册：班级学生 × 班级关联课程下的实验；课程成绩册：关联班级的全部学生 × 课程实验。
+    """
+    students_query = db.session.query(User.id, User.username).join(
+        StudentClass, StudentClass.student_id == User.id
+    )
+    experiments_query = db.session.query(Experiment.id, Experiment.title, Experiment.max_score, Experiment.course_id)
+
+    if class_id is not None:
+        students_query = students_query.filter(StudentClass.class_id == class_id)
+        class_courses = db.session.query(ClassCourse.course_id).filter(ClassCourse.class_id == class_id)
+        experiments_query = experiments_query.filter(Experiment.course_id.in_(class_courses))
+    if course_id is not None:
+        course_classes = db.session.query(ClassCourse.class_id).filter(ClassCourse.course_id == course_id)
+        students_query = students_query.filter(StudentClass.class_id.in_(course_classes))
+        experiments_query = experiments_query.filter(Experiment.course_id == course_id)
+
+    return students_query.distinct(), experiments_query.order_by(Experiment.course_id, Experiment.id)
+
+
+def _policy_column(policy):
+    if policy == 'latest':
+        return GradebookEntry.latest_score
+    if policy == 'average':
+        return GradebookEntry.score_sum / func.nullif(GradebookEntry.graded_count, 0)
+    return GradebookEntry.best_score
+
+
+def gradebook_rows(policy='best', class_id=None, course_id=None, chunk_size=1000):
+    """按学生流式生成成绩册行，用于导出
+
+    返回 (实验列表, 行迭代器)，每行为 [学生ID, 用户名, 各实验成绩...]。
+    学生与成绩单元格用一条外连接查询按学生排序读取，逐块迭代，内存占用与学生数无关。
+    """
+    students_query, experiments_query = _scoped_queries(class_id, course_id)
+    experiments = experiments_query.all()
+    positions = {experiment.id: index for index, experiment in enumerate(experiments)}
+
+    students = students_query.subquery()
+    cells = db.session.query(
+        students.c.id, students.c.username, GradebookEntry.experiment_id, _policy_column(policy)
+    ).outerjoin(GradebookEntry, and_(
+        GradebookEntry.student_id == students.c.id,
+        GradebookEntry.experiment_id.in_(list(positions) or [0])
+    )).order_by(students.c.username, students.c.id).execution_options(yield_per=chunk_size)
+
+    def rows():
+        current = None
+        for student_id, username, experiment_id, score in cells:
+            if current is None or current[0] != student_id:
+                if current is not None:
+                    yield current
+                current = [student_id, username] + [None] * len(experiments)
+            if experiment_id is not None:
+                current[2 + positions[experiment_id]] = score
+        if current is not None:
+            yield current
+
+    return experiments, rows()
+
+
+def gradebook_matrix(policy='best', class_id=None, course_id=None):
+    """学生 × 实验的成绩矩阵，成绩取自物化的成绩册单元格，一次查询读取"""
+    students_query, experiments_query = _scoped_queries(class_id, course_id)
+    students = students_query.order_by(User.username).all()
+    experiments = experiments_query.all()
+
+    student_ids = [student.id for student in students]
+    experiment_ids = [experiment.id for experiment in experiments]
+    cells = {}
+    if student_ids and experiment_ids:
+        entries = GradebookEntry.query.filter(
+            GradebookEntry.student_id.in_(student_ids),
+            GradebookEntry.experiment_id.in_(experiment_ids)
+        )
+        cells = {(entry.student_id, entry.experiment_id): entry.score(policy) for entry in entries}
+
+    return {
+        'policy': policy,
+        'experiments': [{
+            'id': experiment.id,
+            'title': experiment.title,
+            'max_score': experiment.max_score,
+            'course_id': experiment.course_id
+        } for experiment in experiments],
+        'students': [{
+            'id': student.id,
+            'username': student.username,
+            'scores': [cells.get((student.id, experiment_id)) for experiment_id in experiment_ids]
+        } for student in students]
+    }
@@ -0,0 +1,75 @@
+import time
+from collections import namedtuple
+from flask import g, current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from app import db
+from models.user import User
+
+# 当前请求用户的身份信息，处理函数只需要这几个字段
+Identity = namedtuple('Identity', ['id', 'role', 'is_active'])
+
+# user_id -> 角色/状态最近一次变更的时间戳（本进程内）
+# 早于该时间签发的令牌，其角色声明不再可信
+_invalidated_at = {}
+
+
+def identity_claims(user):
+    """签发令牌时附带的角色与启用状态声明"""
+    if not current_app.config.get('JWT_ROLE_CLAIMS'):
+        return {}
+    return {'role': user.role, 'active': bool(user.is_active)}
+
+
+def invalidate_identity(user_id):
+    """用户角色或启用状态变更后调用，使已签发令牌中的声明失效"""
+    _invalidated_at[user_id] = time.time()
+    if g.get('current_user') is not None and g.current_user.id == user_id:
+        g.pop('current_user')
+        g.pop('current_identity', None)
+
+
+def get_current_user_id():
+    identity = get_jwt_identity()
+    return int(identity) if identity is not None else None
+
+
+def get_current_user():
+    """当前请求的用户对象，每个请求最多查询一次数据库"""
+    if 'current_user' not in g:
+        g.current_user = db.session.get(User, get_current_user_id())
+    return g.current_user
+
+
+def _identity_from_claims(user_id):
+    if not current_app.config.get('JWT_ROLE_CLAIMS'):
+        return None
+
+    claims = get_jwt()
+    if 'role' not in claims:
+        return None
+
+    # 声明只在有限时间内可信，超时后回落到数据库，保证角色变更在该时间内生效
+    max_age = current_app.config['JWT_ROLE_CLAIMS_MAX_AGE'].total_seconds()
+    issued_at = claims.get('iat', 0)
+    if time.time() - issued_at > max_age:
+        return None
+    if issued_at <= _invalidated_at.get(user_id, 0):
+        return None
+
+    return Identity(user_id, claims['role'], claims.get('active', True))
+
+
+def current_identity():
+    """当前请求用户的 id、角色和启用状态
+
+    开启 JWT_ROLE_CLAIMS 时优先使用令牌中的声明，无需访问数据库；
+    否则（或声明已过期/失效）使用按请求缓存的用户对象。用户不存在时返回 None。
+    """
+    if 'current_identity' not in g:
+        user_id = get_current_user_id()
+        identity = _identity_from_claims(user_id)
+        if identity is None:
+            user = get_current_user()
+            identity = Identity(user.id, user.role, user.is_active) if user else None
+        g.current_identity = identity
+    return g.current_identity
@@ -0,0 +1,127 @@
+import copy
+
+
+class JsonPatchError(ValueError):
+    pass
+
+
+def _parse_pointer(pointer):
+    """JSON Pointer（RFC 6901）拆分为路径段"""
+    if pointer == '':
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith('/'):
+        raise JsonPatchError('无效的路径: %r' % (pointer,))
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def _index(container, token, allow_end=False):
+    if token == '-' and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0'):
+        raise JsonPatchError('无效的数组下标: %s' % token)
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError('数组下标越界: %s' % token)
+    return index
+
+
+def _resolve(doc, parts):
+    """返回路径最后一段的父容器"""
+    target = doc
+    for token in parts[:-1]:
+        if isinstance(target, dict):
+            if token not in target:
+                raise JsonPatchError('路径不存在: /%s' % '/'.join(parts))
+            target = target[token]
+        elif isinstance(target, list):
+            target = target[_index(target, token)]
+        else:
+            raise JsonPatchError('路径不存在: /%s' % '/'.join(parts))
+    return target
+
+
+def _get(doc, parts):
+    if not parts:
+        return doc
+    parent = _resolve(doc, parts)
+    token = parts[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise JsonPatchError('路径不存在: /%s' % '/'.join(parts))
+        return parent[token]
+    if isinstance(parent, list):
+        return parent[_index(parent, token)]
+    raise JsonPatchError('路径不存在: /%s' % '/'.join(parts))
+
+
+def _add(doc, parts, value):
+    if not parts:
+        return value
+    parent = _resolve(doc, parts)
+    token = parts[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    else:
+        raise JsonPatchError('路径不存在: /%s' % '/'.join(parts))
+    return doc
+
+
+def _remove(doc, parts):
+    if not parts:
+        raise JsonPatchError('不能删除根节点')
+    parent = _resolve(doc, parts)
+    token = parts[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise JsonPatchError('路径不存在: /%s' % '/'.join(parts))
+        return parent.pop(token)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, token))
+    raise JsonPatchError('路径不存在: /%s' % '/'.join(parts))
+
+
+def apply_patch(doc, operations):
+    """按 RFC 6902 应用 JSON Patch（add/remove/replace/move/copy/test），返回新文档
+
+    在副本上应用，任何一步失败都不修改原文档。
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError('patch 必须是操作列表')
+
+    doc = copy.deepcopy(doc)
+    for operation in operations:
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise JsonPatchError('无效的 patch 操作')
+        op = operation['op']
+        parts = _parse_pointer(operation['path'])
+
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError('%s 操作缺少 value' % op)
+
+        if op == 'add':
+            doc = _add(doc, parts, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            _remove(doc, parts)
+        elif op == 'replace':
+            _get(doc, parts)
+            if parts:
+                _remove(doc, parts)
+            doc = _add(doc, parts, copy.deepcopy(operation['value']))
+        elif op in ('move', 'copy'):
+            source = _parse_pointer(operation.get('from'))
+            if op == 'move' and parts[:len(source)] == source and parts != source:
+                raise JsonPatchError('不能移动到自身的子节点')
+            value = _get(doc, source)
+            if op == 'move':
+                _remove(doc, source)
+            else:
+                value = copy.deepcopy(value)
+            doc = _add(doc, parts, value)
+        elif op == 'test':
+            if _get(doc, parts) != operation['value']:
+                raise JsonPatchError('test 操作失败: %s' % operation['path'])
+        else:
+            raise JsonPatchError('不支持的操作: %s' % op)
+    return doc
@@ -0,0 +1,26 @@
+import signal
+import threading
+
+# 进程收到终止信号后进入排空状态：就绪检查返回 503，负载均衡不再分配新请求，
+# 正在处理的请求（如提交、批改）照常完成
+_draining = threading.Event()
+
+
+def is_draining():
+    return _draining.is_set()
+
+
+def begin_draining():
+    _draining.set()
+
+
+def install_drain_handler(signum=signal.SIGTERM):
+    """在已有的信号处理函数之前标记排空状态，原有的优雅退出逻辑保持不变"""
+    previous = signal.getsignal(signum)
+
+    def _handler(sig, frame):
+        begin_draining()
+        if callable(previous):
+            previous(sig, frame)
+
+    signal.signal(signum, _handler)
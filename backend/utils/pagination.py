@@ -0,0 +1,122 @@
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import tuple_, literal
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_cursor(direction, sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        sort_value = {'dt': sort_value.isoformat()}
+    payload = json.dumps({'d': direction, 'v': sort_value, 'i': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_value = payload['v']
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value['dt'])
+        if payload['d'] not in ('next', 'prev'):
+            raise ValueError(payload['d'])
+        return payload['d'], sort_value, int(payload['i'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+
+def _count(query):
+    return query.order_by(None).count()
+
+
+def _offset_page(query, key, serialize, per_page, with_total):
+    page = request.args.get('page', 1, type=int)
+    pagination = query.paginate(
+        page=page, per_page=per_page, error_out=False, count=with_total
+    )
+
+    result = {
+        key: [serialize(item) for item in pagination.items],
+        'current_page': page,
+        'per_page': per_page
+    }
+    if with_total:
+        result['total'] = pagination.total
+        result['pages'] = pagination.pages
+    return result
+
+
+def _cursor_page(query, key, serialize, per_page, with_total, sort_column, id_column):
+    token = request.args.get('cursor')
+    direction = 'next'
+    page_query = query
+
+    if token:
+        direction, sort_value, row_id = _decode_cursor(token)
+        key_columns = tuple_(sort_column, id_column)
+        key_values = tuple_(literal(sort_value, sort_column.type), literal(row_id, id_column.type))
+        if direction == 'next':
+            page_query = page_query.filter(key_columns > key_values)
+        else:
+            page_query = page_query.filter(key_columns < key_values)
+
+    # 游标分页必须严格按 (sort_column, id) 排序，覆盖查询上已有的排序（如搜索相关度）
+    if direction == 'next':
+        page_query = page_query.order_by(None).order_by(sort_column.asc(), id_column.asc())
+    else:
+        page_query = page_query.order_by(None).order_by(sort_column.desc(), id_column.desc())
+
+    # 多取一行判断是否还有下一页，避免 COUNT(*)
+    rows = page_query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    sort_attr, id_attr = sort_column.key, id_column.key
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        if direction == 'next':
+            if has_more:
+                next_cursor = _encode_cursor('next', getattr(last, sort_attr), getattr(last, id_attr))
+            if token:
+                prev_cursor = _encode_cursor('prev', getattr(first, sort_attr), getattr(first, id_attr))
+        else:
+            next_cursor = _encode_cursor('next', getattr(last, sort_attr), getattr(last, id_attr))
+            if has_more:
+                prev_cursor = _encode_cursor('prev', getattr(first, sort_attr), getattr(first, id_attr))
+
+    result = {
+        key: [serialize(item) for item in rows],
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
+    }
+    if with_total:
+        result['total'] = _count(query)
+    return result
+
+
+def paginate(query, key, model, sort_column=None, serialize=None):
+    """列表接口统一分页
+
+    默认沿用页码分页（page/per_page，响应包含 total/pages），with_total=0 时跳过 COUNT(*)。
+    请求中带 cursor 参数（首页传空值）时使用游标分页：按 (sort_column, id) 稳定排序，
+    返回不透明的 next_cursor/prev_cursor，翻页代价与页深无关；total 需 with_total=1 显式请求。
+    """
+    per_page = request.args.get('per_page', 10, type=int)
+    serialize = serialize or (lambda item: item.to_dict())
+
+    if 'cursor' in request.args:
+        with_total = request.args.get('with_total', 0, type=int) == 1
+        return _cursor_page(query, key, serialize, per_page, with_total,
+                            sort_column if sort_column is not None else model.created_at, model.id)
+
+    with_total = request.args.get('with_total', 1, type=int) == 1
+    return _offset_page(query, key, serialize, per_page, with_total)
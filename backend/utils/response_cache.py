@@ -0,0 +1,51 @@
+import hashlib
+from collections import namedtuple
+from flask import current_app, request
+from utils.cache import TTLCache
+
+# 已序列化的详情响应：JSON 字节和生成它时记录的 ETag
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag'])
+
+# 正文只在 ETag 与记录当前版本一致时复用，缓存本身不影响正确性；写接口提交后可立即释放本进程的条目
+_responses = TTLCache(ttl=60, max_entries=4096)
+
+
+def version_etag(kind, ident, version):
+    """由记录的版本（updated_at、计数列等组成的元组）计算 ETag，所有进程对同一版本得到相同结果"""
+    token = '|'.join('' if part is None else str(part) for part in version)
+    return hashlib.sha256(f'{kind}:{ident}:{token}'.encode('utf-8')).hexdigest()[:32]
+
+
+def _send(body, etag):
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # 客户端可以缓存，但每次都要带 ETag 重新验证
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def versioned_response(kind, ident, version, build):
+    """按记录版本发送详情响应
+
+    version 由调用方用一条小查询取得（通常同时用于权限检查）。If-None-Match 命中时直接返回 304，
+    不加载关系也不序列化；本进程缓存的正文版本一致时直接发送，否则调用 build() 返回的 payload 重新生成。
+    """
+    etag = version_etag(kind, ident, version)
+    if etag in request.if_none_match:
+        return _send(b'', etag)
+
+    key = (kind, ident)
+    entry = _responses.get(key)
+    if entry is None or entry.etag != etag:
+        payload = build()
+        if payload is None:
+            return None
+        entry = CachedResponse((current_app.json.dumps(payload) + '\n').encode('utf-8'), etag)
+        _responses.set(key, entry)
+    return _send(entry.body, etag)
+
+
+def invalidate_response(kind, *idents):
+    for ident in idents:
+        _responses.invalidate((kind, ident))
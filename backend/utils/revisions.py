@@ -0,0 +1,162 @@
+import difflib
+import json
+import zlib
+from sqlalchemy import select
+from app import db
+from models.submission import SubmissionRevision
+
+# 历史版本记录这两个字段
+FIELDS = ('content', 'data_values')
+# 连续差异达到这个个数后保存一次完整快照，限制重建一个版本需要应用的差异数
+SNAPSHOT_INTERVAL = 16
+# 差异区域的两段文本长度乘积超过该值时不再逐字符比较，整体替换
+_MAX_MATCH_COST = 4 * 1000 * 1000
+
+
+class RevisionNotFound(Exception):
+    pass
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(payload):
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def _common_prefix(a, b):
+    """二分查找公共前缀长度，比较在切片上进行，避免逐字符的 Python 循环"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def text_delta(old, new):
+    """old -> new 的差异：[[起始, 结束, 替换文本], ...]，位置均相对 old"""
+    start = _common_prefix(old, new)
+    # 自动保存通常只改动一小段，去掉公共前后缀后只比较中间部分
+    end = _common_prefix(old[start:][::-1], new[start:][::-1])
+    old_mid, new_mid = old[start:len(old) - end], new[start:len(new) - end]
+    if not old_mid and not new_mid:
+        return []
+    if len(old_mid) * len(new_mid) > _MAX_MATCH_COST:
+        return [[start, start + len(old_mid), new_mid]]
+
+    matcher = difflib.SequenceMatcher(None, old_mid, new_mid, autojunk=False)
+    return [[start + i1, start + i2, new_mid[j1:j2]]
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def apply_delta(old, ops):
+    pieces, position = [], 0
+    for start, end, replacement in ops:
+        pieces.append(old[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(old[position:])
+    return ''.join(pieces)
+
+
+def document_of(content, data_values):
+    return {'content': _text(content), 'data_values': _text(data_values)}
+
+
+def _latest(submission_id):
+    return db.session.execute(
+        select(SubmissionRevision.version, SubmissionRevision.snapshot_version, SubmissionRevision.depth)
+        .where(SubmissionRevision.submission_id == submission_id)
+        .order_by(SubmissionRevision.version.desc())
+        .limit(1)
+    ).first()
+
+
+def _snapshot(submission_id, version, document, author_id):
+    db.session.add(SubmissionRevision(
+        submission_id=submission_id, version=version, snapshot_version=version,
+        depth=0, payload=_pack(document), author_id=author_id
+    ))
+
+
+def record_revision(submission_id, version, document, previous=None, author_id=None):
+    """记录提交的一个新版本，由调用方提交事务
+
+    document 为 document_of() 的结果；previous 为 (上一版本号, 上一版本内容)，
+    与已记录的最新版本一致时只保存差异，否则（或差异链过长、改动超过一半内容时）保存快照。
+    在此功能之前已有的提交，第一次修改时先把修改前的内容记为快照。
+    """
+    latest = _latest(submission_id)
+    if latest is None and previous is not None and previous[0] < version:
+        _snapshot(submission_id, previous[0], previous[1], author_id)
+        latest = (previous[0], previous[0], 0)
+    if latest is not None and latest[0] >= version:
+        return
+
+    if (latest is None or previous is None or latest[0] != previous[0]
+            or latest[2] + 1 >= SNAPSHOT_INTERVAL):
+        _snapshot(submission_id, version, document, author_id)
+        return
+
+    old = previous[1]
+    delta = {field: text_delta(old[field], document[field])
+             for field in FIELDS if old[field] != document[field]}
+    changed = sum(len(op[2]) for ops in delta.values() for op in ops)
+    if changed * 2 > sum(len(document[field]) for field in FIELDS):
+        _snapshot(submission_id, version, document, author_id)
+        return
+
+    db.session.add(SubmissionRevision(
+        submission_id=submission_id, version=version, snapshot_version=latest[1],
+        depth=latest[2] + 1, payload=_pack(delta), author_id=author_id
+    ))
+
+
+def rebuild(submission_id, version):
+    """从最近的快照开始依次应用差异，重建指定版本的内容"""
+    target = db.session.execute(
+        select(SubmissionRevision.snapshot_version)
+        .where(SubmissionRevision.submission_id == submission_id,
+               SubmissionRevision.version == version)
+    ).scalar()
+    if target is None:
+        raise RevisionNotFound()
+
+    payloads = db.session.execute(
+        select(SubmissionRevision.payload)
+        .where(SubmissionRevision.submission_id == submission_id,
+               SubmissionRevision.version >= target,
+               SubmissionRevision.version <= version)
+        .order_by(SubmissionRevision.version)
+    ).scalars().all()
+
+    document = _unpack(payloads[0])
+    for payload in payloads[1:]:
+        for field, ops in _unpack(payload).items():
+            document[field] = apply_delta(document[field], ops)
+    return document
+
+
+def diff_versions(submission_id, from_version, to_version):
+    """两个版本之间每个字段的 unified diff（按行）"""
+    old = rebuild(submission_id, from_version)
+    new = rebuild(submission_id, to_version)
+    return {
+        field: list(difflib.unified_diff(
+            old[field].splitlines(), new[field].splitlines(),
+            'v%d' % from_version, 'v%d' % to_version, lineterm=''
+        ))
+        for field in FIELDS if old[field] != new[field]
+    }
@@ -0,0 +1,274 @@
+"""实验分配的截止时间调度
+
+分配状态按 assigned -> active -> expired 流转：到开始时间变为 active，到截止时间变为 expired，
+截止前 ASSIGNMENT_REMINDER_HOURS 小时发出提醒。后台线程用按时间排序的堆保存下一个边界，
+睡眠到最早的边界醒来，把同时到期的分配用一条 UPDATE 批量转换，并锁定迟交的草稿。
+
+堆只决定何时醒来，状态本身在数据库中：启动时和每隔 ASSIGNMENT_RESYNC_INTERVAL 秒从数据库重建堆，
+停机期间错过的边界在启动后立即处理。每条 UPDATE 都带状态条件，多个进程同时运行调度时结果相同。
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from blinker import Namespace
+from sqlalchemy import update, select, exists, and_, or_
+from sqlalchemy.orm import aliased
+from app import db
+from models.assignment import ExperimentAssignment
+from models.class_model import StudentClass
+from models.submission import Submission
+from utils.statistics import invalidate_experiment_statistics
+
+OPEN_STATUSES = ('assigned', 'active')
+
+ACTIVATE, REMIND, EXPIRE = 'activate', 'remind', 'expire'
+
+# 状态转换后发出的事件，参数 assignment_ids 为本次转换的分配 ID 列表
+_signals = Namespace()
+assignment_activated = _signals.signal('assignment-activated')
+assignment_due_soon = _signals.signal('assignment-due-soon')
+assignment_expired = _signals.signal('assignment-expired')
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def _boundaries(assignment, reminder_lead):
+    """分配尚未到达的状态边界：[(时间, 类型)]"""
+    entries = []
+    if assignment.status == 'assigned':
+        entries.append((assignment.start_date or assignment.created_at or datetime.utcnow(), ACTIVATE))
+    if assignment.status in OPEN_STATUSES and assignment.due_date:
+        if assignment.reminded_at is None:
+            entries.append((assignment.due_date - reminder_lead, REMIND))
+        entries.append((assignment.due_date, EXPIRE))
+    return entries
+
+
+def _transition(ids, values, *conditions):
+    """把 ids 中仍满足条件的分配批量更新，返回实际更新的 ID"""
+    if not ids:
+        return []
+    table = ExperimentAssignment
+    statement = update(table).where(table.id.in_(ids), *conditions).values(**values) \
+        .execution_options(synchronize_session=False)
+    if db.engine.dialect.update_returning:
+        return list(db.session.execute(statement.returning(table.id)).scalars())
+
+    # 不支持 UPDATE ... RETURNING 的数据库先查出匹配的行；并发时事件可能重复发出
+    matched = list(db.session.execute(
+        select(table.id).where(table.id.in_(ids), *conditions)
+    ).scalars())
+    if matched:
+        db.session.execute(update(table).where(table.id.in_(matched), *conditions).values(**values)
+                           .execution_options(synchronize_session=False))
+    return matched
+
+
+def _covers(assignment, student_id=Submission.student_id):
+    """分配是否覆盖该学生（本人或所在班级），默认为当前提交的学生"""
+    return or_(
+        and_(assignment.assignee_type == 'student',
+             assignment.assignee_id == student_id),
+        and_(assignment.assignee_type == 'class',
+             assignment.assignee_id.in_(
+                 # 嵌套在 EXISTS 中，需显式关联到外层 UPDATE 的 submissions
+                 select(StudentClass.class_id).where(StudentClass.student_id == student_id)
+                 .correlate(Submission)
+             ))
+    )
+
+
+def _still_open(assignment, now):
+    """分配尚未截止：未过期且没有截止时间或截止时间未到"""
+    return and_(assignment.status.in_(OPEN_STATUSES),
+                or_(assignment.due_date.is_(None), assignment.due_date > now))
+
+
+def deadline_passed(experiment_id, student_id, now=None):
+    """学生在该实验上有分配且全部已截止时为 True
+
+    只通过班级课程看到、没有分配的实验不受截止时间限制。判断条件与截止时锁定草稿相同。
+    """
+    now = now or datetime.utcnow()
+    covering, still_open = aliased(ExperimentAssignment), aliased(ExperimentAssignment)
+    assigned, open_ = db.session.execute(select(
+        exists().where(covering.experiment_id == experiment_id, _covers(covering, student_id)),
+        exists().where(still_open.experiment_id == experiment_id, _covers(still_open, student_id),
+                       _still_open(still_open, now))
+    )).one()
+    return bool(assigned) and not open_
+
+
+def _lock_late_drafts(assignment_ids, now):
+    """锁定刚截止的分配下仍为草稿的提交；学生在该实验上还有未截止的分配时不锁定"""
+    expired = aliased(ExperimentAssignment)
+    other = aliased(ExperimentAssignment)
+    late = exists().where(
+        expired.id.in_(assignment_ids),
+        expired.experiment_id == Submission.experiment_id,
+        _covers(expired)
+    )
+    still_open = exists().where(
+        _still_open(other, now),
+        other.experiment_id == Submission.experiment_id,
+        _covers(other)
+    )
+    return db.session.execute(
+        update(Submission).where(Submission.status == 'draft', late, ~still_open)
+        .values(status='locked').execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def run_transitions(due, now, app):
+    """执行一批到期的边界：due 为 {类型: 分配 ID 集合}，在一个事务中完成后发出事件"""
+    table = ExperimentAssignment
+    reminder_lead = timedelta(hours=app.config['ASSIGNMENT_REMINDER_HOURS'])
+    try:
+        reminded = _transition(due.get(REMIND), {'reminded_at': now},
+                               table.reminded_at.is_(None), table.status.in_(OPEN_STATUSES),
+                               table.due_date > now, table.due_date <= now + reminder_lead)
+        expired = _transition(due.get(EXPIRE), {'status': 'expired'},
+                              table.status.in_(OPEN_STATUSES), table.due_date <= now)
+        activated = _transition(due.get(ACTIVATE), {'status': 'active'},
+                                table.status == 'assigned',
+                                or_(table.start_date.is_(None), table.start_date <= now))
+        locked = _lock_late_drafts(expired, now) if expired else 0
+        experiment_ids = set(db.session.execute(
+            select(table.experiment_id).where(table.id.in_(expired))
+        ).scalars()) if locked else set()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for experiment_id in experiment_ids:
+        invalidate_experiment_statistics(experiment_id)
+    if activated:
+        assignment_activated.send(app, assignment_ids=activated)
+    if reminded:
+        app.logger.info('assignments due soon: %s', reminded)
+        assignment_due_soon.send(app, assignment_ids=reminded)
+    if expired:
+        app.logger.info('assignments expired: %s, %d draft(s) locked', expired, locked)
+        assignment_expired.send(app, assignment_ids=expired)
+    return {'activated': activated, 'reminded': reminded, 'expired': expired, 'locked': locked}
+
+
+class _Scheduler:
+    def __init__(self, app):
+        self.app = app
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def push(self, entries, assignment_id):
+        with self._wakeup:
+            for when, kind in entries:
+                heapq.heappush(self._heap, (when, next(self._seq), kind, assignment_id))
+            self._wakeup.notify()
+
+    def _reload(self):
+        """从数据库重建堆；与重建期间新加入的条目合并，避免遗漏刚创建的分配"""
+        reminder_lead = timedelta(hours=self.app.config['ASSIGNMENT_REMINDER_HOURS'])
+        table = ExperimentAssignment
+        rows = db.session.execute(select(
+            table.id, table.status, table.start_date, table.due_date, table.reminded_at, table.created_at
+        ).where(table.status.in_(OPEN_STATUSES))).all()
+        loaded = {(when, kind, row.id) for row in rows for when, kind in _boundaries(row, reminder_lead)}
+        with self._wakeup:
+            entries = loaded | {(when, kind, ident) for when, _, kind, ident in self._heap}
+            self._heap = [(when, next(self._seq), kind, ident) for when, kind, ident in entries]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, now):
+        due = defaultdict(set)
+        with self._wakeup:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, kind, assignment_id = heapq.heappop(self._heap)
+                due[kind].add(assignment_id)
+        return due
+
+    def _seconds_until_next(self):
+        if not self._heap:
+            return None
+        return (self._heap[0][0] - datetime.utcnow()).total_seconds()
+
+    def run(self):
+        resync_interval = self.app.config['ASSIGNMENT_RESYNC_INTERVAL']
+        next_resync = 0
+        while True:
+            with self.app.app_context():
+                try:
+                    if time.monotonic() >= next_resync:
+                        self._reload()
+                        next_resync = time.monotonic() + resync_interval
+                    now = datetime.utcnow()
+                    due = self._pop_due(now)
+                    if due:
+                        run_transitions(due, now, self.app)
+                except Exception:
+                    # 失败的边界在下次重建时从数据库重新加载
+                    self.app.logger.exception('assignment scheduler failed')
+
+            with self._wakeup:
+                if self._stopping:
+                    return
+                timeout = next_resync - time.monotonic()
+                until_next = self._seconds_until_next()
+                if until_next is not None:
+                    timeout = min(timeout, until_next)
+                if timeout > 0:
+                    self._wakeup.wait(timeout)
+                if self._stopping:
+                    return
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='assignment-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def start_scheduler(app):
+    """在当前进程中启动调度线程（应在 fork 之后调用），ASSIGNMENT_SCHEDULER 关闭时不启动"""
+    global _scheduler
+    if not app.config.get('ASSIGNMENT_SCHEDULER'):
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = _Scheduler(app)
+            _scheduler.start()
+    return _scheduler
+
+
+def run_forever(app):
+    """在当前线程中运行调度，用于单独的调度进程"""
+    _Scheduler(app).run()
+
+
+def stop_scheduler(timeout=5):
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.stop(timeout)
+
+
+def schedule_assignment(assignment):
+    """新建分配后调用，把它的边界加入本进程的堆（其他进程在下次重建时加载）"""
+    scheduler = _scheduler
+    if scheduler is None:
+        return
+    reminder_lead = timedelta(hours=scheduler.app.config['ASSIGNMENT_REMINDER_HOURS'])
+    scheduler.push(_boundaries(assignment, reminder_lead), assignment.id)
@@ -0,0 +1,65 @@
+from sqlalchemy import select
+from app import db
+from models.course import Course
+from models.experiment import Experiment
+from models.submission import Submission
+from utils.visibility import visible_course_ids, visible_experiment_ids
+
+# 各角色可访问的行以 SQL 子查询表示，直接拼进各蓝图的查询，不在 Python 中加载 ID 列表；
+# 管理员不受限制，返回 None
+
+
+def teacher_course_ids(teacher_id):
+    return select(Course.id).where(Course.teacher_id == teacher_id)
+
+
+def teacher_experiment_ids(teacher_id):
+    return select(Experiment.id).join(Course, Course.id == Experiment.course_id) \
+        .where(Course.teacher_id == teacher_id)
+
+
+def course_scope(identity):
+    """identity 可访问的课程 ID 子查询"""
+    if identity.role == 'admin':
+        return None
+    if identity.role == 'teacher':
+        return teacher_course_ids(identity.id)
+    return visible_course_ids(identity.id)
+
+
+def experiment_scope(identity):
+    """identity 可访问的实验 ID 子查询"""
+    if identity.role == 'admin':
+        return None
+    if identity.role == 'teacher':
+        return teacher_experiment_ids(identity.id)
+    return visible_experiment_ids(identity.id)
+
+
+def submission_scope(identity):
+    """identity 可访问的提交的过滤条件：学生为自己的提交，教师为自己课程实验的提交"""
+    if identity.role == 'admin':
+        return None
+    if identity.role == 'teacher':
+        return Submission.experiment_id.in_(teacher_experiment_ids(identity.id))
+    return Submission.student_id == identity.id
+
+
+def apply_scope(query, column, scope):
+    """把 column 限制在 scope 子查询内，scope 为 None 时原样返回"""
+    return query if scope is None else query.filter(column.in_(scope))
+
+
+def can_manage_experiment(identity, experiment_id):
+    """管理员，或实验所属课程的教师
+
+    批改、修改提交前调用，按课程当前的 teacher_id 查询一次（主键和 ix_courses_teacher_id 索引），
+    不使用进程内缓存：课程转交后原教师立即失去权限。
+    """
+    if identity.role == 'admin':
+        return True
+    if identity.role != 'teacher':
+        return False
+    return db.session.execute(
+        teacher_experiment_ids(identity.id).where(Experiment.id == experiment_id)
+    ).first() is not None
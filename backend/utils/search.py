@@ -0,0 +1,60 @@
+from sqlalchemy import text, Integer, Float, or_
+from app import db
+
+# 表名 -> 可搜索的列；在 SQLite 上由 <表名>_fts 全文索引（FTS5 trigram 分词）支持，
+# 该索引由迁移 v0003 创建，并通过触发器在增删改时增量同步。
+# 修改列时需新增迁移，删除并按新定义重建已有数据库中的 FTS 表和触发器
+SEARCH_COLUMNS = {
+    'users': ['username', 'email'],
+    'courses': ['name', 'code'],
+    'classes': ['name'],
+    'experiments': ['title'],
+}
+
+# trigram 分词只能匹配不少于 3 个字符的词
+MIN_TERM_LENGTH = 3
+
+_fts_tables = {}
+
+
+def _fts_available(table):
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    key = (engine.url, table)
+    if key not in _fts_tables:
+        with engine.connect() as conn:
+            _fts_tables[key] = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': f'{table}_fts'}
+            ).first() is not None
+    return _fts_tables[key]
+
+
+def _match_expression(search):
+    terms = search.split()
+    if not terms or any(len(term) < MIN_TERM_LENGTH for term in terms):
+        return None
+    # 每个词作为短语加引号，避免用户输入被解析为 FTS5 查询语法
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def apply_search(query, model, search):
+    """按关键字过滤查询，结果按相关度排序
+
+    可用全文索引时走 FTS5 MATCH，代价与表大小基本无关；
+    关键字过短或数据库不支持时回退到 LIKE '%term%' 匹配。
+    """
+    table = model.__tablename__
+    columns = SEARCH_COLUMNS[table]
+    match = _match_expression(search)
+
+    if match is None or not _fts_available(table):
+        return query.filter(or_(*[getattr(model, column).contains(search) for column in columns]))
+
+    fts = f'{table}_fts'
+    ranked = text(
+        f'SELECT rowid AS id, bm25({fts}) AS rank FROM {fts} WHERE {fts} MATCH :match'
+    ).bindparams(match=match).columns(id=Integer, rank=Float).subquery(f'{table}_search')
+
+    return query.join(ranked, ranked.c.id == model.id).order_by(ranked.c.rank)
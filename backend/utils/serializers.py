@@ -0,0 +1,72 @@
+from sqlalchemy.orm import joinedload, selectinload
+from models.course import Course
+from models.experiment import Experiment
+from models.class_model import Class, StudentClass
+from models.submission import Submission
+from models.assignment import ExperimentAssignment
+
+# 每个响应视图在 to_dict() 中会访问的关系
+# 多对一关系用 joinedload 随主查询一起取出，集合关系用 selectinload 以一条 IN 查询批量加载，
+# 这样一页数据的查询次数是固定的，与每页条数无关
+_VIEWS = {
+    'course': lambda: (
+        joinedload(Course.teacher),
+    ),
+    'experiment': lambda: (
+        joinedload(Experiment.course),
+    ),
+    'experiment_detail': lambda: (
+        joinedload(Experiment.course),
+        selectinload(Experiment.steps),
+        selectinload(Experiment.data_points),
+    ),
+    'class': lambda: (
+        joinedload(Class.teacher),
+    ),
+    'class_detail': lambda: (
+        joinedload(Class.teacher),
+        selectinload(Class.student_enrollments).joinedload(StudentClass.student),
+    ),
+    'submission': lambda: (
+        joinedload(Submission.experiment),
+        joinedload(Submission.student),
+        joinedload(Submission.grader),
+    ),
+    # 被分配对象按 assignee_type 分别用一条 IN 查询解析
+    'assignment': lambda: (
+        joinedload(ExperimentAssignment.experiment),
+        selectinload(ExperimentAssignment.assigned_class),
+        selectinload(ExperimentAssignment.assigned_student),
+    ),
+}
+
+
+def with_relations(query, view):
+    """为查询附加指定视图需要的预加载选项"""
+    return query.options(*_VIEWS[view]())
+
+
+def load_one(model, ident, view):
+    """按主键加载单条记录，并一次性加载视图需要的关系"""
+    return with_relations(model.query, view).filter(model.id == ident).first()
+
+
+def serialize_class_detail(class_obj):
+    """班级详情：班级信息加学生列表（学生已随 class_detail 视图预加载）"""
+    students = []
+    for enrollment in class_obj.student_enrollments:
+        student_data = enrollment.student.to_dict()
+        student_data['enrolled_at'] = enrollment.enrolled_at.isoformat()
+        students.append(student_data)
+
+    class_data = class_obj.to_dict()
+    class_data['students'] = students
+    return class_data
+
+
+def serialize_experiment_detail(experiment):
+    """实验详情：实验信息加步骤和数据点（已随 experiment_detail 视图预加载）"""
+    experiment_data = experiment.to_dict()
+    experiment_data['steps'] = [step.to_dict() for step in experiment.steps]
+    experiment_data['data_points'] = [dp.to_dict() for dp in experiment.data_points]
+    return experiment_data
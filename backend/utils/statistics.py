@@ -0,0 +1,141 @@
+import re
+from sqlalchemy import select
+from app import db
+from models.experiment import DataPoint
+from models.submission import Submission, SubmissionValue
+from utils.cache import TTLCache
+
+# numpy 在计算统计时才导入，不计入应用启动时间
+
+# 实验统计结果缓存：新提交或批改时由写入方失效
+_stats_cache = TTLCache(ttl=60)
+
+DEFAULT_BINS = 10
+_NUMBER = r'[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?'
+_RANGE = re.compile(
+    r'^\s*[\[(（]?\s*(' + _NUMBER + r')\s*(?:-|~|～|,|，|至|到)\s*(' + _NUMBER + r')\s*[\])）]?\s*$'
+)
+
+
+def parse_value_range(value_range):
+    """解析数据点的取值范围，如 "0-100"、"0~100"、"[0, 100]"，无法解析时返回 (None, None)"""
+    match = _RANGE.match(value_range or '')
+    if not match:
+        return None, None
+    low, high = float(match.group(1)), float(match.group(2))
+    return min(low, high), max(low, high)
+
+
+def invalidate_experiment_statistics(experiment_id):
+    _stats_cache.invalidate_where(lambda key: key[0] == experiment_id)
+
+
+def _fetch_rows(statement):
+    """直接用 DBAPI 游标执行查询，跳过 ORM 和 Row 对象构造（上万行时这是主要开销）"""
+    conn = db.session.connection()
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(str(compiled), params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _load_values(experiment_id, include_drafts):
+    """一次查询取出该实验所有数值型取值，返回 (data_point_ids, submission_ids, values) 三个数组"""
+    import numpy as np
+    values = SubmissionValue.__table__
+    statement = select(values.c.data_point_id, values.c.submission_id, values.c.num_value).where(
+        values.c.experiment_id == experiment_id,
+        values.c.num_value.isnot(None)
+    )
+    if not include_drafts:
+        submissions = Submission.__table__
+        statement = statement.where(values.c.submission_id.in_(
+            select(submissions.c.id).where(
+                submissions.c.experiment_id == experiment_id,
+                submissions.c.status.in_(['submitted', 'graded'])
+            )
+        ))
+
+    rows = _fetch_rows(statement)
+    if not rows:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty
+    point_ids, submission_ids, values = zip(*rows)
+    return (np.fromiter(point_ids, dtype=np.int64, count=len(rows)),
+            np.fromiter(submission_ids, dtype=np.int64, count=len(rows)),
+            np.fromiter(values, dtype=np.float64, count=len(rows)))
+
+
+def _describe(values, submission_ids, low, high, bins):
+    import numpy as np
+    # 旧数据中可能有 inf/nan：会使直方图范围无效、分位数无法序列化为 JSON，不参与统计
+    finite = np.isfinite(values)
+    values, submission_ids = values[finite], submission_ids[finite]
+    if not values.size:
+        return {'count': 0}
+    quantiles = np.quantile(values, [0.0, 0.25, 0.5, 0.75, 1.0])
+    counts, edges = np.histogram(values, bins=bins)
+
+    result = {
+        'count': int(values.size),
+        'mean': float(values.mean()),
+        'std': float(values.std(ddof=1)) if values.size > 1 else 0.0,
+        'min': float(quantiles[0]),
+        'q1': float(quantiles[1]),
+        'median': float(quantiles[2]),
+        'q3': float(quantiles[3]),
+        'max': float(quantiles[4]),
+        'histogram': {'counts': counts.tolist(), 'bin_edges': edges.tolist()},
+        'outliers': []
+    }
+    if low is not None:
+        mask = (values < low) | (values > high)
+        result['outliers'] = [
+            {'submission_id': int(submission_id), 'value': float(value)}
+            for submission_id, value in zip(submission_ids[mask], values[mask])
+        ]
+    return result
+
+
+def experiment_statistics(experiment_id, include_drafts=False, bins=DEFAULT_BINS):
+    """实验每个数值型数据点的分布统计：均值、标准差、分位数、直方图和超出取值范围的异常值"""
+    import numpy as np
+    cache_key = (experiment_id, include_drafts, bins)
+    cached = _stats_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    data_points = DataPoint.query.filter_by(experiment_id=experiment_id, type='number').all()
+    point_ids, submission_ids, values = _load_values(experiment_id, include_drafts)
+
+    # 按数据点分组：排序后按边界切分，避免逐个数据点扫描整个数组
+    order = np.argsort(point_ids, kind='stable')
+    point_ids, submission_ids, values = point_ids[order], submission_ids[order], values[order]
+    unique_ids, starts = np.unique(point_ids, return_index=True)
+    bounds = dict(zip(unique_ids.tolist(), zip(starts.tolist(), np.append(starts[1:], point_ids.size).tolist())))
+
+    points = []
+    for data_point in data_points:
+        low, high = parse_value_range(data_point.value_range)
+        entry = {
+            'data_point_id': data_point.id,
+            'name': data_point.name,
+            'unit': data_point.unit,
+            'value_range': data_point.value_range,
+        }
+        if data_point.id in bounds:
+            start, end = bounds[data_point.id]
+            entry.update(_describe(values[start:end], submission_ids[start:end], low, high, bins))
+        else:
+            entry['count'] = 0
+        points.append(entry)
+
+    result = {'experiment_id': experiment_id, 'bins': bins, 'data_points': points}
+    _stats_cache.set(cache_key, result)
+    return result
@@ -0,0 +1,170 @@
+import csv
+import io
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from app import db
+from models.user import User
+
+VALID_ROLES = ('admin', 'teacher', 'student')
+# 每批插入的行数，每批单独提交并汇报一次进度
+BATCH_SIZE = 500
+# 唯一性检查时 IN 列表的最大长度
+LOOKUP_CHUNK_SIZE = 900
+HASH_WORKERS = os.cpu_count() or 1
+
+_pool = None
+
+
+def _hash_pool():
+    """密码哈希用的进程池，按 CPU 核数创建，进程内复用
+
+    使用 spawn 启动子进程，避免在多线程的服务进程中 fork。
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=HASH_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _pool
+
+
+def shutdown_hash_pool():
+    """进程退出前关闭密码哈希进程池"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+def parse_user_rows(request):
+    """读取待导入用户：JSON {"users": [{...}]} 或带表头 username,email,password[,role] 的 CSV"""
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+    elif request.mimetype == 'text/csv':
+        text = request.get_data(as_text=True)
+    else:
+        data = request.get_json() or {}
+        return list(data.get('users') or [])
+
+    reader = csv.DictReader(io.StringIO(text))
+    return [{key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            for row in reader]
+
+
+def _existing(column, values):
+    found = set()
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+        found.update(value for (value,) in db.session.query(column).filter(column.in_(chunk)))
+    return found
+
+
+def validate_rows(rows):
+    """逐行校验并用集合查询检查用户名/邮箱是否已存在
+
+    返回 (results, valid)：results 与输入一一对应，valid 为可导入的 (序号, 行) 列表。
+    """
+    results = []
+    valid = []
+    usernames = set()
+    emails = set()
+
+    for index, row in enumerate(rows):
+        username = (row.get('username') or '').strip()
+        email = (row.get('email') or '').strip()
+        password = row.get('password') or ''
+        role = (row.get('role') or 'student').strip()
+        result = {'row': index + 1, 'username': username, 'status': 'pending'}
+        results.append(result)
+
+        if not username or not email or not password:
+            result['status'] = 'invalid'
+            result['message'] = '用户名、邮箱和密码不能为空'
+        elif role not in VALID_ROLES:
+            result['status'] = 'invalid'
+            result['message'] = '无效的角色'
+        elif username in usernames or email in emails:
+            result['status'] = 'duplicate'
+            result['message'] = '导入数据中重复'
+        else:
+            usernames.add(username)
+            emails.add(email)
+            valid.append((index, {'username': username, 'email': email, 'password': password, 'role': role}))
+
+    taken_usernames = _existing(User.username, usernames)
+    taken_emails = _existing(User.email, emails)
+    remaining = []
+    for index, row in valid:
+        if row['username'] in taken_usernames:
+            results[index].update(status='duplicate', message='用户名已存在')
+        elif row['email'] in taken_emails:
+            results[index].update(status='duplicate', message='邮箱已存在')
+        else:
+            remaining.append((index, row))
+    return results, remaining
+
+
+def _insert_batch(batch, results):
+    """一次 executemany 插入一批；失败（如并发写入造成的唯一冲突）时逐行重试以定位失败行"""
+    records = [{
+        'username': row['username'],
+        'email': row['email'],
+        'password_hash': row['password_hash'],
+        'role': row['role'],
+        'is_active': True
+    } for _, row in batch]
+    try:
+        db.session.execute(User.__table__.insert(), records)
+        db.session.commit()
+        for index, _ in batch:
+            results[index]['status'] = 'created'
+        return len(batch)
+    except IntegrityError:
+        db.session.rollback()
+
+    created = 0
+    for (index, _), record in zip(batch, records):
+        try:
+            db.session.execute(User.__table__.insert(), record)
+            db.session.commit()
+            results[index]['status'] = 'created'
+            created += 1
+        except IntegrityError:
+            db.session.rollback()
+            results[index].update(status='failed', message='用户名或邮箱已存在')
+    return created
+
+
+def import_users(rows):
+    """批量导入用户的生成器，每处理完一批产出一次进度，最后产出汇总
+
+    密码哈希在进程池中并行计算，插入按批使用 executemany。
+    """
+    results, pending = validate_rows(rows)
+    total = len(rows)
+    created = 0
+    pool = _hash_pool()
+
+    for start in range(0, len(pending), BATCH_SIZE):
+        batch = pending[start:start + BATCH_SIZE]
+        chunksize = max(1, len(batch) // (HASH_WORKERS * 4))
+        hashes = pool.map(generate_password_hash, [row['password'] for _, row in batch], chunksize=chunksize)
+        for (_, row), password_hash in zip(batch, hashes):
+            row['password_hash'] = password_hash
+        created += _insert_batch(batch, results)
+        yield {'type': 'progress', 'processed': min(start + BATCH_SIZE, len(pending)),
+               'pending': len(pending), 'total': total, 'created': created}
+
+    yield {
+        'type': 'summary',
+        'total': total,
+        'created': created,
+        'failed': total - created,
+        'results': results
+    }
@@ -0,0 +1,146 @@
+from sqlalchemy import select, delete, insert, union, union_all, literal, cast, null, func, case, and_
+from sqlalchemy.types import Integer, DateTime
+from app import db
+from models.course import Course
+from models.experiment import Experiment
+from models.class_model import StudentClass, ClassCourse
+from models.assignment import ExperimentAssignment
+from models.visibility import StudentCourseAccess, StudentExperimentAccess
+
+# 每次重建的学生数，避免 IN 列表超出数据库绑定参数上限
+CHUNK_SIZE = 500
+# 学生只能看到这些状态的实验；实验状态变化后需重建能看到该课程的学生的索引
+VISIBLE_STATUSES = ('published', 'active')
+
+
+def _scoped(query, column, student_ids):
+    return query.where(column.in_(student_ids)) if student_ids is not None else query
+
+
+def _experiment_sources(student_ids):
+    """学生可见实验的所有来源：(student_id, experiment_id, course_id, assigned, due_date)
+
+    只包含已发布的实验，未发布的实验即使已分配或在关联课程中也不可见。
+    """
+    assignment = ExperimentAssignment
+    published = Experiment.status.in_(VISIBLE_STATUSES)
+    via_course = select(
+        StudentClass.student_id, Experiment.id, Experiment.course_id,
+        literal(0, Integer), cast(null(), DateTime)
+    ).join(ClassCourse, ClassCourse.class_id == StudentClass.class_id) \
+        .join(Experiment, Experiment.course_id == ClassCourse.course_id) \
+        .where(published)
+    direct = select(
+        assignment.assignee_id, Experiment.id, Experiment.course_id,
+        literal(1, Integer), assignment.due_date
+    ).join(Experiment, Experiment.id == assignment.experiment_id) \
+        .where(assignment.assignee_type == 'student', published)
+    via_class = select(
+        StudentClass.student_id, Experiment.id, Experiment.course_id,
+        literal(1, Integer), assignment.due_date
+    ).join(assignment, and_(assignment.assignee_type == 'class',
+                            assignment.assignee_id == StudentClass.class_id)) \
+        .join(Experiment, Experiment.id == assignment.experiment_id) \
+        .where(published)
+
+    return union_all(
+        _scoped(via_course, StudentClass.student_id, student_ids),
+        _scoped(direct, assignment.assignee_id, student_ids),
+        _scoped(via_class, StudentClass.student_id, student_ids),
+    ).subquery()
+
+
+def _statements(student_ids):
+    """重建指定学生（None 为全部）可见性索引的语句，按顺序执行"""
+    experiment_access, course_access = StudentExperimentAccess, StudentCourseAccess
+    yield _scoped(delete(experiment_access), experiment_access.student_id, student_ids)
+    yield _scoped(delete(course_access), course_access.student_id, student_ids)
+
+    # 同一实验有多个来源时合并：有任一分配即为 assigned；截止时间取各分配中最晚的，
+    # 某个分配没有截止时间时整体没有截止时间
+    source = _experiment_sources(student_ids)
+    student_id, experiment_id, course_id, assigned, due_date = source.c
+    assigned_count = func.sum(assigned)
+    yield insert(experiment_access).from_select(
+        ['student_id', 'experiment_id', 'course_id', 'assigned', 'due_date'],
+        select(
+            student_id, experiment_id, course_id,
+            case((assigned_count > 0, True), else_=False),
+            case((and_(assigned_count > 0, assigned_count == func.count(due_date)), func.max(due_date)),
+                 else_=None)
+        ).group_by(student_id, experiment_id, course_id)
+    )
+
+    # 课程可见：班级关联的课程（即使还没有实验），加上有可见实验的课程
+    linked = select(StudentClass.student_id, ClassCourse.course_id) \
+        .join(ClassCourse, ClassCourse.class_id == StudentClass.class_id) \
+        .join(Course, Course.id == ClassCourse.course_id)
+    yield insert(course_access).from_select(['student_id', 'course_id'], union(
+        _scoped(linked, StudentClass.student_id, student_ids),
+        _scoped(select(experiment_access.student_id, experiment_access.course_id),
+                experiment_access.student_id, student_ids),
+    ))
+
+
+def populate(conn, student_ids=None):
+    """在 conn（连接或会话）上重建指定学生（None 为全部）的可见性索引"""
+    for statement in _statements(student_ids):
+        conn.execute(statement.execution_options(synchronize_session=False))
+
+
+def refresh_visibility(student_ids):
+    """在当前事务中重建这些学生的可见性索引
+
+    选课、班级关联课程、分配和课程实验变化后调用，只涉及受影响的学生，每批学生固定几条语句。
+    """
+    student_ids = sorted({student_id for student_id in student_ids if student_id is not None})
+    for start in range(0, len(student_ids), CHUNK_SIZE):
+        populate(db.session, student_ids[start:start + CHUNK_SIZE])
+
+
+def class_students(class_id):
+    return [student_id for (student_id,) in
+            db.session.query(StudentClass.student_id).filter(StudentClass.class_id == class_id)]
+
+
+def course_students(course_id):
+    """当前能看到该课程的学生（课程变化前调用）"""
+    return [student_id for (student_id,) in
+            db.session.query(StudentCourseAccess.student_id).filter(StudentCourseAccess.course_id == course_id)]
+
+
+def experiment_students(experiment_id):
+    """实验发布状态变化时可能受影响的学生：能看到其课程的学生，以及被分配了该实验的学生"""
+    experiment = db.session.get(Experiment, experiment_id)
+    students = set(course_students(experiment.course_id)) if experiment else set()
+    for assignee_type, assignee_id in db.session.query(
+        ExperimentAssignment.assignee_type, ExperimentAssignment.assignee_id
+    ).filter(ExperimentAssignment.experiment_id == experiment_id):
+        students.update(assignee_students(assignee_type, assignee_id))
+    return students
+
+
+def assignee_students(assignee_type, assignee_id):
+    return class_students(assignee_id) if assignee_type == 'class' else [assignee_id]
+
+
+def visible_course_ids(student_id):
+    """学生可见课程 ID 的子查询，用于列表过滤"""
+    return select(StudentCourseAccess.course_id).where(StudentCourseAccess.student_id == student_id)
+
+
+def visible_experiment_ids(student_id):
+    return select(StudentExperimentAccess.experiment_id).where(StudentExperimentAccess.student_id == student_id)
+
+
+def can_access_course(student_id, course_id):
+    """按唯一索引查一行判断学生能否访问课程"""
+    return db.session.execute(select(StudentCourseAccess.id).where(
+        StudentCourseAccess.student_id == student_id, StudentCourseAccess.course_id == course_id
+    )).first() is not None
+
+
+def can_access_experiment(student_id, experiment_id):
+    return db.session.execute(select(StudentExperimentAccess.id).where(
+        StudentExperimentAccess.student_id == student_id, StudentExperimentAccess.experiment_id == experiment_id
+    )).first() is not None
@@ -0,0 +1,11 @@
+"""生产环境 WSGI 入口
+
+    flask --app app migrate            # 部署时先建表/迁移，只需执行一次
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+应用在导入本模块时创建；gunicorn 开启 preload 后只在主进程创建一次，
+fork 出的工作进程以写时复制方式共享已加载的代码和数据。
+"""
+from app import create_app
+
+app = create_app()
@@ -9,6 +9,12 @@ if [ ! -d "backend" ] || [ ! -d "frontend" ]; then
     exit 1
 fi
 
+# 管理员初始密码（管理员已存在时不会修改）
+if [ -z "$ADMIN_PASSWORD" ]; then
+    echo "❌ 错误: 请先设置 ADMIN_PASSWORD 环境变量，作为管理员 admin 的初始密码"
+    exit 1
+fi
+
 # 启动后端服务
 echo "📡 启动后端服务..."
 cd backend
@@ -20,6 +26,11 @@ fi
 source venv/bin/activate
 pip install -r requirements.txt
 
+# 建表并执行未完成的迁移（新库和已有数据库都适用），再创建管理员
+echo "🗄️ 初始化数据库..."
+flask --app app migrate || exit 1
+flask --app app create-admin || exit 1
+
 echo "🔥 启动Flask后端 (http://localhost:5000)..."
 python3 app.py &
 BACKEND_PID=$!
@@ -44,7 +55,7 @@ cd ..
 echo "✅ 系统启动完成!"
 echo "📱 前端地址: http://localhost:5173"
 echo "🔌 后端地址: http://localhost:5000"
-echo "👤 默认管理员账户: admin / admin123"
+echo "👤 管理员账户: admin / ADMIN_PASSWORD 设置的密码"
 echo ""
 echo "按 Ctrl+C 停止所有服务..."
 